@@ -0,0 +1,26 @@
+#!/bin/bash
+# run_multiturn_workload.sh
+
+python src/evaluator.py \
+--mode multiturn \
+--model-name "llama3-405b" \
+--results-dir "./data/results/llmperf" \
+--num-workers 4 \
+--timeout 600 \
+--num-conversations 8 \
+--num-turns 4 \
+--system-prompt-tokens 1000 \
+--prefix-sharing-ratio 0.5 \
+--input-tokens-distribution "lognormal:200:100" \
+--output-tokens-distribution "150" \
+--llm-api "sncloud"
+
+# Notes:
+# 1. Length distributions are formatted as "<distribution>:<mean>[:<stddev>]", with distribution one of
+#   constant, uniform, normal or lognormal, or as a single number for a constant length.
+#   For example:
+#      --input-tokens-distribution "normal:500:50"
+#          OR
+#      --input-tokens-distribution "uniform:500:200"
+#
+# 2. Use --prefix-sharing-ratio 1 for all conversations to share the same system prompt, or 0 for none of them to.
@@ -4,11 +4,20 @@ import os
 
 from dotenv import load_dotenv
 
+from llmperf import common_metrics
+from workload_generator import LengthDistribution
 from performance_evaluation import (
     CustomPerformanceEvaluator,
-    SyntheticPerformanceEvaluator
+    MultiTurnPerformanceEvaluator,
+    SyntheticPerformanceEvaluator,
+    get_geometric_concurrency_levels
 )
 
+SLO_METRIC_OPTIONS = {
+    'e2e': common_metrics.E2E_LAT,
+    'ttft': common_metrics.TTFT,
+}
+
 def str2bool(value: str) -> bool:
     """Transform str to bool
 
@@ -30,6 +39,27 @@ def str2bool(value: str) -> bool:
     else:
         raise argparse.ArgumentTypeError('Boolean value expected.')
 
+def parse_concurrency_levels(value: str) -> list:
+    """Parses the concurrency levels of a sweep
+
+    Args:
+        value (str): either a comma separated list of levels, e.g. "1,2,4,8", or a "min:max" range that is
+            expanded geometrically doubling the level at each step, e.g. "1:64"
+
+    Raises:
+        argparse.ArgumentTypeError: raises when value can't be parsed
+
+    Returns:
+        list: concurrency levels
+    """
+    try:
+        if ':' in value:
+            min_concurrency, max_concurrency = value.split(':')
+            return get_geometric_concurrency_levels(int(min_concurrency), int(max_concurrency))
+        return sorted(set(int(level) for level in value.split(',')))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f'Invalid concurrency levels "{value}": {e}')
+
 def main():
     parser = argparse.ArgumentParser(
         description="""Run a token throughput and latency benchmark. You have the option of running in two different 
@@ -45,15 +75,20 @@ def main():
     # Distinguish between custom and synthetic dataset runs
     parser.add_argument(
         '--mode', 
-        choices=['custom', 'synthetic'], 
+        choices=['custom', 'synthetic', 'multiturn'], 
         required=True,
-        help="""Run mode for the performance evaluation. You have two options to choose from - 'custom' or 'synthetic'.
+        help="""Run mode for the performance evaluation. You have three options to choose from - 'custom', 
+            'synthetic' or 'multiturn'.
             
             Custom: You provide your own dataset via the `input-file-path argument. We will run the performance 
                     evaluation with the provided dataset.
                 
             Synthetic: You provide the number of input tokens, number of output tokens, and number of requests. We 
-                    will generate n input prompts for you where n is the number of requests specified."""
+                    will generate n input prompts for you where n is the number of requests specified.
+                    
+            Multiturn: You provide the number of conversations and turns, the system prompt length and sharing ratio, 
+                    and the input and output length distributions. We will generate multi-turn chat conversations 
+                    with growing context."""
     )
     
     # Required Common Argurments
@@ -95,6 +130,95 @@ def main():
         help="The amount of time to run the load test for. (default: %(default)s)"
     )
 
+    parser.add_argument(
+        '--request-rate',
+        type=float,
+        required=False,
+        default=None,
+        help="""Number of requests per second to send following an open-loop arrival schedule. If set, the number of
+            in-flight requests is driven by the arrival rate instead of by `num-workers`. (default: %(default)s)"""
+    )
+
+    parser.add_argument(
+        '--arrival-distribution',
+        choices=['poisson', 'constant'],
+        required=False,
+        default='poisson',
+        help="""Distribution of the request inter-arrival times when `request-rate` is set. (default: %(default)s)"""
+    )
+
+    parser.add_argument(
+        '--record-connection-setup-time',
+        type=str2bool,
+        required=False,
+        default=False,
+        help="""Whether to record the connection setup time (DNS, TCP and TLS handshake) of each request as a separate 
+            metric, excluding it from TTFT and E2E latency. (default: %(default)s)"""
+    )
+
+    parser.add_argument(
+        '--resume',
+        type=str2bool,
+        required=False,
+        default=False,
+        help="""Whether to resume an interrupted run, skipping the requests already recorded in its individual 
+            responses file in `results-dir`. (default: %(default)s)"""
+    )
+
+    parser.add_argument(
+        '--streaming-percentiles',
+        type=str2bool,
+        required=False,
+        default=False,
+        help="""Whether to show live latency percentiles in the progress bar, from streaming histograms fed as 
+            requests complete. The summary of results streamed to `results-dir` is always built from these 
+            histograms, without reading back the individual responses. (default: %(default)s)"""
+    )
+
+    parser.add_argument(
+        '--timeline-window-s',
+        type=int,
+        required=False,
+        default=1,
+        help="""Size in seconds of the time windows of the throughput timeline saved alongside the summary. 
+            (default: %(default)s)"""
+    )
+
+    parser.add_argument(
+        '--concurrency-sweep',
+        type=parse_concurrency_levels,
+        required=False,
+        default=None,
+        help="""Concurrency levels to sweep, instead of running a single `num-workers` level. Either a comma separated
+            list, e.g. "1,2,4,8", or a "min:max" range expanded geometrically, e.g. "1:64". (default: %(default)s)"""
+    )
+
+    parser.add_argument(
+        '--slo-latency-s',
+        type=float,
+        required=False,
+        default=None,
+        help="""p99 latency SLO in seconds used to find the saturation point of a concurrency sweep.
+            (default: %(default)s)"""
+    )
+
+    parser.add_argument(
+        '--slo-metric',
+        choices=list(SLO_METRIC_OPTIONS.keys()),
+        required=False,
+        default='e2e',
+        help="Latency metric the SLO of a concurrency sweep applies to. (default: %(default)s)"
+    )
+
+    parser.add_argument(
+        '--plateau-tolerance',
+        type=float,
+        required=False,
+        default=0.05,
+        help="""Minimum relative throughput gain between consecutive concurrency levels of a sweep under which 
+            throughput is considered to have plateaued. (default: %(default)s)"""
+    )
+
     parser.add_argument(
         '--metadata', 
         type=str, 
@@ -150,14 +274,112 @@ def main():
             user_metadata=user_metadata,
             input_file_path=args.input_file_path,
             save_response_texts=args.save_llm_responses,
-            llm_api=args.llm_api
+            llm_api=args.llm_api,
+            request_rate=args.request_rate,
+            arrival_distribution=args.arrival_distribution,
+            record_connection_setup_time=args.record_connection_setup_time,
+            resume=args.resume,
+            streaming_percentiles=args.streaming_percentiles,
+            timeline_window_s=args.timeline_window_s,
         )
 
         # Run performance evaluation
-        evaluator.run_benchmark(
-            sampling_params=json.loads(args.sampling_params)
+        if args.concurrency_sweep:
+            evaluator.run_concurrency_sweep(
+                concurrency_levels=args.concurrency_sweep,
+                sampling_params=json.loads(args.sampling_params),
+                slo_latency_s=args.slo_latency_s,
+                slo_metric=SLO_METRIC_OPTIONS[args.slo_metric],
+                plateau_tolerance=args.plateau_tolerance
+            )
+        else:
+            evaluator.run_benchmark(
+                sampling_params=json.loads(args.sampling_params)
+            )
+
+    # Multi-turn workload evaluation path
+    elif args.mode == 'multiturn':
+
+        # Multi-turn workload specific arguments
+        parser.add_argument(
+            '--num-conversations',
+            type=int,
+            default=10,
+            help="The number of conversations of the multi-turn workload. (default: %(default)s)"
+        )
+        parser.add_argument(
+            '--num-turns',
+            type=int,
+            default=4,
+            help="""The number of turns of each conversation. Each turn is a request with all the previous turns of 
+                the conversation as context. (default: %(default)s)"""
+        )
+        parser.add_argument(
+            '--system-prompt-tokens',
+            type=int,
+            default=1000,
+            help="The number of tokens of the system prompt of each conversation. (default: %(default)s)"
+        )
+        parser.add_argument(
+            '--prefix-sharing-ratio',
+            type=float,
+            default=1.0,
+            help="""The share of conversations, between 0 and 1, that use the same system prompt, so their requests 
+                share a common prefix. The rest use a system prompt of their own. (default: %(default)s)"""
+        )
+        parser.add_argument(
+            '--input-tokens-distribution',
+            type=LengthDistribution.parse,
+            default='lognormal:200:100',
+            help="""The distribution of the number of tokens of each user message, formatted as 
+                "<distribution>:<mean>[:<stddev>]" with distribution one of constant, uniform, normal or lognormal, 
+                or as a single number for a constant length. (default: %(default)s)"""
+        )
+        parser.add_argument(
+            '--output-tokens-distribution',
+            type=LengthDistribution.parse,
+            default='150',
+            help="""The distribution of the number of tokens to generate for each turn, in the same format as 
+                `input-tokens-distribution`. (default: %(default)s)"""
+        )
+
+        # Parse arguments and instantiate evaluator
+        args = parser.parse_args()
+        evaluator = MultiTurnPerformanceEvaluator(
+            num_conversations=args.num_conversations,
+            num_turns=args.num_turns,
+            system_prompt_tokens=args.system_prompt_tokens,
+            prefix_sharing_ratio=args.prefix_sharing_ratio,
+            input_length=args.input_tokens_distribution,
+            output_length=args.output_tokens_distribution,
+            model_name=args.model_name,
+            results_dir=args.results_dir,
+            num_workers=args.num_workers,
+            timeout=args.timeout,
+            user_metadata=user_metadata,
+            llm_api=args.llm_api,
+            request_rate=args.request_rate,
+            arrival_distribution=args.arrival_distribution,
+            record_connection_setup_time=args.record_connection_setup_time,
+            resume=args.resume,
+            streaming_percentiles=args.streaming_percentiles,
+            timeline_window_s=args.timeline_window_s,
         )
 
+        # Run performance evaluation
+        if args.concurrency_sweep:
+            evaluator.run_concurrency_sweep(
+                concurrency_levels=args.concurrency_sweep,
+                sampling_params=json.loads(args.sampling_params),
+                slo_latency_s=args.slo_latency_s,
+                slo_metric=SLO_METRIC_OPTIONS[args.slo_metric],
+                plateau_tolerance=args.plateau_tolerance
+            )
+        else:
+            evaluator.run_benchmark(
+                sampling_params=json.loads(args.sampling_params)
+            )
+
     # Synthetic dataset evaluation path
     else:
 
@@ -176,6 +398,13 @@ def main():
             help="""The number of tokens to generate from each llm request. This is the `max_tokens` param for the 
                 completions API. (default: %(default)s)"""
         )
+        parser.add_argument(
+            '--num-unique-prompts', 
+            type=int, 
+            default=1,
+            help="""The number of distinct prompts of the same length to cycle through. Use more than one prompt to 
+                prevent server prefix caching from flattering the results. (default: %(default)s)"""
+        )
         parser.add_argument(
             '--num-requests', 
             type=int, 
@@ -187,21 +416,40 @@ def main():
         # Parse arguments and instantiate evaluator
         args = parser.parse_args()
         evaluator = SyntheticPerformanceEvaluator(
+            num_unique_prompts=args.num_unique_prompts,
             model_name=args.model_name,
             results_dir=args.results_dir,
             num_workers=args.num_workers,
             timeout=args.timeout,
             user_metadata=user_metadata,
-            llm_api=args.llm_api
+            llm_api=args.llm_api,
+            request_rate=args.request_rate,
+            arrival_distribution=args.arrival_distribution,
+            record_connection_setup_time=args.record_connection_setup_time,
+            resume=args.resume,
+            streaming_percentiles=args.streaming_percentiles,
+            timeline_window_s=args.timeline_window_s,
         )
 
         # Run performance evaluation
-        evaluator.run_benchmark(
-            num_input_tokens=args.num_input_tokens,
-            num_output_tokens=args.num_output_tokens,
-            num_requests=args.num_requests,
-            sampling_params=json.loads(args.sampling_params)
-        )
+        if args.concurrency_sweep:
+            evaluator.run_concurrency_sweep(
+                concurrency_levels=args.concurrency_sweep,
+                num_input_tokens=args.num_input_tokens,
+                num_output_tokens=args.num_output_tokens,
+                num_requests=args.num_requests,
+                sampling_params=json.loads(args.sampling_params),
+                slo_latency_s=args.slo_latency_s,
+                slo_metric=SLO_METRIC_OPTIONS[args.slo_metric],
+                plateau_tolerance=args.plateau_tolerance
+            )
+        else:
+            evaluator.run_benchmark(
+                num_input_tokens=args.num_input_tokens,
+                num_output_tokens=args.num_output_tokens,
+                num_requests=args.num_requests,
+                sampling_params=json.loads(args.sampling_params)
+            )
     
 if __name__ == "__main__":
     load_dotenv("../.env", override=True)
@@ -9,6 +9,12 @@ ERROR_RATE = "error_rate"
 NUM_REQ_STARTED = "num_requests_started"
 REQ_START_TIME = "start_time"
 REQ_END_TIME = "end_time"
+REQ_START_TIMESTAMP = "start_timestamp"
+REQ_END_TIMESTAMP = "end_timestamp"
+REQ_IDX = "request_idx"
+CONVERSATION_IDX = "conversation_idx"
+TURN_IDX = "turn_idx"
+SHARES_SYSTEM_PROMPT = "shares_system_prompt"
 BATCH_SIZE_USED = "batch_size_used"
 QUEUE_TIME = "queue_time"
 
@@ -18,9 +24,11 @@ E2E_LAT = "client_end_to_end_latency_s"
 REQ_OUTPUT_THROUGHPUT = "client_output_token_per_s_per_request"
 TOTAL_TOKEN_THROUGHPUT = "client_total_tokens_per_sec_s_per_request"
 OUTPUT_THROUGHPUT = "client_mean_output_token_per_s"
+STEADY_STATE_OUTPUT_THROUGHPUT = "client_steady_state_output_token_per_s"
 NUM_INPUT_TOKENS = "number_input_tokens"
 NUM_OUTPUT_TOKENS = "number_output_tokens"
 NUM_TOTAL_TOKENS = "number_total_tokens"
+CONNECTION_SETUP_TIME = "client_connection_setup_time_s"
 
 # Server-side metrics
 TTFT_SERVER = "server_ttft_s"
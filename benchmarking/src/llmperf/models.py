@@ -13,7 +13,11 @@ class RequestConfig(BaseModel):
         llm_api: The name of the LLM API to send the request to.
         mode: API mode (stream or batch)
         num_concurrent_workers: number of concurrent workers
+        record_connection_setup_time: whether to record connection setup time as a separate metric, excluding it from
+            TTFT and E2E latency
         metadata: Additional metadata to attach to the request for logging or validation purposes.
+        messages: Chat messages sent to chat endpoints instead of the prompt as a single user message, so the
+            endpoint applies the chat template itself.
     """
 
     model: str
@@ -22,7 +26,9 @@ class RequestConfig(BaseModel):
     llm_api: Optional[str] = None
     is_stream_mode: Optional[bool] = None
     num_concurrent_workers: int = None
+    record_connection_setup_time: bool = False
     metadata: Optional[Dict[str, Any]] = None
+    messages: Optional[List[Dict[str, str]]] = None
 
 
 class LLMResponse(BaseModel):
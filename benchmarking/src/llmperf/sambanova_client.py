@@ -3,10 +3,17 @@ import abc
 import sys
 import json
 import time
+import asyncio
+import threading
+import aiohttp
 import requests
 import sseclient
+import urllib3
 from math import isclose
 from datetime import datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
 
 sys.path.append("./src")
 sys.path.append("./src/llmperf")
@@ -21,6 +28,113 @@ import warnings
 
 warnings.filterwarnings("ignore")
 
+# Time spent opening new connections in the current thread, reset before each request
+_connection_timings = threading.local()
+
+# Shared http sessions, one per endpoint and pool size
+_sessions: Dict[Tuple[str, int], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def _reset_connection_setup_time() -> None:
+    """Resets the connection setup time recorded for the current thread"""
+    _connection_timings.setup_time = 0.0
+
+
+def _get_connection_setup_time() -> float:
+    """Gets the connection setup time recorded for the current thread since the last reset
+
+    Returns:
+        float: time spent in DNS resolution, TCP connection and TLS handshake
+    """
+    return getattr(_connection_timings, "setup_time", 0.0)
+
+
+class _TimedHTTPConnection(urllib3.connection.HTTPConnection):
+    """HTTP connection that records the time it takes to connect"""
+
+    def connect(self) -> None:
+        connect_start_time = time.monotonic()
+        super().connect()
+        _connection_timings.setup_time = _get_connection_setup_time() + time.monotonic() - connect_start_time
+
+
+class _TimedHTTPSConnection(urllib3.connection.HTTPSConnection):
+    """HTTPS connection that records the time it takes to connect, including the TLS handshake"""
+
+    def connect(self) -> None:
+        connect_start_time = time.monotonic()
+        super().connect()
+        _connection_timings.setup_time = _get_connection_setup_time() + time.monotonic() - connect_start_time
+
+
+class _TimedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """HTTP adapter whose connection pools record connection setup times"""
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def get_session(url: str, pool_size: int) -> requests.Session:
+    """Gets the shared http session for an endpoint, so connections are kept alive and reused across requests
+    instead of paying a new TCP and TLS handshake on each one. The session is created on first use.
+
+    Args:
+        url (str): endpoint url
+        pool_size (int): maximum number of connections kept open to the endpoint,
+            usually the number of concurrent workers
+
+    Returns:
+        requests.Session: shared session
+    """
+    url_parts = urlsplit(url)
+    key = (f"{url_parts.scheme}://{url_parts.netloc}", max(pool_size, 1))
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            adapter = _TimedHTTPAdapter(pool_connections=1, pool_maxsize=key[1])
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[key] = session
+    return session
+
+
+def get_connection_timing_trace_config() -> aiohttp.TraceConfig:
+    """Builds an aiohttp trace config that records the connection setup time of a request in the
+    `trace_request_ctx` dictionary passed to the request, under the `connection_setup_time` key
+
+    Returns:
+        aiohttp.TraceConfig: trace config to pass to the client session
+    """
+
+    async def on_connection_create_start(session, trace_config_ctx, params) -> None:
+        trace_config_ctx.connection_create_start_time = time.monotonic()
+
+    async def on_connection_create_end(session, trace_config_ctx, params) -> None:
+        if trace_config_ctx.trace_request_ctx is not None:
+            trace_config_ctx.trace_request_ctx["connection_setup_time"] = (
+                time.monotonic() - trace_config_ctx.connection_create_start_time
+            )
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+
 class BaseAPIEndpoint(abc.ABC):
     def __init__(
         self,
@@ -42,6 +156,17 @@ class BaseAPIEndpoint(abc.ABC):
     def _get_json_data(self, *args, **kwargs):
         pass
     
+    def _get_session(self, url: str) -> requests.Session:
+        """Gets the shared http session for the endpoint, sized to the number of concurrent workers
+
+        Args:
+            url (str): URL being used for the API call
+
+        Returns:
+            requests.Session: shared session
+        """
+        return get_session(url, self.request_config.num_concurrent_workers or 1)
+    
     def _get_token_length(self, input_text: str) -> int:
         """Gets the token length of a piece of text
 
@@ -54,40 +179,84 @@ class BaseAPIEndpoint(abc.ABC):
         return len(self.tokenizer.encode(input_text))
     
     
-    def _calculate_tpot_from_streams_after_first(self, chunks_received: list, chunks_timings: list) -> float:
+    def _count_stream_tokens(
+        self, chunks_received: list, server_num_output_tokens: Optional[int] = None
+    ) -> Tuple[int, int]:
+        """Counts the tokens in the first streaming event and in all the events coming after it.
+        This is done once the request is complete, so no tokenization happens while timing the stream.
+        If the server reports the number of output tokens, only the first event is tokenized.
+        Otherwise all the events are tokenized in a single batched call.
+
+        Args:
+            chunks_received (list): complete list of events coming from streaming response
+            server_num_output_tokens (Optional[int], optional): number of output tokens reported by the server.
+                Defaults to None.
+
+        Returns:
+            Tuple[int, int]: number of tokens in the first event, and number of tokens in the events after it
+        """
+        
+        if not chunks_received:
+            return 0, 0
+        
+        if server_num_output_tokens is not None:
+            chunks_num_tokens = self._get_chunks_token_lengths(chunks_received[:1])
+            return chunks_num_tokens[0], max(server_num_output_tokens - chunks_num_tokens[0], 0)
+        
+        chunks_num_tokens = self._get_chunks_token_lengths(chunks_received)
+        return chunks_num_tokens[0], sum(chunks_num_tokens[1:])
+    
+    def _get_chunks_token_lengths(self, chunks: list) -> list:
+        """Gets the token length of each streamed chunk with a single batched tokenizer call.
+        Special tokens are not added, since chunks are pieces of the same generated text.
+
+        Args:
+            chunks (list): streamed text chunks
+
+        Returns:
+            list: number of tokens of each chunk
+        """
+        chunks_input_ids = self.tokenizer(list(chunks), add_special_tokens=False)["input_ids"]
+        return [len(input_ids) for input_ids in chunks_input_ids]
+    
+    def _calculate_tpot_from_streams_after_first(self, tokens_after_first_chunk: int, chunks_timings: list) -> float:
         """Calculates Time per Output Token (TPOT) based on the streaming events coming after the first one.
         In general, the way to calculate this metric is: time_to_generate_tokens/number_of_tokens_generated
 
         Args:
-            chunks_received (list): complete list of events coming from streaming response
+            tokens_after_first_chunk (int): number of tokens received in the events after the first one
             chunks_timings (list): complete list of timings that each event took to process
 
         Returns:
             float: calculated tpot 
         """
         
-        # Calculate tokens
-        total_tokens_received_after_first_chunk = sum(
-            self._get_token_length(c) for c in chunks_received[1:]
-        )
-        
         # Calculate time
         total_time_to_receive_tokens_after_first_chunk = sum(chunks_timings[1:])
         
         # Calculate tpot
         tpot = (
             total_time_to_receive_tokens_after_first_chunk
-            / total_tokens_received_after_first_chunk
+            / tokens_after_first_chunk
         )
         
         return tpot
     
-    def _calculate_ttft_from_streams(self, chunks_received: list, chunks_timings: list, total_request_time: int) -> float:
+    def _calculate_ttft_from_streams(
+        self,
+        number_chunks_recieved: int,
+        tokens_in_first_chunk: int,
+        tokens_after_first_chunk: int,
+        chunks_timings: list,
+        total_request_time: int,
+    ) -> float:
         """Calculates Time to First Token (TTFT) based on the streaming events coming from the response.
         If there are enough streaming events, the formula to calculate ttft is: time_first_chunk - (tokens_first_chunk - 1) * tpot
 
         Args:
-            chunks_received (list): list of events having the streaming tokens
+            number_chunks_recieved (int): number of events having the streaming tokens
+            tokens_in_first_chunk (int): number of tokens in the first event
+            tokens_after_first_chunk (int): number of tokens in the events after the first one
             chunks_timings (list): list of timings for each event
             total_request_time (int): total request time calculated from client side
 
@@ -95,17 +264,17 @@ class BaseAPIEndpoint(abc.ABC):
             float: calculated ttft
         """
         
-        number_chunks_recieved = len(chunks_received)
-        
         # if one or no chunks were recieved
         if number_chunks_recieved <= 1:
             ttft = total_request_time
+        # if no tokens were received after the first chunk tpot can't be computed
+        elif tokens_after_first_chunk == 0:
+            ttft = chunks_timings[0]
         else:
             # calculate tpot
-            tpot = self._calculate_tpot_from_streams_after_first(chunks_received, chunks_timings)
+            tpot = self._calculate_tpot_from_streams_after_first(tokens_after_first_chunk, chunks_timings)
             # calculate ttft
-            total_tokens_in_first_chunk = self._get_token_length(chunks_received[0])
-            ttft = chunks_timings[0] - (total_tokens_in_first_chunk - 1) * tpot  
+            ttft = chunks_timings[0] - (tokens_in_first_chunk - 1) * tpot  
         return ttft
     
     def _populate_client_metrics(
@@ -216,6 +385,130 @@ class BaseAPIEndpoint(abc.ABC):
         
         return metrics
 
+    def _record_start_time(self, metrics: dict) -> float:
+        """Records the start time of the request in the metrics, as a timestamp and as a time of day for display
+
+        Args:
+            metrics (dict): basic metrics dictionary
+
+        Returns:
+            float: monotonic time when the request was sent
+        """
+        now = datetime.now()
+        metrics[common_metrics.REQ_START_TIME] = now.strftime("%H:%M:%S")
+        metrics[common_metrics.REQ_START_TIMESTAMP] = now.timestamp()
+        return time.monotonic()
+
+    def _record_end_time(self, metrics: dict) -> float:
+        """Records the end time of the request in the metrics, as a timestamp and as a time of day for display
+
+        Args:
+            metrics (dict): basic metrics dictionary
+
+        Returns:
+            float: monotonic time when the response was complete
+        """
+        now = datetime.now()
+        metrics[common_metrics.REQ_END_TIME] = now.strftime("%H:%M:%S")
+        metrics[common_metrics.REQ_END_TIMESTAMP] = now.timestamp()
+        return time.monotonic()
+
+    def _finalize_metrics(
+        self,
+        metrics: dict,
+        start_time: float,
+        end_time: float,
+        chunks_received: list,
+        chunks_timings: list,
+        generated_text: str,
+        response_dict: dict,
+        connection_setup_time: float = 0.0,
+    ) -> dict:
+        """Closes the request timing window and populates server and client metrics from the streamed response
+
+        Args:
+            metrics (dict): basic metrics dictionary
+            start_time (float): monotonic time when the request was sent
+            end_time (float): monotonic time when the response was complete
+            chunks_received (list): list of events having the streaming tokens
+            chunks_timings (list): list of timings for each event
+            generated_text (str): complete generated text
+            response_dict (dict): dict data with server performance metrics
+            connection_setup_time (float, optional): time spent opening a new connection for the request. If
+                connection setup time is recorded, it is reported separately and excluded from TTFT and E2E latency.
+                Defaults to 0.0.
+
+        Returns:
+            dict: updated metrics dictionary
+        """
+        
+        total_request_time = end_time - start_time
+        
+        if self.request_config.record_connection_setup_time:
+            metrics[common_metrics.CONNECTION_SETUP_TIME] = connection_setup_time
+            total_request_time -= connection_setup_time
+            if chunks_timings:
+                chunks_timings[0] -= connection_setup_time
+        
+        # Populate server and client metrics
+        server_metrics = self._populate_server_metrics(response_dict, metrics)
+        server_num_output_tokens = server_metrics[common_metrics.NUM_OUTPUT_TOKENS_SERVER]
+        
+        # Count streamed tokens now that the request is complete, using server counts when available
+        tokens_in_first_chunk, tokens_after_first_chunk = self._count_stream_tokens(
+            chunks_received, server_num_output_tokens
+        )
+        number_chunks_recieved = len(chunks_received)
+        ttft = self._calculate_ttft_from_streams(
+            number_chunks_recieved,
+            tokens_in_first_chunk,
+            tokens_after_first_chunk,
+            chunks_timings,
+            total_request_time,
+        )
+        
+        prompt_len  = self.request_config.prompt_tuple[1]
+        if server_num_output_tokens is not None:
+            num_output_tokens = server_num_output_tokens
+        elif number_chunks_recieved:
+            num_output_tokens = tokens_in_first_chunk + tokens_after_first_chunk
+        else:
+            num_output_tokens = self._get_token_length(generated_text)
+        metrics = self._populate_client_metrics(
+            prompt_len,
+            num_output_tokens,
+            ttft,
+            total_request_time,
+            server_metrics,
+            number_chunks_recieved,
+        )
+        
+        return metrics
+
+
+async def _aiter_sse_data(response: aiohttp.ClientResponse):
+    """Yields the data field of each server-sent event from an aiohttp streaming response
+
+    Args:
+        response (aiohttp.ClientResponse): streaming response
+
+    Yields:
+        str: event data
+    """
+    data_lines = []
+    async for raw_line in response.content:
+        line = raw_line.decode("utf-8").rstrip("\r\n")
+        # a blank line dispatches the event
+        if not line:
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].lstrip(" "))
+    if data_lines:
+        yield "\n".join(data_lines)
+
+
 class SambaStudioAPI(BaseAPIEndpoint):
     
     def __init__(self, *args, **kwargs):
@@ -286,6 +579,22 @@ class SambaStudioAPI(BaseAPIEndpoint):
         return data
     
     
+    def _get_stream_response(self, data: dict, url: str) -> dict:
+        """Gets the response item of a streamed SambaStudio chunk
+
+        Args:
+            data (dict): parsed streamed chunk
+            url (str): URL being used for the API call
+
+        Returns:
+            dict: response item with the stream token or the final completion and metrics
+        """
+        # fetch generated text and metrics for api v2
+        if "/api/v2" in url.lower().strip():
+            return data["result"]["items"][0]["value"]
+        # support to fetch generated text and metrics for api v1
+        return data["result"]["responses"][0]
+    
     def compute_metrics(self, metrics: dict) -> tuple[dict, str]:
         """Computes metrics for SambaStudio API endpoint
 
@@ -310,76 +619,123 @@ class SambaStudioAPI(BaseAPIEndpoint):
         chunks_timings = []
         
         # Start measuring time
-        metrics[common_metrics.REQ_START_TIME] = datetime.now().strftime("%H:%M:%S")
-        start_time = chunk_start_time = time.monotonic()
+        start_time = chunk_start_time = self._record_start_time(metrics)
 
         if self.request_config.is_stream_mode:
 
-            with requests.post(
+            _reset_connection_setup_time()
+            with self._get_session(url).post(
                 url, headers=headers, json=json_data, stream=self.request_config.is_stream_mode
             ) as response:
                 if response.status_code != 200:
                     response.raise_for_status()
                     
-                # fetch generated text and metrics for api v2
-                if "/api/v2" in url.lower().strip():
-                    
-                    for chunk_orig in response.iter_lines(chunk_size=None):
-                        chunk = chunk_orig.strip()
-                        data = json.loads(chunk)
-                    
-                        completion = data["result"]["items"][0]["value"]["is_last_response"]
-                        chunks_timings.append(time.monotonic() - chunk_start_time)
-                        chunk_start_time = time.monotonic()
-                        if completion is False:
-                            chunks_received.append(data["result"]["items"][0]["value"]["stream_token"])
-                            continue
-                        else:
-                            generated_text = data["result"]["items"][0]["value"]["completion"]
-                            response_dict = data["result"]["items"][0]["value"]
+                for chunk_orig in response.iter_lines(chunk_size=None):
+                    chunk = chunk_orig.strip()
+                    data = json.loads(chunk)
+                    stream_response = self._get_stream_response(data, url)
+
+                    completion = stream_response["is_last_response"]
+                    chunks_timings.append(time.monotonic() - chunk_start_time)
+                    chunk_start_time = time.monotonic()
+                    if completion is False:
+                        chunks_received.append(stream_response["stream_token"])
+                        continue
+                    else:
+                        generated_text = stream_response["completion"]
+                        response_dict = stream_response
                         break
-                # support to fetch generated text and metrics for api v1
-                else:
-                
-                    for chunk_orig in response.iter_lines(chunk_size=None):
-                        chunk = chunk_orig.strip()
-                        data = json.loads(chunk)
-
-                        completion = data["result"]["responses"][0]["is_last_response"]
-                        chunks_timings.append(time.monotonic() - chunk_start_time)
-                        chunk_start_time = time.monotonic()
-                        if completion is False:
-                            chunks_received.append(data["result"]["responses"][0]["stream_token"])
-                            continue
-                        else:
-                            generated_text = data["result"]["responses"][0]["completion"]
-                            response_dict = data["result"]["responses"][0]
-                            break
         else:
             # TODO: support non-streaming mode
             raise ValueError("Streaming mode required")
         
         # End measuring time
-        metrics[common_metrics.REQ_END_TIME] = datetime.now().strftime("%H:%M:%S")  
-        total_request_time = time.monotonic() - start_time
-        ttft = self._calculate_ttft_from_streams(chunks_received, chunks_timings, total_request_time)
+        end_time = self._record_end_time(metrics)
+        metrics = self._finalize_metrics(
+            metrics,
+            start_time,
+            end_time,
+            chunks_received,
+            chunks_timings,
+            generated_text,
+            response_dict,
+            _get_connection_setup_time(),
+        )
+
+        return metrics, generated_text   
     
-        # Populate server and client metrics
-        prompt_len  = self.request_config.prompt_tuple[1]
-        number_chunks_recieved = len(chunks_received)
+    async def acompute_metrics(self, metrics: dict, session: aiohttp.ClientSession) -> tuple[dict, str]:
+        """Computes metrics for SambaStudio API endpoint without blocking the event loop
+
+        Args:
+            metrics (dict): basic metrics dictionary
+            session (aiohttp.ClientSession): async http session shared across in-flight requests
+
+        Raises:
+            ValueError: raises when streaming is not selected
+
+        Returns:
+            tuple[dict, str]: tuple containing the metrics structure with server and client side values, and the
+                complete generated text
+        """
         
-        num_output_tokens = self._get_token_length(generated_text)
-        server_metrics = self._populate_server_metrics(response_dict, metrics)
-        metrics = self._populate_client_metrics(
-            prompt_len,
-            num_output_tokens,
-            ttft,
-            total_request_time,
-            server_metrics,
-            number_chunks_recieved,
+        if not self.request_config.is_stream_mode:
+            raise ValueError("Streaming mode required")
+        
+        # Get API request components
+        url = self._get_url()
+        headers = self._get_headers()
+        json_data = self._get_json_data(url)
+        
+        # Set variables
+        generated_text = ""
+        chunks_received = []
+        chunks_timings = []
+        
+        # Start measuring time
+        start_time = chunk_start_time = self._record_start_time(metrics)
+
+        trace_request_ctx = {}
+        async with session.post(
+            url, headers=headers, json=json_data, trace_request_ctx=trace_request_ctx
+        ) as response:
+            if response.status != 200:
+                response.raise_for_status()
+            
+            async for chunk_orig in response.content:
+                chunk = chunk_orig.strip()
+                if not chunk:
+                    continue
+                data = json.loads(chunk)
+                stream_response = self._get_stream_response(data, url)
+                
+                completion = stream_response["is_last_response"]
+                chunks_timings.append(time.monotonic() - chunk_start_time)
+                chunk_start_time = time.monotonic()
+                if completion is False:
+                    chunks_received.append(stream_response["stream_token"])
+                    continue
+                else:
+                    generated_text = stream_response["completion"]
+                    response_dict = stream_response
+                    break
+        
+        # End measuring time
+        end_time = self._record_end_time(metrics)
+        # Count tokens in a worker thread, so that tokenization doesn't stall the other streams
+        metrics = await asyncio.to_thread(
+            self._finalize_metrics,
+            metrics,
+            start_time,
+            end_time,
+            chunks_received,
+            chunks_timings,
+            generated_text,
+            response_dict,
+            trace_request_ctx.get("connection_setup_time", 0.0),
         )
 
-        return metrics, generated_text   
+        return metrics, generated_text
             
 class FastAPI(BaseAPIEndpoint):
     
@@ -419,7 +775,8 @@ class FastAPI(BaseAPIEndpoint):
             # TODO: support not streaming mode
             raise ValueError("Streaming mode required")
                     
-        data = {"messages": [{"role": "user", "content": prompt}]}
+        messages = self.request_config.messages or [{"role": "user", "content": prompt}]
+        data = {"messages": messages}
         data.update(sampling_params)
         
         return data
@@ -445,11 +802,11 @@ class FastAPI(BaseAPIEndpoint):
         events_timings = []
         
         # Start measuring time
-        metrics[common_metrics.REQ_START_TIME] = datetime.now().strftime("%H:%M:%S")
-        start_time = event_start_time = time.monotonic()
+        start_time = event_start_time = self._record_start_time(metrics)
 
 
-        with requests.post(
+        _reset_connection_setup_time()
+        with self._get_session(url).post(
             url, headers=headers, json=json_data, stream=self.request_config.is_stream_mode
         ) as response:
             
@@ -482,23 +839,16 @@ class FastAPI(BaseAPIEndpoint):
                     raise Exception(f"Error: {e} at streamed event: {event.data}")
         
         # End measuring time
-        metrics[common_metrics.REQ_END_TIME] = datetime.now().strftime("%H:%M:%S")  
-        total_request_time = time.monotonic() - start_time
-        ttft = self._calculate_ttft_from_streams(events_received, events_timings, total_request_time)
-    
-        # Populate server and client metrics
-        prompt_len  = self.request_config.prompt_tuple[1]
-        number_chunks_recieved = len(events_received)
-        
-        num_output_tokens = self._get_token_length(generated_text)
-        server_metrics = self._populate_server_metrics(response_dict, metrics)
-        metrics = self._populate_client_metrics(
-            prompt_len,
-            num_output_tokens,
-            ttft,
-            total_request_time,
-            server_metrics,
-            number_chunks_recieved,
+        end_time = self._record_end_time(metrics)
+        metrics = self._finalize_metrics(
+            metrics,
+            start_time,
+            end_time,
+            events_received,
+            events_timings,
+            generated_text,
+            response_dict,
+            _get_connection_setup_time(),
         )
 
         return metrics, generated_text   
@@ -542,7 +892,8 @@ class SambaNovaCloudAPI(BaseAPIEndpoint):
             # TODO: support not streaming mode
             raise ValueError("Streaming mode required")
                     
-        data = {"messages": [{"role": "user", "content": prompt}]}
+        messages = self.request_config.messages or [{"role": "user", "content": prompt}]
+        data = {"messages": messages}
         data.update(sampling_params)
         
         return data
@@ -568,11 +919,11 @@ class SambaNovaCloudAPI(BaseAPIEndpoint):
         events_timings = []
         
         # Start measuring time
-        metrics[common_metrics.REQ_START_TIME] = datetime.now().strftime("%H:%M:%S")
-        start_time = event_start_time = time.monotonic()
+        start_time = event_start_time = self._record_start_time(metrics)
 
 
-        with requests.post(
+        _reset_connection_setup_time()
+        with self._get_session(url).post(
             url, headers=headers, json=json_data, stream=self.request_config.is_stream_mode
         ) as response:
             
@@ -605,27 +956,115 @@ class SambaNovaCloudAPI(BaseAPIEndpoint):
                     raise Exception(f"Error: {e} at streamed event: {event.data}")
         
         # End measuring time
-        metrics[common_metrics.REQ_END_TIME] = datetime.now().strftime("%H:%M:%S")  
-        total_request_time = time.monotonic() - start_time
-        ttft = self._calculate_ttft_from_streams(events_received, events_timings, total_request_time)
-    
-        # Populate server and client metrics
-        prompt_len  = self.request_config.prompt_tuple[1]
-        number_chunks_recieved = len(events_received)
-        
-        num_output_tokens = self._get_token_length(generated_text)
-        server_metrics = self._populate_server_metrics(response_dict, metrics)
-        metrics = self._populate_client_metrics(
-            prompt_len,
-            num_output_tokens,
-            ttft,
-            total_request_time,
-            server_metrics,
-            number_chunks_recieved,
+        end_time = self._record_end_time(metrics)
+        metrics = self._finalize_metrics(
+            metrics,
+            start_time,
+            end_time,
+            events_received,
+            events_timings,
+            generated_text,
+            response_dict,
+            _get_connection_setup_time(),
         )
 
         return metrics, generated_text   
 
+    async def acompute_metrics(self, metrics: dict, session: aiohttp.ClientSession) -> tuple[dict, str]:
+        """Computes metrics for SambaNovaCloud endpoint without blocking the event loop
+
+        Args:
+            metrics (dict): basic metrics dictionary
+            session (aiohttp.ClientSession): async http session shared across in-flight requests
+
+        Returns:
+            tuple[dict, str]: tuple containing the metrics structure with server and client side values, and the
+                complete generated text
+        """
+        
+        # Get API request components
+        url = self._get_url()
+        headers = self._get_headers()
+        json_data = self._get_json_data()
+        
+        # Set variables
+        generated_text = ""
+        events_received = []
+        events_timings = []
+        
+        # Start measuring time
+        start_time = event_start_time = self._record_start_time(metrics)
+
+        trace_request_ctx = {}
+        async with session.post(
+            url, headers=headers, json=json_data, trace_request_ctx=trace_request_ctx
+        ) as response:
+            
+            if response.status != 200:
+                response.raise_for_status()
+            
+            async for event_data in _aiter_sse_data(response):
+                try:
+                    # check streaming events before last stream returns DONE
+                    if event_data != "[DONE]":
+                        data = json.loads(event_data)
+                        # if events don't contain "usage" key, which only shows up in stream returning performance
+                        # metrics
+                        if data.get("usage") is None:
+                            # if streams still don't hit a finish reason
+                            if data['choices'][0]["finish_reason"] is None:
+                                # log s timings
+                                events_timings.append(time.monotonic() - event_start_time)
+                                event_start_time = time.monotonic()
+                                # concatenate streaming text pieces
+                                stream_content = data['choices'][0]["delta"]["content"]
+                                events_received.append(stream_content)
+                                generated_text += stream_content
+                        # process streaming chunk when performance usage is provided
+                        else:
+                            response_dict = data["usage"]
+                except Exception as e:
+                    raise Exception(f"Error: {e} at streamed event: {event_data}")
+        
+        # End measuring time
+        end_time = self._record_end_time(metrics)
+        # Count tokens in a worker thread, so that tokenization doesn't stall the other streams
+        metrics = await asyncio.to_thread(
+            self._finalize_metrics,
+            metrics,
+            start_time,
+            end_time,
+            events_received,
+            events_timings,
+            generated_text,
+            response_dict,
+            trace_request_ctx.get("connection_setup_time", 0.0),
+        )
+
+        return metrics, generated_text
+
+
+def _build_error_metrics(metrics: dict, e: Exception) -> dict:
+    """Records the error code and message of a failed LLM request in the metrics dictionary
+
+    Args:
+        metrics (dict): metrics dictionary
+        e (Exception): exception raised by the request
+
+    Returns:
+        dict: updated metrics dictionary
+    """
+    error_code = getattr(
+        e,
+        "code",
+        "Error while running LLM API calls. Check your model name, LLM API type, env variables and endpoint status",
+    )
+    error_message = str(e)
+    metrics[common_metrics.ERROR_MSG] = error_message
+    metrics[common_metrics.ERROR_CODE] = error_code
+    
+    return metrics
+
 
 def llm_request(request_config: RequestConfig, tokenizer: AutoTokenizer) -> tuple:
     """Makes a single completion request to a LLM API
@@ -661,15 +1100,52 @@ def llm_request(request_config: RequestConfig, tokenizer: AutoTokenizer) -> tupl
         return metrics, generated_text, request_config
 
     except Exception as e:  
-         
-        error_code = getattr(
-            e,
-            "code",
-            "Error while running LLM API calls. Check your model name, LLM API type, env variables and endpoint status",
-        )
-        error_message = str(e)
-        metrics[common_metrics.ERROR_MSG] = error_message
-        metrics[common_metrics.ERROR_CODE] = error_code
+        
+        metrics = _build_error_metrics(metrics, e)
+        
+        return metrics, "", request_config
+
+
+async def allm_request(
+    request_config: RequestConfig, tokenizer: AutoTokenizer, session: aiohttp.ClientSession
+) -> tuple:
+    """Makes a single completion request to a LLM API from an asyncio event loop, so many requests can be in flight
+    from a single thread
+
+    Args:
+        request_config (RequestConfig): config options including user's prompt and LLM parameters
+        tokenizer (AutoTokenizer): tokenizer for counting tokens
+        session (aiohttp.ClientSession): async http session shared across in-flight requests
+
+    Returns:
+        tuple: Metrics about the performance charateristics of the request.
+        The text generated by the request to the LLM API.
+        The request_config used to make the request. This is mainly for logging purposes.
+    """
+
+    generated_text = ""
+    metrics = {}
+    metrics[common_metrics.ERROR_CODE] = None
+    metrics[common_metrics.ERROR_MSG] = ""
+    
+    try:
+        
+        if request_config.llm_api == "sncloud":
+            sncloud_client = SambaNovaCloudAPI(request_config, tokenizer)
+            metrics, generated_text = await sncloud_client.acompute_metrics(metrics, session)
+        
+        elif request_config.llm_api == "sambastudio":
+            sambastudio_client = SambaStudioAPI(request_config, tokenizer)
+            metrics, generated_text = await sambastudio_client.acompute_metrics(metrics, session)
+        
+        else:
+            raise ValueError(f"llm_api parameter with value {request_config.llm_api} is not valid.")
+        
+        return metrics, generated_text, request_config
+
+    except Exception as e:
+        
+        metrics = _build_error_metrics(metrics, e)
         
         return metrics, "", request_config
 
@@ -0,0 +1,153 @@
+import math
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from llmperf import common_metrics
+
+
+class StreamingHistogram:
+    """Streaming histogram with logarithmic buckets, in the spirit of HdrHistogram. Every recorded value falls in
+    a bucket whose bounds are within `relative_accuracy` of each other, so percentiles are estimated with that
+    relative error, while memory grows with the dynamic range of the values and not with their count.
+    Mean, min, max and standard deviation are tracked exactly.
+
+    Args:
+        relative_accuracy (float, optional): relative error of the percentile estimates. Defaults to 0.01.
+        min_value (float, optional): values at or below it are counted in a single zero bucket. Defaults to 1e-6.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be between 0 and 1, got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._bucket_counts: Dict[int, int] = Counter()
+        self._zero_count = 0
+
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._mean = 0.0
+        self._sum_squared_diffs = 0.0
+
+    def record(self, value: Optional[float]) -> None:
+        """Records a value, ignoring missing ones
+
+        Args:
+            value (Optional[float]): value to record
+        """
+        if value is None or math.isnan(value):
+            return
+
+        if value <= self.min_value:
+            self._zero_count += 1
+        else:
+            self._bucket_counts[math.ceil(math.log(value) / self._log_gamma)] += 1
+
+        # Welford's online algorithm for mean and variance
+        self.count += 1
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._sum_squared_diffs += delta * (value - self._mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimates the value at quantile `q`
+
+        Args:
+            q (float): quantile, between 0 and 1
+
+        Returns:
+            float: estimated value, NaN if no values were recorded
+        """
+        if not self.count:
+            return math.nan
+
+        rank = q * (self.count - 1)
+        cumulative_count = self._zero_count
+        if rank < cumulative_count:
+            return self.min
+
+        for bucket_idx in sorted(self._bucket_counts):
+            cumulative_count += self._bucket_counts[bucket_idx]
+            if rank < cumulative_count:
+                # Bucket midpoint, within the relative accuracy of every value in the bucket
+                value = 2 * self._gamma**bucket_idx / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.count else math.nan
+
+    @property
+    def stddev(self) -> float:
+        """Sample standard deviation, matching pandas' default"""
+        return math.sqrt(self._sum_squared_diffs / (self.count - 1)) if self.count > 1 else math.nan
+
+
+class StreamingMetricsAccumulator:
+    """Accumulates request metrics as each request completes, keeping a streaming histogram per metric and
+    request counters instead of the raw rows. It's safe to use from concurrent workers.
+
+    Args:
+        metric_names (List[str]): metrics to keep histograms for
+        relative_accuracy (float, optional): relative error of the percentile estimates. Defaults to 0.01.
+    """
+
+    def __init__(self, metric_names: List[str], relative_accuracy: float = 0.01) -> None:
+        self.histograms = {
+            metric_name: StreamingHistogram(relative_accuracy) for metric_name in metric_names
+        }
+        self.num_requests_started = 0
+        self.error_code_counts: Dict[Any, int] = Counter()
+
+        # Requests recorded by a previous run that is being resumed are excluded from the throughput counters
+        self.num_run_completed_requests = 0
+        self.run_output_tokens = 0
+
+        self._lock = threading.Lock()
+
+    def add(self, metrics: Dict[str, Any], is_resumed: bool = False) -> None:
+        """Adds the metrics of a request
+
+        Args:
+            metrics (Dict[str, Any]): request metrics
+            is_resumed (bool, optional): whether the request was recorded by a previous run that is being resumed.
+                Defaults to False.
+        """
+        with self._lock:
+            self.num_requests_started += 1
+            error_code = metrics.get(common_metrics.ERROR_CODE)
+            if error_code is not None:
+                self.error_code_counts[error_code] += 1
+                return
+
+            for metric_name, histogram in self.histograms.items():
+                histogram.record(metrics.get(metric_name))
+
+            if not is_resumed:
+                self.num_run_completed_requests += 1
+                self.run_output_tokens += metrics.get(common_metrics.NUM_OUTPUT_TOKENS) or 0
+
+    @property
+    def num_completed_requests(self) -> int:
+        return self.num_requests_started - sum(self.error_code_counts.values())
+
+    def quantiles(self, metric_name: str, quantiles: List[float]) -> Dict[float, float]:
+        """Estimates the quantiles of a metric
+
+        Args:
+            metric_name (str): metric name
+            quantiles (List[float]): quantiles, between 0 and 1
+
+        Returns:
+            Dict[float, float]: estimated value per quantile
+        """
+        with self._lock:
+            histogram = self.histograms[metric_name]
+            return {q: histogram.quantile(q) for q in quantiles}
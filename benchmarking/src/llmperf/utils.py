@@ -1,10 +1,16 @@
 import json
+import logging
+import os
+import threading
 import time
 from collections.abc import Iterable
-from typing import Any, Dict, Tuple
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
 
 from transformers import AutoTokenizer
 
+logger = logging.getLogger(__name__)
+
 
 SAMBANOVA_URL="https://api.sambanova.ai/v1/chat/completions"
 NUM_RNG_ATTEMPTS = 10  # Unlikely to be used in practice: prevents eternal WHILE-loops
@@ -16,6 +22,15 @@ MODEL_TYPE_IDENTIFIER = {
     "eeve": "eeve",
     "llama2": "llama2",
 }
+# Local directory where tokenizer snapshots are saved, so they can be loaded without network access
+TOKENIZER_SNAPSHOT_DIR = os.environ.get(
+    "LLMPERF_TOKENIZER_DIR",
+    os.path.join(Path(__file__).parent.resolve(), "../../data/tokenizers"),
+)
+
+# Process-wide tokenizer registry, keyed by tokenizer repo id and snapshot directory
+_tokenizers: Dict[Tuple[str, str], AutoTokenizer] = {}
+_tokenizers_lock = threading.Lock()
 
 
 class LLMPerfResults:
@@ -54,14 +69,86 @@ class LLMPerfResults:
         return json.dumps(data)
 
 
-def get_tokenizer(model_name: str) -> AutoTokenizer:
-    """Gets generic tokenizer according to model type
+class JSONLWriter:
+    """Thread-safe writer that appends one JSON record per line to a file. Each record is flushed as soon as
+    it's written, so completed records survive a crash or a timeout of the process."""
+
+    def __init__(self, file_path: str, append: bool = False):
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        if append:
+            _truncate_partial_last_line(file_path)
+        self._file = open(file_path, "a" if append else "w")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Appends a record to the file
+
+        Args:
+            record (Dict[str, Any]): JSON serializable record
+        """
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        """Closes the file"""
+        with self._lock:
+            self._file.close()
+
+
+def _truncate_partial_last_line(file_path: str) -> None:
+    """Removes a partially written last line from a JSONL file, left by a crash while writing
+
+    Args:
+        file_path (str): JSONL file path
+    """
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        # Read backwards by blocks until the last complete line is found
+        position = end
+        while position > 0:
+            read_size = min(65536, position)
+            position -= read_size
+            f.seek(position)
+            newline_idx = f.read(read_size).rfind(b"\n")
+            if newline_idx >= 0:
+                f.truncate(position + newline_idx + 1)
+                return
+        f.truncate(0)
+
+
+def read_jsonl(file_path: str) -> Iterator[Dict[str, Any]]:
+    """Reads the records of a JSONL file one at a time. A partially written last line is skipped.
+
+    Args:
+        file_path (str): JSONL file path
+
+    Yields:
+        Dict[str, Any]: record
+    """
+    with open(file_path, "r") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            yield json.loads(line)
+
+
+def get_tokenizer_repo_id(model_name: str) -> str:
+    """Gets the HuggingFace repo id of the generic tokenizer for the model family
 
     Args:
         model_name (str): model name
 
     Returns:
-        AutoTokenizer: generic HuggingFace tokenizer
+        str: tokenizer repo id
     """    
     # Using NousrResearch for calling out model tokenizers without requesting access. 
     # Ref: https://huggingface.co/NousResearch
@@ -72,24 +159,72 @@ def get_tokenizer(model_name: str) -> AutoTokenizer:
     # Ref: https://huggingface.co/yanolja
     
     if MODEL_TYPE_IDENTIFIER["mistral"] in model_name.lower().replace("-",""):
-        tokenizer = AutoTokenizer.from_pretrained("TheBloke/Mistral-7B-Instruct-v0.2-AWQ")
+        return "TheBloke/Mistral-7B-Instruct-v0.2-AWQ"
     elif MODEL_TYPE_IDENTIFIER["llama3"] in model_name.lower().replace("-",""):
-        tokenizer = AutoTokenizer.from_pretrained("unsloth/llama-3-8b-Instruct")
+        return "unsloth/llama-3-8b-Instruct"
     elif MODEL_TYPE_IDENTIFIER["deepseek"] in model_name.lower().replace("-",""):
         if "coder" in model_name.lower():
-            tokenizer = AutoTokenizer.from_pretrained(
-                "deepseek-ai/deepseek-coder-1.3b-base"
-            )
+            return "deepseek-ai/deepseek-coder-1.3b-base"
         else:
-            tokenizer = AutoTokenizer.from_pretrained(
-                "deepseek-ai/deepseek-llm-7b-base"
-            )
+            return "deepseek-ai/deepseek-llm-7b-base"
     elif MODEL_TYPE_IDENTIFIER["solar"] in model_name.lower().replace("-",""):
-        tokenizer = AutoTokenizer.from_pretrained("upstage/SOLAR-10.7B-Instruct-v1.0")
+        return "upstage/SOLAR-10.7B-Instruct-v1.0"
     elif MODEL_TYPE_IDENTIFIER["eeve"] in model_name.lower().replace("-",""):
-        tokenizer = AutoTokenizer.from_pretrained("yanolja/EEVE-Korean-10.8B-v1.0")
+        return "yanolja/EEVE-Korean-10.8B-v1.0"
     else:
-        tokenizer = AutoTokenizer.from_pretrained("NousResearch/Llama-2-7b-chat-hf")
+        return "NousResearch/Llama-2-7b-chat-hf"
+
+
+def _load_tokenizer(repo_id: str, snapshot_dir: str) -> AutoTokenizer:
+    """Loads a fast tokenizer from its local snapshot if there is one, otherwise downloads it from the
+    HuggingFace hub and saves a local snapshot for the next loads
+
+    Args:
+        repo_id (str): tokenizer repo id
+        snapshot_dir (str): local directory with tokenizer snapshots
+
+    Raises:
+        ValueError: raises when there's no fast tokenizer available for the repo
+
+    Returns:
+        AutoTokenizer: fast HuggingFace tokenizer
+    """
+    snapshot_path = os.path.join(snapshot_dir, repo_id.replace("/", "--"))
+    if os.path.isdir(snapshot_path):
+        tokenizer = AutoTokenizer.from_pretrained(snapshot_path, use_fast=True, local_files_only=True)
+    else:
+        tokenizer = AutoTokenizer.from_pretrained(repo_id, use_fast=True)
+        try:
+            tokenizer.save_pretrained(snapshot_path)
+        except OSError as e:
+            logger.warning(f"Could not save tokenizer snapshot to {snapshot_path}: {e}")
+
+    if not tokenizer.is_fast:
+        raise ValueError(f"No fast tokenizer available for {repo_id}")
+    return tokenizer
+
+
+def get_tokenizer(model_name: str, snapshot_dir: Optional[str] = None) -> AutoTokenizer:
+    """Gets generic tokenizer according to model type. Tokenizers are loaded lazily once per model family
+    and shared across the process.
+
+    Args:
+        model_name (str): model name
+        snapshot_dir (Optional[str], optional): local directory with tokenizer snapshots.
+            Defaults to TOKENIZER_SNAPSHOT_DIR.
+
+    Returns:
+        AutoTokenizer: generic HuggingFace tokenizer
+    """
+    repo_id = get_tokenizer_repo_id(model_name)
+    key = (repo_id, snapshot_dir or TOKENIZER_SNAPSHOT_DIR)
+    tokenizer = _tokenizers.get(key)
+    if tokenizer is None:
+        with _tokenizers_lock:
+            tokenizer = _tokenizers.get(key)
+            if tokenizer is None:
+                tokenizer = _load_tokenizer(*key)
+                _tokenizers[key] = tokenizer
     return tokenizer
 
 
@@ -1,27 +1,37 @@
 import abc
+import asyncio
+import functools
+import itertools
 import json
+import math
 import os
+import queue
 import random
 import re
 import threading
 import time
 import yaml
-from typing import Any, Dict, List, Tuple
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
 
 from pathlib import Path
 
 file_location = Path(__file__).parent.resolve()
 
+import aiohttp
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 import transformers
 from langchain.prompts import PromptTemplate
 
 from llmperf import common_metrics
-from llmperf.sambanova_client import llm_request
+from llmperf.sambanova_client import allm_request, get_connection_timing_trace_config, llm_request
 from llmperf.models import RequestConfig, LLMResponse
 import llmperf.utils as utils
-from llmperf.utils import LLMPerfResults, flatten, get_tokenizer
+from llmperf.streaming_metrics import StreamingMetricsAccumulator
+from llmperf.utils import JSONLWriter, LLMPerfResults, get_tokenizer, read_jsonl
+from workload_generator import LengthDistribution, MultiTurnWorkloadGenerator
 from dotenv import load_dotenv
 
 import logging
@@ -39,6 +49,54 @@ SYSTEM_PROMPT_PATH = os.path.join(
     file_location, "../prompts/system-prompt_template.yaml"
 )
 USER_PROMPT_PATH = os.path.join(file_location, "../prompts/user-prompt_template.yaml")
+ARRIVAL_DISTRIBUTIONS = ["poisson", "constant"]
+SLO_METRICS = [common_metrics.E2E_LAT, common_metrics.TTFT]
+SUMMARY_QUANTILES = [0.25, 0.5, 0.75, 0.9, 0.95, 0.99]
+# Seconds a closed-loop worker waits for the next turn of a conversation to be queued before checking again
+QUEUE_POLL_INTERVAL_S = 0.1
+
+
+# Synthetic prompts already built, keyed by tokenizer, number of input tokens and unique prompt index
+_synthetic_prompt_cache: Dict[Tuple[str, int, Optional[int]], Tuple[str, int]] = {}
+
+
+@functools.lru_cache(maxsize=None)
+def load_user_prompt_template() -> str:
+    """Loads and parses the user prompt template used to build synthetic prompts. The file is only read once.
+
+    Returns:
+        str: prompt template
+    """
+    return yaml.safe_load(PromptTemplate.from_file(USER_PROMPT_PATH).template)["template"]
+
+
+def get_geometric_concurrency_levels(
+    min_concurrency: int, max_concurrency: int, factor: float = 2
+) -> List[int]:
+    """Builds a geometric range of concurrency levels, always including both ends of the range.
+
+    Args:
+        min_concurrency (int): first concurrency level
+        max_concurrency (int): last concurrency level
+        factor (float, optional): growth factor between consecutive levels. Defaults to 2.
+
+    Returns:
+        List[int]: sorted list of unique concurrency levels
+    """
+    if min_concurrency < 1 or max_concurrency < min_concurrency:
+        raise ValueError(
+            f"Invalid concurrency range [{min_concurrency}, {max_concurrency}]"
+        )
+    if factor <= 1:
+        raise ValueError(f"factor must be greater than 1, got {factor}")
+
+    concurrency_levels = []
+    level = float(min_concurrency)
+    while level < max_concurrency:
+        concurrency_levels.append(int(round(level)))
+        level *= factor
+    concurrency_levels.append(max_concurrency)
+    return sorted(set(concurrency_levels))
 
 
 class BasePerformanceEvaluator(abc.ABC):
@@ -51,7 +109,17 @@ class BasePerformanceEvaluator(abc.ABC):
         llm_api: str = "sambastudio",
         is_stream_mode: bool = True,
         timeout: int = 600,
+        request_rate: Optional[float] = None,
+        arrival_distribution: str = "poisson",
+        record_connection_setup_time: bool = False,
+        resume: bool = False,
+        streaming_percentiles: bool = False,
+        timeline_window_s: int = 1,
     ):
+        # The clients only measure streamed responses, so a run in non-streaming mode would only get errors
+        if not is_stream_mode:
+            raise ValueError("Streaming mode required, non-streaming mode is not supported")
+
         self.model_name = model_name
         self.results_dir = results_dir
         self.num_workers = num_workers
@@ -59,11 +127,42 @@ class BasePerformanceEvaluator(abc.ABC):
         self.llm_api = llm_api
         self.is_stream_mode = is_stream_mode
         self.timeout = timeout
+        self.record_connection_setup_time = record_connection_setup_time
+        self.resume = resume
+        self.streaming_percentiles = streaming_percentiles
+        self.timeline_window_s = timeline_window_s
         self.tokenizer = get_tokenizer(self.model_name)
 
+        # Open-loop load generation: when a request rate is set, requests are sent following an arrival schedule
+        # instead of by a fixed number of workers
+        if request_rate is not None and request_rate <= 0:
+            raise ValueError(f"request_rate must be greater than 0, got {request_rate}")
+        if timeline_window_s < 1:
+            raise ValueError(f"timeline_window_s must be a positive number of seconds, got {timeline_window_s}")
+        if arrival_distribution not in ARRIVAL_DISTRIBUTIONS:
+            raise ValueError(
+                f"arrival_distribution must be one of {ARRIVAL_DISTRIBUTIONS}, got {arrival_distribution}"
+            )
+        self.request_rate = request_rate
+        self.arrival_distribution = arrival_distribution
+
         # To be set upon saving of results
         self.summary_file_path = None
         self.individual_responses_file_path = None
+        self.sweep_file_path = None
+        self.timeline_file_path = None
+
+        # Throughput timeline of the last benchmark run, in buckets of `timeline_window_s` seconds
+        self.throughput_timeline: List[Dict[str, Any]] = []
+
+        # Per-request results are streamed to disk while a benchmark runs, instead of being kept in memory
+        self._results_writer: Optional[JSONLWriter] = None
+        self._first_response: Optional[LLMResponse] = None
+        self.num_resumed_requests = 0
+
+        # Streaming histograms of the summary metrics, fed as each request completes when results are streamed to
+        # disk or when streaming percentiles
+        self._metrics_accumulator: Optional[StreamingMetricsAccumulator] = None
 
     def get_token_length(self, input_text: str) -> int:
         return len(self.tokenizer.encode(input_text))
@@ -137,42 +236,475 @@ class BasePerformanceEvaluator(abc.ABC):
 
         return adjusted_text
 
+    def run_requests(
+        self,
+        request_configs: List[RequestConfig],
+        start_time: float,
+    ) -> List[LLMResponse]:
+        """Sends the requests to LLM, either open-loop following the arrival schedule if a request rate is set,
+        or closed-loop with `num_workers` concurrent workers otherwise, and collects results
+
+        Args:
+            request_configs (List[RequestConfig]): list of request configs for LLM calls
+            start_time (float): start time of the process
+
+        Raises:
+            Exception: If no request was completed before the timeout.
+
+        Returns:
+            List[LLMResponse]: list of completed outputs from requests. Empty if the results are streamed to disk.
+        """
+        if not request_configs:
+            return []
+
+        self._first_response = None
+        progress_bar = tqdm(total=len(request_configs), desc="Running Requests")
+
+        if self.request_rate is not None:
+            llm_responses = self.send_requests_open_loop(
+                request_configs, progress_bar, start_time
+            )
+        else:
+            llm_responses = self.send_requests_closed_loop(
+                request_configs, progress_bar, start_time
+            )
+
+        if not llm_responses and self._first_response is None:
+            raise Exception(
+                f"No requests were completed before the timeout of {self.timeout} seconds."
+            )
+
+        return llm_responses
+
+    def check_first_response(self, llm_responses: List[LLMResponse]) -> None:
+        """Raises if the first completed request failed, either kept in memory or streamed to disk
+
+        Args:
+            llm_responses (List[LLMResponse]): list of completed outputs kept in memory
+
+        Raises:
+            Exception: If the first completed request failed.
+        """
+        first_response = llm_responses[0] if llm_responses else self._first_response
+        if first_response is not None and first_response.metrics[common_metrics.ERROR_CODE]:
+            raise Exception(
+                f"Unexpected error happened when executing requests: {first_response.metrics['error_code']}. "
+                f"Additional message: {first_response.metrics['error_msg']}"
+            )
+
+    def collect_response(
+        self, response: LLMResponse, completed_requests: List[LLMResponse]
+    ) -> None:
+        """Collects the response of a completed request. If a results writer is open, the response is written to
+        disk right away and not kept in memory, otherwise it's added to the list of completed requests.
+
+        Args:
+            response (LLMResponse): completed request response
+            completed_requests (List[LLMResponse]): list of completed outputs from requests
+        """
+        # Request metadata, like the request index, is recorded along with the metrics
+        request_metadata = response.request_config.metadata or {}
+        response.metrics[common_metrics.REQ_IDX] = request_metadata.get(common_metrics.REQ_IDX)
+        response.metrics.update(request_metadata)
+
+        if self._metrics_accumulator is not None:
+            self._metrics_accumulator.add(response.metrics)
+
+        if self._results_writer is None:
+            completed_requests.append(response)
+            return
+
+        if self._first_response is None:
+            self._first_response = response
+        self.write_response(response)
+
+    def write_response(self, response: LLMResponse) -> None:
+        """Writes the metrics of a completed request to the individual responses file
+
+        Args:
+            response (LLMResponse): completed request response
+        """
+        self._results_writer.write(response.metrics)
+
+    def open_results_writers(self, filename: str) -> None:
+        """Opens the files where per-request results are appended as each request completes.
+        If resuming, the existing files are appended to, otherwise they're overwritten.
+
+        Args:
+            filename (str): The base name of the files to save the results to.
+        """
+        results_dir = self.get_results_dir()
+        self.individual_responses_file_path = (
+            f"{results_dir}/{filename}_individual_responses.jsonl"
+        )
+        self._results_writer = JSONLWriter(
+            self.individual_responses_file_path, append=self.resume
+        )
+
+    def close_results_writers(self) -> None:
+        """Closes the files where per-request results are appended"""
+        if self._results_writer is not None:
+            self._results_writer.close()
+            self._results_writer = None
+
+    def skip_recorded_requests(
+        self, request_configs: List[RequestConfig]
+    ) -> List[RequestConfig]:
+        """When resuming a run, skips the requests already recorded in the individual responses file
+
+        Args:
+            request_configs (List[RequestConfig]): list of request configs for LLM calls
+
+        Returns:
+            List[RequestConfig]: request configs that remain to be sent
+        """
+        self.num_resumed_requests = 0
+        if not (
+            self.resume
+            and self.individual_responses_file_path
+            and os.path.exists(self.individual_responses_file_path)
+        ):
+            return request_configs
+
+        recorded_request_idxs = set()
+        for record in read_jsonl(self.individual_responses_file_path):
+            recorded_request_idxs.add(record.get(common_metrics.REQ_IDX))
+            if self._metrics_accumulator is not None:
+                self._metrics_accumulator.add(record, is_resumed=True)
+        remaining_request_configs = [
+            request_config
+            for request_config in request_configs
+            if request_config.metadata[common_metrics.REQ_IDX] not in recorded_request_idxs
+        ]
+        self.num_resumed_requests = len(request_configs) - len(remaining_request_configs)
+        logger.info(
+            f"Resuming run, skipping {self.num_resumed_requests} requests already recorded in "
+            f"{self.individual_responses_file_path}"
+        )
+        return remaining_request_configs
+
+    def reset_metrics_accumulator(self) -> None:
+        """Starts new streaming histograms of the summary metrics if results are streamed to disk, so the summary is
+        built without reading back the per-request metrics and memory stays flat whatever the run length, or if
+        streaming percentiles, so percentiles are available live during a run
+        """
+        self._metrics_accumulator = (
+            StreamingMetricsAccumulator(self.get_summary_metrics())
+            if self.streaming_percentiles or self._results_writer is not None
+            else None
+        )
+
+    def update_progress_bar(self, progress_bar: tqdm) -> None:
+        """Advances the progress bar by one completed request, showing live latency percentiles if streaming
+        percentiles
+
+        Args:
+            progress_bar (tqdm): progress bar
+        """
+        if self.streaming_percentiles and self._metrics_accumulator is not None:
+            ttft_quantiles = self._metrics_accumulator.quantiles(common_metrics.TTFT, [0.5, 0.99])
+            e2e_quantiles = self._metrics_accumulator.quantiles(common_metrics.E2E_LAT, [0.5, 0.99])
+            progress_bar.set_postfix(
+                ttft_p50=f"{ttft_quantiles[0.5]:.3f}",
+                ttft_p99=f"{ttft_quantiles[0.99]:.3f}",
+                e2e_p50=f"{e2e_quantiles[0.5]:.3f}",
+                e2e_p99=f"{e2e_quantiles[0.99]:.3f}",
+                refresh=False,
+            )
+        progress_bar.update(1)
+
+    def summarize_run(
+        self, llm_responses: List[LLMResponse], start_time: time, end_time: time
+    ) -> Dict[str, Any]:
+        """Builds the metrics summary of a benchmark run. If the results were streamed to disk, it's built from the
+        streaming histograms instead of reading back the per-request metrics.
+
+        Args:
+            llm_responses (List[LLMResponse]): list of completed outputs kept in memory
+            start_time (time): The start time of the run.
+            end_time (time): The end time of the run.
+
+        Returns:
+            Dict[str, Any]: A dictionary containing the summary metrics.
+        """
+        # The timeline only covers this run, the leading records of a resumed run are from the previous one
+        run_response_metrics = self.get_response_metrics(llm_responses)
+        if self._results_writer is not None:
+            run_response_metrics = itertools.islice(run_response_metrics, self.num_resumed_requests, None)
+        self.throughput_timeline = self.build_throughput_timeline(run_response_metrics, self.timeline_window_s)
+
+        if self._metrics_accumulator is not None and self._results_writer is not None:
+            metrics_summary = self.build_metrics_summary_from_accumulator(
+                self._metrics_accumulator, start_time, end_time
+            )
+        else:
+            metrics_summary = self.build_metrics_summary(
+                metrics=list(self.get_response_metrics(llm_responses)),
+                start_time=start_time,
+                end_time=end_time,
+                num_resumed_requests=self.num_resumed_requests,
+            )
+
+        # Record throughput once the run is warmed up and before it drains
+        steady_state_output_throughput = self.get_steady_state_throughput(
+            self.throughput_timeline, self.timeline_window_s
+        )
+        logger.info(f"Steady State Output Throughput: {steady_state_output_throughput}")
+        metrics_summary[common_metrics.STEADY_STATE_OUTPUT_THROUGHPUT] = steady_state_output_throughput
+
+        return metrics_summary
+
+    def get_response_metrics(self, llm_responses: List[LLMResponse]) -> Iterable[Dict[str, Any]]:
+        """Gets the metrics of all the completed requests, either from memory or lazily from the individual
+        responses file if results were streamed to disk
+
+        Args:
+            llm_responses (List[LLMResponse]): list of completed outputs kept in memory
+
+        Returns:
+            Iterable[Dict[str, Any]]: metrics of each completed request
+        """
+        if self._results_writer is not None:
+            return read_jsonl(self.individual_responses_file_path)
+        return [response.metrics for response in llm_responses]
+
+    def send_requests_closed_loop(
+        self,
+        request_configs: List[RequestConfig],
+        progress_bar: tqdm,
+        start_time: float,
+    ) -> List[LLMResponse]:
+        """Sends requests to LLM with `num_workers` concurrent workers and collects results.
+        Workers pull requests from a shared queue, so exactly `num_workers` requests are in flight until the
+        dataset is drained, regardless of how long each individual request takes. The turns of a conversation are
+        sent one after the other: a turn is queued once the previous turn of its conversation completed.
+
+        Args:
+            request_configs (List[RequestConfig]): list of request configs for LLM calls
+            progress_bar (tqdm): progress bar
+            start_time (float): start time of the process
+
+        Returns:
+            List[LLMResponse]: list of completed outputs from requests
+        """
+        request_queue: queue.Queue = queue.Queue()
+        next_turns: Dict[Any, Deque[RequestConfig]] = {}
+        for request_config in request_configs:
+            conversation_idx = self.get_conversation_idx(request_config)
+            if conversation_idx in next_turns:
+                next_turns[conversation_idx].append(request_config)
+            else:
+                request_queue.put(request_config)
+                if conversation_idx is not None:
+                    next_turns[conversation_idx] = deque()
+
+        threads = []
+        completed_requests: List[LLMResponse] = []
+
+        for _ in range(min(self.num_workers, len(request_configs))):
+            thread = threading.Thread(
+                target=self.send_requests,
+                args=(
+                    request_queue,
+                    completed_requests,
+                    progress_bar,
+                    start_time,
+                    next_turns,
+                ),
+            )
+            threads.append(thread)
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        return completed_requests
+
     def send_requests(
         self,
-        request_config_batch: list,
+        request_queue: queue.Queue,
         completed_requests: list,
         progress_bar: tqdm,
         start_time: float,
+        next_turns: Optional[Dict[Any, Deque[RequestConfig]]] = None,
     ) -> None:
-        """Sends multiple requests to LLM and collects results
+        """Sends requests taken from the shared queue to LLM and collects results, until every request was sent
+        or the timeout is reached
 
         Args:
-            request_config_batch (list): list of request configs for LLM calls
+            request_queue (queue.Queue): shared queue of request configs for LLM calls
             completed_requests (list): list of completed outputs from requests
             progress_bar (tqdm): progress bar
             start_time (float): start time of the process
+            next_turns (Optional[Dict[Any, Deque[RequestConfig]]], optional): turns of each conversation that remain
+                to be sent, queued one by one as the previous turn completes. Defaults to None.
         """
-        for request_config in request_config_batch:
-            if time.monotonic() - start_time >= self.timeout:
-                break
-            req_metrics, response_text, request_config = llm_request(
-                request_config, self.tokenizer
-            )
+        next_turns = next_turns or {}
+        while time.monotonic() - start_time < self.timeout:
+            try:
+                request_config = request_queue.get(timeout=QUEUE_POLL_INTERVAL_S)
+            except queue.Empty:
+                # Requests still in flight may queue the next turn of their conversation
+                if request_queue.unfinished_tasks == 0:
+                    break
+                continue
+            try:
+                req_metrics, response_text, request_config = llm_request(
+                    request_config, self.tokenizer
+                )
 
-            # Create response object containing metrics, generated text, and corresponding request config
-            response_object = LLMResponse(
-                metrics=req_metrics,
-                response_text=response_text,
-                request_config=request_config,
-            )
-            completed_requests.extend([response_object])
-            progress_bar.update(1)
+                # Create response object containing metrics, generated text, and corresponding request config
+                response_object = LLMResponse(
+                    metrics=req_metrics,
+                    response_text=response_text,
+                    request_config=request_config,
+                )
+                self.collect_response(response_object, completed_requests)
+                self.update_progress_bar(progress_bar)
+
+                conversation_turns = next_turns.get(self.get_conversation_idx(request_config))
+                if conversation_turns:
+                    request_queue.put(conversation_turns.popleft())
+            finally:
+                request_queue.task_done()
+
+    @staticmethod
+    def get_conversation_idx(request_config: RequestConfig) -> Optional[Any]:
+        """Gets the conversation of a request, None if it doesn't belong to a multi-turn conversation
+
+        Args:
+            request_config (RequestConfig): request config
+
+        Returns:
+            Optional[Any]: conversation index
+        """
+        return (request_config.metadata or {}).get(common_metrics.CONVERSATION_IDX)
+
+    def get_arrival_offsets(self, num_requests: int) -> List[float]:
+        """Builds the open-loop arrival schedule for the requests, as offsets in seconds from the start of the run.
+        With a poisson distribution, inter-arrival times are drawn from an exponential distribution with mean
+        1/request_rate. With a constant distribution, requests are evenly spaced by 1/request_rate.
+
+        Args:
+            num_requests (int): number of requests to schedule
+
+        Returns:
+            List[float]: arrival offset of each request
+        """
+        arrival_offsets = []
+        arrival_offset = 0.0
+        for _ in range(num_requests):
+            arrival_offsets.append(arrival_offset)
+            if self.arrival_distribution == "poisson":
+                arrival_offset += random.expovariate(self.request_rate)
+            else:
+                arrival_offset += 1 / self.request_rate
+        return arrival_offsets
+
+    def send_requests_open_loop(
+        self,
+        request_configs: List[RequestConfig],
+        progress_bar: tqdm,
+        start_time: float,
+    ) -> List[LLMResponse]:
+        """Sends requests to LLM following the open-loop arrival schedule and collects results.
+        Requests are sent from an asyncio event loop, so the number of in-flight requests is only bounded by
+        the arrival rate and the endpoint latency, not by a number of worker threads. A turn of a conversation
+        arriving before the previous turn completed waits for it.
+
+        Args:
+            request_configs (List[RequestConfig]): list of request configs for LLM calls
+            progress_bar (tqdm): progress bar
+            start_time (float): start time of the process
+
+        Returns:
+            List[LLMResponse]: list of completed outputs from requests
+        """
+        return asyncio.run(
+            self._asend_requests_open_loop(request_configs, progress_bar, start_time)
+        )
+
+    async def _asend_requests_open_loop(
+        self,
+        request_configs: List[RequestConfig],
+        progress_bar: tqdm,
+        start_time: float,
+    ) -> List[LLMResponse]:
+        """Async implementation of `send_requests_open_loop`
+
+        Args:
+            request_configs (List[RequestConfig]): list of request configs for LLM calls
+            progress_bar (tqdm): progress bar
+            start_time (float): start time of the process
+
+        Returns:
+            List[LLMResponse]: list of completed outputs from requests
+        """
+        completed_requests: List[LLMResponse] = []
+        arrival_offsets = self.get_arrival_offsets(len(request_configs))
+
+        # No connection limit, the arrival schedule is what drives concurrency. A request can't outlast the run.
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout, sock_read=self.timeout),
+            read_bufsize=2**20,
+            trace_configs=[get_connection_timing_trace_config()],
+        ) as session:
+
+            async def send_request(
+                request_config: RequestConfig, previous_turn: Optional[asyncio.Task] = None
+            ) -> None:
+                # A turn is sent at its arrival time, or once the previous turn of its conversation completed
+                if previous_turn is not None:
+                    await asyncio.wait([previous_turn])
+                req_metrics, response_text, request_config = await allm_request(
+                    request_config, self.tokenizer, session
+                )
+                response_object = LLMResponse(
+                    metrics=req_metrics,
+                    response_text=response_text,
+                    request_config=request_config,
+                )
+                self.collect_response(response_object, completed_requests)
+                self.update_progress_bar(progress_bar)
+
+            tasks = []
+            last_turns: Dict[Any, asyncio.Task] = {}
+            schedule_start_time = time.monotonic()
+            for request_config, arrival_offset in zip(request_configs, arrival_offsets):
+                delay = schedule_start_time + arrival_offset - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if time.monotonic() - start_time >= self.timeout:
+                    break
+                conversation_idx = self.get_conversation_idx(request_config)
+                task = asyncio.create_task(send_request(request_config, last_turns.get(conversation_idx)))
+                if conversation_idx is not None:
+                    last_turns[conversation_idx] = task
+                tasks.append(task)
+
+            # Wait for in-flight requests to complete until the timeout, then cancel the remaining ones
+            if tasks:
+                remaining_time = max(self.timeout - (time.monotonic() - start_time), 0)
+                _, pending = await asyncio.wait(tasks, timeout=remaining_time)
+                for task in pending:
+                    task.cancel()
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error(f"Request failed: {result!r}")
+                if pending:
+                    logger.warning(f"{len(pending)} in-flight requests were cancelled at the timeout")
+
+        return completed_requests
 
     def build_metrics_summary(
         self,
         metrics: List[Dict[str, Any]],
         start_time: time,
         end_time: time,
+        num_resumed_requests: int = 0,
     ) -> Dict[str, Any]:
         """Builds a summary of metrics from a list of dictionaries.
 
@@ -185,6 +717,8 @@ class BasePerformanceEvaluator(abc.ABC):
         metrics (List[Dict[str, Any]]): A list of dictionaries, each representing a metric.
         start_time (time): The start time of the metrics collection.
         end_time (time): The end time of the metrics collection.
+        num_resumed_requests (int): Number of leading metrics recorded by a previous run that is being resumed.
+            They're included in the statistics, but not in the throughput measured between start and end time.
 
         Returns:
         Dict[str, Any]: A dictionary containing the summary metrics.
@@ -198,91 +732,203 @@ class BasePerformanceEvaluator(abc.ABC):
         # Remove errored requests
         metrics_df = raw_df[raw_df[common_metrics.ERROR_CODE].isna()]
 
-        # Record descriptive statistics for the metrics in the following list
-        for metric in [
+        # Record descriptive statistics for the summary metrics, computed in a single pass over their columns
+        summary_metrics = self.get_summary_metrics()
+        summary_df = metrics_df.reindex(columns=summary_metrics).apply(
+            pd.to_numeric, errors="coerce"
+        )
+        quantiles_df = summary_df.quantile(SUMMARY_QUANTILES)
+        stats_df = summary_df.agg(["mean", "min", "max", "std"])
+        for metric in summary_metrics:
+            metrics_summary[metric] = self.build_metric_stats(
+                metric,
+                quantiles=quantiles_df[metric].to_dict(),
+                mean=stats_df.at["mean", metric],
+                min_value=stats_df.at["min", metric],
+                max_value=stats_df.at["max", metric],
+                stddev=stats_df.at["std", metric],
+            )
+
+        # Record error count and rate, overall throughput and number of requests completed
+        error_codes = raw_df[common_metrics.ERROR_CODE].dropna()
+        run_df = raw_df.iloc[num_resumed_requests:]
+        run_metrics_df = run_df[run_df[common_metrics.ERROR_CODE].isna()]
+        metrics_summary.update(
+            self.build_requests_summary(
+                num_requests_started=len(metrics),
+                error_code_frequency=dict(error_codes.value_counts()),
+                num_completed_requests=len(metrics_df),
+                num_run_completed_requests=len(run_metrics_df),
+                run_output_tokens=run_metrics_df[common_metrics.NUM_OUTPUT_TOKENS].sum(),
+                start_time=start_time,
+                end_time=end_time,
+            )
+        )
+
+        return metrics_summary
+
+    def build_metrics_summary_from_accumulator(
+        self,
+        accumulator: StreamingMetricsAccumulator,
+        start_time: time,
+        end_time: time,
+    ) -> Dict[str, Any]:
+        """Builds a summary of metrics from the streaming histograms and counters of an accumulator, without the
+        raw per-request metrics. Quantiles are estimated within the accumulator's relative accuracy.
+
+        Args:
+            accumulator (StreamingMetricsAccumulator): accumulator fed with the metrics of each request
+            start_time (time): The start time of the metrics collection.
+            end_time (time): The end time of the metrics collection.
+
+        Returns:
+            Dict[str, Any]: A dictionary containing the summary metrics.
+        """
+        metrics_summary = {}
+        for metric in self.get_summary_metrics():
+            histogram = accumulator.histograms[metric]
+            metrics_summary[metric] = self.build_metric_stats(
+                metric,
+                quantiles=accumulator.quantiles(metric, SUMMARY_QUANTILES),
+                mean=histogram.mean,
+                min_value=histogram.min if histogram.count else math.nan,
+                max_value=histogram.max if histogram.count else math.nan,
+                stddev=histogram.stddev,
+            )
+
+        metrics_summary.update(
+            self.build_requests_summary(
+                num_requests_started=accumulator.num_requests_started,
+                error_code_frequency=dict(accumulator.error_code_counts),
+                num_completed_requests=accumulator.num_completed_requests,
+                num_run_completed_requests=accumulator.num_run_completed_requests,
+                run_output_tokens=accumulator.run_output_tokens,
+                start_time=start_time,
+                end_time=end_time,
+            )
+        )
+
+        return metrics_summary
+
+    def get_summary_metrics(self) -> List[str]:
+        """Gets the metrics to record descriptive statistics for
+
+        Returns:
+            List[str]: metric names
+        """
+        summary_metrics = [
             common_metrics.TTFT,
             common_metrics.E2E_LAT,
             common_metrics.REQ_OUTPUT_THROUGHPUT,
             common_metrics.NUM_INPUT_TOKENS,
             common_metrics.NUM_OUTPUT_TOKENS,
-        ]:
-            logger.info(f"Building Metrics Summary for metric: {metric}")
-            metrics_summary[metric] = {}
+        ]
+        if self.record_connection_setup_time:
+            summary_metrics.append(common_metrics.CONNECTION_SETUP_TIME)
+        return summary_metrics
 
-            # Get flattened list from metric column in metrics df
-            series = pd.Series(list(flatten(metrics_df[metric]))).dropna()
+    @staticmethod
+    def build_metric_stats(
+        metric: str,
+        quantiles: Dict[float, float],
+        mean: float,
+        min_value: float,
+        max_value: float,
+        stddev: float,
+    ) -> Dict[str, Any]:
+        """Builds the descriptive statistics of a metric in the summary format
 
-            # Generate statistics for specific metric
-            quantiles = (
-                series.quantile([0.25, 0.5, 0.75, 0.9, 0.95, 0.99]).round(4).to_dict()
-            )
-            quantiles_reformatted_keys = {}
-            for quantile, value in quantiles.items():
-                reformatted_key = f"p{int(quantile * 100)}"
-                logger.info(f"    {reformatted_key} = {value}")
-                quantiles_reformatted_keys[reformatted_key] = value
-            metrics_summary[metric]["quantiles"] = quantiles_reformatted_keys
+        Args:
+            metric (str): metric name
+            quantiles (Dict[float, float]): value per quantile
+            mean (float): mean
+            min_value (float): minimum
+            max_value (float): maximum
+            stddev (float): standard deviation
+
+        Returns:
+            Dict[str, Any]: quantiles, mean, min, max and stddev of the metric
+        """
+        logger.info(f"Building Metrics Summary for metric: {metric}")
+        metric_stats = {}
+
+        quantiles_reformatted_keys = {}
+        for quantile, value in quantiles.items():
+            reformatted_key = f"p{int(round(quantile * 100))}"
+            value = round(value, 4)
+            logger.info(f"    {reformatted_key} = {value}")
+            quantiles_reformatted_keys[reformatted_key] = value
+        metric_stats["quantiles"] = quantiles_reformatted_keys
 
-            series_mean = round(series.mean(), 4)
-            logger.info(f"    mean = {series_mean}")
-            metrics_summary[metric]["mean"] = series_mean
+        for stat_name, value in [("mean", mean), ("min", min_value), ("max", max_value), ("stddev", stddev)]:
+            value = round(value, 4)
+            logger.info(f"    {stat_name} = {value}")
+            metric_stats[stat_name] = value
 
-            series_min = round(series.min(), 4)
-            logger.info(f"    min = {series_min}")
-            metrics_summary[metric]["min"] = series_min
+        return metric_stats
+
+    def build_requests_summary(
+        self,
+        num_requests_started: int,
+        error_code_frequency: Dict[Any, int],
+        num_completed_requests: int,
+        num_run_completed_requests: int,
+        run_output_tokens: float,
+        start_time: time,
+        end_time: time,
+    ) -> Dict[str, Any]:
+        """Builds the request counts, error and throughput part of the summary
 
-            series_max = round(series.max(), 4)
-            logger.info(f"    max = {series_max}")
-            metrics_summary[metric]["max"] = series_max
+        Args:
+            num_requests_started (int): number of requests started
+            error_code_frequency (Dict[Any, int]): number of errored requests per error code
+            num_completed_requests (int): number of requests completed without error
+            num_run_completed_requests (int): number of requests completed without error between start and end time
+            run_output_tokens (float): output tokens of the requests completed between start and end time
+            start_time (time): The start time of the metrics collection.
+            end_time (time): The end time of the metrics collection.
 
-            series_std = round(series.std(), 4)
-            logger.info(f"    stddev = {series_std}")
-            metrics_summary[metric]["stddev"] = series_std
+        Returns:
+            Dict[str, Any]: requests summary
+        """
+        requests_summary = {}
 
         # Record number of requests started
-        metrics_summary[common_metrics.NUM_REQ_STARTED] = len(metrics)
+        requests_summary[common_metrics.NUM_REQ_STARTED] = num_requests_started
 
         # Record error count and rate
-        error_codes = raw_df[common_metrics.ERROR_CODE].dropna()
-        num_errors = len(error_codes)
-        metrics_summary[common_metrics.ERROR_RATE] = (
-            num_errors / len(metrics) if len(metrics) else 0
+        num_errors = sum(error_code_frequency.values())
+        requests_summary[common_metrics.ERROR_RATE] = (
+            num_errors / num_requests_started if num_requests_started else 0
         )
-        metrics_summary[common_metrics.NUM_ERRORS] = num_errors
+        requests_summary[common_metrics.NUM_ERRORS] = num_errors
         logger.info(f"Number Of Errored Requests: {num_errors}")
 
         # Record specific error code frequencies
-        error_code_frequency = dict(error_codes.value_counts())
         if num_errors:
-            error_code_frequency = dict(error_codes.value_counts())
             logger.error("Error Code Frequency")
             logger.error(error_code_frequency)
-        metrics_summary[common_metrics.ERROR_CODE_FREQ] = str(error_code_frequency)
+        requests_summary[common_metrics.ERROR_CODE_FREQ] = str(error_code_frequency)
 
-        # Record overall throughput
-        overall_output_throughput = round(
-            metrics_df[common_metrics.NUM_OUTPUT_TOKENS].sum()
-            / (end_time - start_time),
-            4,
-        )
+        # Record overall throughput, only over the requests run between start and end time
+        overall_output_throughput = round(run_output_tokens / (end_time - start_time), 4)
         logger.info(f"Overall Output Throughput: {overall_output_throughput}")
-        metrics_summary[common_metrics.OUTPUT_THROUGHPUT] = overall_output_throughput
+        requests_summary[common_metrics.OUTPUT_THROUGHPUT] = overall_output_throughput
 
         # Record number of requests completed
-        num_completed_requests = len(metrics_df)
         num_completed_requests_per_min = round(
-            num_completed_requests / (end_time - start_time) * 60, 4
+            num_run_completed_requests / (end_time - start_time) * 60, 4
         )
         logger.info(f"Number Of Completed Requests: {num_completed_requests}")
         logger.info(f"Number Of Concurrent Workers: {self.num_workers}")
         logger.info(f"Completed Requests Per Minute: {num_completed_requests_per_min}")
 
-        metrics_summary[common_metrics.NUM_COMPLETED_REQUESTS] = num_completed_requests
-        metrics_summary[common_metrics.COMPLETED_REQUESTS_PER_MIN] = (
+        requests_summary[common_metrics.NUM_COMPLETED_REQUESTS] = num_completed_requests
+        requests_summary[common_metrics.COMPLETED_REQUESTS_PER_MIN] = (
             num_completed_requests_per_min
         )
 
-        return metrics_summary
+        return requests_summary
 
     def save_results(
         self,
@@ -311,11 +957,7 @@ class BasePerformanceEvaluator(abc.ABC):
         summary.update(self.user_metadata)
 
         results = LLMPerfResults(name=summary_filename, metadata=summary)
-        results_dir = Path(self.results_dir)
-        if not results_dir.exists():
-            results_dir.mkdir(parents=True)
-        elif not results_dir.is_dir():
-            raise ValueError(f"{results_dir} is not a directory")
+        results_dir = self.get_results_dir()
 
         # Save summary results
         try:
@@ -326,19 +968,275 @@ class BasePerformanceEvaluator(abc.ABC):
             logger.error(results.to_dict())
             raise e
 
-        # Save individual response results
+        # Save throughput timeline
+        if self.throughput_timeline:
+            self.timeline_file_path = f"{results_dir}/{filename}_timeline.json"
+            with open(self.timeline_file_path, "w") as f:
+                json.dump(self.throughput_timeline, f, indent=4)
+
+        # Save individual response results, unless they were already streamed to disk during the run
+        if not individual_responses:
+            return
         try:
             self.individual_responses_file_path = (
-                f"{results_dir}/{individual_responses_filename}.json"
+                f"{results_dir}/{individual_responses_filename}.jsonl"
             )
 
-            response_metrics = [response.metrics for response in individual_responses]
-            with open(self.individual_responses_file_path, "w") as f:
-                json.dump(response_metrics, f, indent=4)
+            individual_responses_writer = JSONLWriter(self.individual_responses_file_path)
+            for response in individual_responses:
+                individual_responses_writer.write(response.metrics)
+            individual_responses_writer.close()
         except Exception as e:
             logger.error(individual_responses)
             raise e
 
+    def get_results_dir(self) -> Path:
+        """Gets the results directory, creating it if it doesn't exist
+
+        Raises:
+            ValueError: If the results directory is not a directory.
+
+        Returns:
+            Path: results directory
+        """
+        results_dir = Path(self.results_dir)
+        if not results_dir.exists():
+            results_dir.mkdir(parents=True)
+        elif not results_dir.is_dir():
+            raise ValueError(f"{results_dir} is not a directory")
+        return results_dir
+
+    def run_concurrency_sweep_on_requests(
+        self,
+        request_configs: List[RequestConfig],
+        concurrency_levels: List[int],
+        filename: str,
+        run_metadata: Dict[str, Any] = {},
+        slo_latency_s: Optional[float] = None,
+        slo_metric: str = common_metrics.E2E_LAT,
+        plateau_tolerance: float = 0.05,
+    ) -> Dict[str, Any]:
+        """Runs the same set of prepared requests at each concurrency level, and finds the saturation point of the
+        endpoint, i.e. the concurrency level where throughput plateaus or the p99 latency crosses the SLO.
+
+        Args:
+            request_configs (List[RequestConfig]): prepared request configs, reused across all concurrency levels
+            concurrency_levels (List[int]): concurrency levels to run
+            filename (str): base name of the consolidated results file
+            run_metadata (Dict[str, Any], optional): run specific metadata to add to the results. Defaults to {}.
+            slo_latency_s (Optional[float], optional): p99 latency SLO in seconds. Defaults to None.
+            slo_metric (str, optional): latency metric the SLO applies to. Defaults to client E2E latency.
+            plateau_tolerance (float, optional): minimum relative throughput gain between consecutive concurrency
+                levels under which throughput is considered to have plateaued. Defaults to 0.05.
+
+        Raises:
+            ValueError: If the evaluator runs open-loop or the SLO metric is not supported.
+
+        Returns:
+            Dict[str, Any]: consolidated sweep results, with one point per concurrency level and the saturation point
+        """
+        if self.request_rate is not None:
+            raise ValueError("Concurrency sweeps can't be run with a request rate, unset it to run closed-loop")
+        if slo_metric not in SLO_METRICS:
+            raise ValueError(f"slo_metric must be one of {SLO_METRICS}, got {slo_metric}")
+
+        original_num_workers = self.num_workers
+        sweep_points = []
+        try:
+            for concurrency in sorted(set(concurrency_levels)):
+                logger.info(f"Running concurrency sweep level: {concurrency}")
+                self.num_workers = concurrency
+                for request_config in request_configs:
+                    request_config.num_concurrent_workers = concurrency
+
+                self.reset_metrics_accumulator()
+                start_time = time.monotonic()
+                llm_responses = self.run_requests(request_configs, start_time)
+                end_time = time.monotonic()
+
+                results = self.build_metrics_summary(
+                    metrics=[response.metrics for response in llm_responses],
+                    start_time=start_time,
+                    end_time=end_time,
+                )
+                sweep_points.append(
+                    {
+                        "num_concurrent_workers": concurrency,
+                        common_metrics.OUTPUT_THROUGHPUT: results[common_metrics.OUTPUT_THROUGHPUT],
+                        common_metrics.COMPLETED_REQUESTS_PER_MIN: results[common_metrics.COMPLETED_REQUESTS_PER_MIN],
+                        common_metrics.ERROR_RATE: results[common_metrics.ERROR_RATE],
+                        f"{common_metrics.TTFT}_p50": results[common_metrics.TTFT]["quantiles"]["p50"],
+                        f"{common_metrics.TTFT}_p99": results[common_metrics.TTFT]["quantiles"]["p99"],
+                        f"{common_metrics.E2E_LAT}_p50": results[common_metrics.E2E_LAT]["quantiles"]["p50"],
+                        f"{common_metrics.E2E_LAT}_p99": results[common_metrics.E2E_LAT]["quantiles"]["p99"],
+                    }
+                )
+        finally:
+            self.num_workers = original_num_workers
+
+        saturation = self.find_saturation_point(
+            sweep_points, slo_latency_s, slo_metric, plateau_tolerance
+        )
+        logger.info(f"Concurrency sweep saturation point: {saturation}")
+
+        sweep_results = {
+            "model": self.model_name,
+            "concurrency_levels": [point["num_concurrent_workers"] for point in sweep_points],
+            "slo_metric": slo_metric,
+            "slo_latency_s": slo_latency_s,
+            "plateau_tolerance": plateau_tolerance,
+            "saturation": saturation,
+            "points": sweep_points,
+        }
+        sweep_results.update(run_metadata)
+        sweep_results.update(self.user_metadata)
+
+        if self.results_dir:
+            results_dir = self.get_results_dir()
+            self.sweep_file_path = f"{results_dir}/{filename}_concurrency_sweep.json"
+            with open(self.sweep_file_path, "w") as f:
+                json.dump(sweep_results, f, indent=4, default=str)
+
+        return sweep_results
+
+    @staticmethod
+    def build_throughput_timeline(
+        metrics: Iterable[Dict[str, Any]], window_s: int = 1
+    ) -> List[Dict[str, Any]]:
+        """Buckets the requests of a run in time windows from their start and end timestamps, to show ramp-up, tail
+        drain and throttling that the overall throughput hides. Requests are counted as completed or errored, and
+        their output tokens are counted, in the window they end in. They're counted as in flight in every window
+        from the one they start in to the one they end in.
+
+        Args:
+            metrics (Iterable[Dict[str, Any]]): metrics of each request
+            window_s (int, optional): window size in seconds. Defaults to 1.
+
+        Returns:
+            List[Dict[str, Any]]: one bucket per window, from the start of the first request
+        """
+        start_times = []
+        end_times = []
+        output_tokens = []
+        is_error = []
+        for request_metrics in metrics:
+            start_time = request_metrics.get(common_metrics.REQ_START_TIMESTAMP)
+            if start_time is None:
+                continue
+            # Errored requests may not have an end time
+            end_time = request_metrics.get(common_metrics.REQ_END_TIMESTAMP) or start_time
+            errored = request_metrics.get(common_metrics.ERROR_CODE) is not None
+            start_times.append(start_time)
+            end_times.append(end_time)
+            output_tokens.append(0 if errored else request_metrics.get(common_metrics.NUM_OUTPUT_TOKENS) or 0)
+            is_error.append(errored)
+
+        if not start_times:
+            return []
+
+        start_s = np.array(start_times, dtype=float)
+        end_s = np.array(end_times, dtype=float)
+        origin = start_s.min()
+        start_windows = ((start_s - origin) // window_s).astype(int)
+        end_windows = np.maximum(((end_s - origin) // window_s).astype(int), start_windows)
+        is_error = np.array(is_error)
+
+        num_windows = end_windows.max() + 1
+        started = np.bincount(start_windows, minlength=num_windows)
+        completed = np.bincount(end_windows[~is_error], minlength=num_windows)
+        errors = np.bincount(end_windows[is_error], minlength=num_windows)
+        tokens = np.bincount(end_windows, weights=output_tokens, minlength=num_windows)
+        # Requests leave the in flight count in the window after the one they end in
+        in_flight = np.cumsum(started - np.bincount(end_windows + 1, minlength=num_windows + 1)[:num_windows])
+
+        return [
+            {
+                "window_start_s": int(window_idx * window_s),
+                "started_requests": int(started[window_idx]),
+                "completed_requests": int(completed[window_idx]),
+                "errors": int(errors[window_idx]),
+                "in_flight_requests": int(in_flight[window_idx]),
+                "output_tokens": int(tokens[window_idx]),
+                common_metrics.OUTPUT_THROUGHPUT: round(float(tokens[window_idx]) / window_s, 4),
+            }
+            for window_idx in range(num_windows)
+        ]
+
+    @staticmethod
+    def get_steady_state_throughput(
+        timeline: List[Dict[str, Any]], window_s: int = 1
+    ) -> Optional[float]:
+        """Gets the output throughput over the steady state windows of a timeline, from the first request
+        completion, once the run is warmed up, to the last request start, after which the run drains.
+
+        Args:
+            timeline (List[Dict[str, Any]]): throughput timeline
+            window_s (int, optional): window size in seconds. Defaults to 1.
+
+        Returns:
+            Optional[float]: steady state output throughput, None if the run is too short to have a steady state
+        """
+        completion_windows = [idx for idx, bucket in enumerate(timeline) if bucket["completed_requests"]]
+        start_windows = [idx for idx, bucket in enumerate(timeline) if bucket["started_requests"]]
+        if not completion_windows:
+            return None
+
+        steady_state = timeline[completion_windows[0] : start_windows[-1]]
+        if not steady_state:
+            return None
+        steady_state_tokens = sum(bucket["output_tokens"] for bucket in steady_state)
+        return round(steady_state_tokens / (len(steady_state) * window_s), 4)
+
+    @staticmethod
+    def find_saturation_point(
+        sweep_points: List[Dict[str, Any]],
+        slo_latency_s: Optional[float] = None,
+        slo_metric: str = common_metrics.E2E_LAT,
+        plateau_tolerance: float = 0.05,
+    ) -> Dict[str, Optional[int]]:
+        """Finds the knee of the throughput vs concurrency curve from the points of a concurrency sweep.
+
+        Args:
+            sweep_points (List[Dict[str, Any]]): sweep points sorted by concurrency level
+            slo_latency_s (Optional[float], optional): p99 latency SLO in seconds. Defaults to None.
+            slo_metric (str, optional): latency metric the SLO applies to. Defaults to client E2E latency.
+            plateau_tolerance (float, optional): minimum relative throughput gain between consecutive concurrency
+                levels under which throughput is considered to have plateaued. Defaults to 0.05.
+
+        Returns:
+            Dict[str, Optional[int]]: concurrency level where throughput plateaus, highest concurrency level within the
+            SLO, and the saturation concurrency, which is the lowest of both
+        """
+        plateau_concurrency = None
+        for previous_point, point in zip(sweep_points, sweep_points[1:]):
+            previous_throughput = previous_point[common_metrics.OUTPUT_THROUGHPUT]
+            throughput_gain = (
+                (point[common_metrics.OUTPUT_THROUGHPUT] - previous_throughput) / previous_throughput
+                if previous_throughput
+                else float("inf")
+            )
+            if throughput_gain < plateau_tolerance:
+                plateau_concurrency = previous_point["num_concurrent_workers"]
+                break
+
+        max_concurrency_within_slo = None
+        if slo_latency_s is not None:
+            for point in sweep_points:
+                if point[f"{slo_metric}_p99"] > slo_latency_s:
+                    break
+                max_concurrency_within_slo = point["num_concurrent_workers"]
+
+        candidates = [
+            concurrency
+            for concurrency in [plateau_concurrency, max_concurrency_within_slo]
+            if concurrency is not None
+        ]
+        return {
+            "plateau_concurrency": plateau_concurrency,
+            "max_concurrency_within_slo": max_concurrency_within_slo,
+            "saturation_concurrency": min(candidates) if candidates else None,
+        }
+
 
 class CustomPerformanceEvaluator(BasePerformanceEvaluator):
     def __init__(
@@ -349,6 +1247,7 @@ class CustomPerformanceEvaluator(BasePerformanceEvaluator):
         self.dataset = self.read_dataset(input_file_path)
         self.prompt_key = list(self.dataset[0].keys())[0]
         self.save_response_texts = save_response_texts
+        self._response_texts_writer: Optional[JSONLWriter] = None
 
     @staticmethod
     def read_dataset(input_file_path: str) -> List[Dict]:
@@ -377,6 +1276,8 @@ class CustomPerformanceEvaluator(BasePerformanceEvaluator):
         output_file_name = (
             f"{self.model_name}_{self.file_name}_{self.num_workers}_{generation_mode}"
         )
+        if self.request_rate is not None:
+            output_file_name += f"_{self.request_rate}rps_{self.arrival_distribution}"
         return self.sanitize_file_prefix(output_file_name)
 
     def save_results(
@@ -398,32 +1299,79 @@ class CustomPerformanceEvaluator(BasePerformanceEvaluator):
 
         super().save_results(filename, summary, individual_responses)
 
-        # If specified, save the llm responses to output file
-        if self.save_response_texts:
+        # If specified, save the llm responses to output file, unless they were already streamed to disk during the run
+        if self.save_response_texts and individual_responses:
 
             # Create response texts file name
             response_texts_file_name = f"{filename}_response_texts"
             results_dir = Path(self.results_dir)
 
-            # Save response texts
-            try:
-                self.response_texts_file_path = (
-                    f"{results_dir}/{response_texts_file_name}.jsonl"
-                )
-                with open(self.response_texts_file_path, "w") as f:
-                    for response in individual_responses:
-                        output_json = {
-                            "prompt": response.request_config.prompt_tuple[0],
-                            "completion": str(response.response_text),
-                        }
-                        f.write(json.dumps(output_json))
-                        f.write("\n")
-            except Exception as e:
-                logger.error("ERROR SAVING LLM OUTPUTS")
-                raise e
+            # Save response texts
+            try:
+                self.response_texts_file_path = (
+                    f"{results_dir}/{response_texts_file_name}.jsonl"
+                )
+                with open(self.response_texts_file_path, "w") as f:
+                    for response in individual_responses:
+                        f.write(json.dumps(self.build_response_text_record(response)))
+                        f.write("\n")
+            except Exception as e:
+                logger.error("ERROR SAVING LLM OUTPUTS")
+                raise e
+
+    @staticmethod
+    def build_response_text_record(response: LLMResponse) -> Dict[str, Any]:
+        """Builds the prompt and completion record saved for a response
+
+        Args:
+            response (LLMResponse): completed request response
+
+        Returns:
+            Dict[str, Any]: prompt and completion record
+        """
+        return {
+            common_metrics.REQ_IDX: response.metrics.get(common_metrics.REQ_IDX),
+            "prompt": response.request_config.prompt_tuple[0],
+            "completion": str(response.response_text),
+        }
+
+    def write_response(self, response: LLMResponse) -> None:
+        """Writes the metrics of a completed request to the individual responses file, and its prompt and
+        completion to the response texts file if specified
+
+        Args:
+            response (LLMResponse): completed request response
+        """
+        super().write_response(response)
+        if self._response_texts_writer is not None:
+            self._response_texts_writer.write(self.build_response_text_record(response))
+
+    def open_results_writers(self, filename: str) -> None:
+        """Opens the files where per-request results, and response texts if specified, are appended as each
+        request completes
+
+        Args:
+            filename (str): The base name of the files to save the results to.
+        """
+        super().open_results_writers(filename)
+        if self.save_response_texts:
+            self.response_texts_file_path = (
+                f"{self.get_results_dir()}/{filename}_response_texts.jsonl"
+            )
+            self._response_texts_writer = JSONLWriter(
+                self.response_texts_file_path, append=self.resume
+            )
+
+    def close_results_writers(self) -> None:
+        """Closes the files where per-request results and response texts are appended"""
+        super().close_results_writers()
+        if self._response_texts_writer is not None:
+            self._response_texts_writer.close()
+            self._response_texts_writer = None
 
     def run_benchmark(self, sampling_params: Dict[str, Any]):
         """Run a benchmark test for the specified LLM using a custom dataset provided by the user.
+        Per-request results are appended to the results directory as each request completes.
 
         Args:
             sampling_params (Dict[str, Any]): The sampling parameters in JSON format.
@@ -431,20 +1379,68 @@ class CustomPerformanceEvaluator(BasePerformanceEvaluator):
         Returns:
             None
         """
+        filename = self.create_output_filename()
+        if self.results_dir:
+            self.open_results_writers(filename)
+
         # Calculate performance metrics individually and summary
-        summary, individual_responses = self.get_token_throughput_latencies(
-            sampling_params=sampling_params,
-        )
+        try:
+            summary, individual_responses = self.get_token_throughput_latencies(
+                sampling_params=sampling_params,
+            )
+        finally:
+            self.close_results_writers()
 
         # Save benchmarking results to the specified results directory, it it exists
         if self.results_dir:
-            filename = self.create_output_filename()
             self.save_results(
                 filename,
                 summary,
                 individual_responses,
             )
 
+    def run_concurrency_sweep(
+        self,
+        concurrency_levels: List[int],
+        sampling_params: Dict[str, Any],
+        slo_latency_s: Optional[float] = None,
+        slo_metric: str = common_metrics.E2E_LAT,
+        plateau_tolerance: float = 0.05,
+    ) -> Dict[str, Any]:
+        """Run the custom dataset benchmark at each of the concurrency levels, building the prompts only once.
+
+        Args:
+            concurrency_levels (List[int]): concurrency levels to run
+            sampling_params (Dict[str, Any]): The sampling parameters in JSON format.
+            slo_latency_s (Optional[float], optional): p99 latency SLO in seconds. Defaults to None.
+            slo_metric (str, optional): latency metric the SLO applies to. Defaults to client E2E latency.
+            plateau_tolerance (float, optional): minimum relative throughput gain to keep increasing concurrency.
+                Defaults to 0.05.
+
+        Returns:
+            Dict[str, Any]: consolidated sweep results
+        """
+        random.seed(11111)
+        request_configs = self.build_request_configs(sampling_params)
+
+        generation_mode = "stream" if self.is_stream_mode else ""
+        filename = self.sanitize_file_prefix(
+            f"{self.model_name}_{self.file_name}_{min(concurrency_levels)}-{max(concurrency_levels)}_{generation_mode}"
+        )
+        run_metadata = {
+            "request_count": len(self.dataset),
+            "sampling_params": sampling_params,
+        }
+        return self.run_concurrency_sweep_on_requests(
+            request_configs,
+            concurrency_levels,
+            filename,
+            run_metadata,
+            slo_latency_s,
+            slo_metric,
+            plateau_tolerance,
+        )
+
     def get_token_throughput_latencies(
         self, sampling_params: Dict[str, Any]
     ) -> Tuple[Dict[str, Any], List[Tuple[Dict[str, Any], str, RequestConfig]]]:
@@ -460,8 +1456,9 @@ class CustomPerformanceEvaluator(BasePerformanceEvaluator):
             Exception: If an unexpected error happens when executing requests.
 
         Note:
-            This function uses threading to send requests concurrently. It splits the total request count evenly among the threads.
-            If there is a remainder, it assigns one extra request to the first threads.
+            This function uses threading to send requests concurrently. Threads pull requests from a shared queue,
+            keeping `num_workers` requests in flight until the dataset is drained.
+            If a request rate is set, requests are sent open-loop following the arrival schedule instead.
         """
         random.seed(11111)
         start_time = time.monotonic()
@@ -470,62 +1467,28 @@ class CustomPerformanceEvaluator(BasePerformanceEvaluator):
             sampling_params,
         )
 
-        # Get batch size details
-        total_request_count = len(request_configs)
-        requests_per_thread = total_request_count // self.num_workers
-        remainder = total_request_count % self.num_workers
-
-        request_config_batches = []
-        idx = 0
-        for worker in range(self.num_workers):
-            num_requests_for_thread = requests_per_thread + (
-                1 if worker < remainder else 0
-            )
-            request_config_batch = request_configs[
-                idx : idx + num_requests_for_thread
-            ].copy()
-            idx = idx + num_requests_for_thread
-            request_config_batches.append(request_config_batch)
-
-        threads = []
-        llm_responses: List[LLMResponse] = []
-        progress_bar = tqdm(total=total_request_count, desc="Running Requests")
-
-        for request_config_batch in request_config_batches:
-            thread = threading.Thread(
-                target=self.send_requests,
-                args=(
-                    request_config_batch,
-                    llm_responses,
-                    progress_bar,
-                    start_time,
-                ),
-            )
-            threads.append(thread)
-            thread.start()
+        # Skip requests recorded by a previous run when resuming
+        self.reset_metrics_accumulator()
+        request_configs = self.skip_recorded_requests(request_configs)
 
-        for thread in threads:
-            thread.join()
+        # Send requests and collect responses
+        llm_responses = self.run_requests(request_configs, start_time)
 
-        if llm_responses[0].metrics[common_metrics.ERROR_CODE]:
-            raise Exception(
-                f"Unexpected error happened when executing requests: {llm_responses[0].metrics['error_code']}. Additional message: {llm_responses[0].metrics['error_msg']}"
-            )
+        # Error handling
+        self.check_first_response(llm_responses)
 
         end_time = time.monotonic()
         logger.info("Tasks Executed!")
         logger.info(
             f"Results for token benchmark for {self.model_name} queried with the {self.llm_api} api."
         )
-        results = self.build_metrics_summary(
-            metrics=[response.metrics for response in llm_responses],
-            start_time=start_time,
-            end_time=end_time,
-        )
+        results = self.summarize_run(llm_responses, start_time, end_time)
 
         metadata = {
             "model": self.model_name,
             "num_concurrent_workers": self.num_workers,
+            "request_rate": self.request_rate,
+            "arrival_distribution": self.arrival_distribution if self.request_rate else None,
             "results": results,
             "request_count": len(self.dataset),
             "sampling_params": sampling_params,
@@ -551,7 +1514,7 @@ class CustomPerformanceEvaluator(BasePerformanceEvaluator):
         request_configs = []
 
         # Iterate through data points and build a request config for each
-        for data_point in self.dataset:
+        for request_idx, data_point in enumerate(self.dataset):
 
             # Apply prompt templating to get final prompt to send to LLM API along with tokenized prompt length
             prompt_tuple = self.build_prompt(raw_prompt=data_point[self.prompt_key])
@@ -563,6 +1526,8 @@ class CustomPerformanceEvaluator(BasePerformanceEvaluator):
                 llm_api=self.llm_api,
                 is_stream_mode=self.is_stream_mode,
                 num_concurrent_workers=self.num_workers,
+                record_connection_setup_time=self.record_connection_setup_time,
+                metadata={common_metrics.REQ_IDX: request_idx},
             )
 
             request_configs.append(request_config)
@@ -623,8 +1588,13 @@ class CustomPerformanceEvaluator(BasePerformanceEvaluator):
 
 class SyntheticPerformanceEvaluator(BasePerformanceEvaluator):
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, num_unique_prompts: int = 1, **kwargs):
         super().__init__(*args, **kwargs)
+        if num_unique_prompts < 1:
+            raise ValueError(f"num_unique_prompts must be at least 1, got {num_unique_prompts}")
+        # Number of distinct prompts of the same length to cycle through, so server prefix caching
+        # doesn't flatter the results
+        self.num_unique_prompts = num_unique_prompts
 
     def create_output_filename(
         self, num_input_tokens: int, num_output_tokens: int
@@ -639,6 +1609,8 @@ class SyntheticPerformanceEvaluator(BasePerformanceEvaluator):
             generation_mode = "stream"
 
         output_file_name = f"{self.model_name}_{num_input_tokens}_{num_output_tokens}_{self.num_workers}_{generation_mode}"
+        if self.request_rate is not None:
+            output_file_name += f"_{self.request_rate}rps_{self.arrival_distribution}"
         return self.sanitize_file_prefix(output_file_name)
 
     def run_benchmark(
@@ -661,7 +1633,8 @@ class SyntheticPerformanceEvaluator(BasePerformanceEvaluator):
 
         Returns:
             summary (dict): structure with performance metrics and stats for the run
-            individual_responses (tuple): list of performance metrics per request
+            individual_responses (tuple): list of performance metrics per request. Empty if a results directory is
+                set, in which case they're streamed to the individual responses file as each request completes.
         """
         if num_input_tokens < 40:
             raise ValueError(
@@ -669,20 +1642,89 @@ class SyntheticPerformanceEvaluator(BasePerformanceEvaluator):
                 " because of the prompting logic right now"
             )
 
+        filename = self.create_output_filename(num_input_tokens, num_output_tokens)
+        if self.results_dir:
+            self.open_results_writers(filename)
+
         # Calculate performance metrics individually and summary
-        summary, individual_responses = self.get_token_throughput_latencies(
-            num_input_tokens=num_input_tokens,
-            num_output_tokens=num_output_tokens,
-            num_requests=num_requests,
-            sampling_params=sampling_params,
-        )
+        try:
+            summary, individual_responses = self.get_token_throughput_latencies(
+                num_input_tokens=num_input_tokens,
+                num_output_tokens=num_output_tokens,
+                num_requests=num_requests,
+                sampling_params=sampling_params,
+            )
+        finally:
+            self.close_results_writers()
 
         if self.results_dir:
-            filename = self.create_output_filename(num_input_tokens, num_output_tokens)
             self.save_results(filename, summary, individual_responses)
 
         return summary, individual_responses
 
+    def run_concurrency_sweep(
+        self,
+        concurrency_levels: List[int],
+        num_input_tokens: int,
+        num_output_tokens: int,
+        num_requests: int,
+        sampling_params: Dict[str, Any],
+        slo_latency_s: Optional[float] = None,
+        slo_metric: str = common_metrics.E2E_LAT,
+        plateau_tolerance: float = 0.05,
+    ) -> Dict[str, Any]:
+        """Run the synthetic benchmark at each of the concurrency levels, building the prompts only once.
+
+        Args:
+            concurrency_levels (List[int]): concurrency levels to run
+            num_input_tokens (int): The number of input tokens to be sent.
+            num_output_tokens (int): The number of output tokens to be received.
+            num_requests (int): The number of requests to be made at each concurrency level.
+            sampling_params (Dict[str, Any]): The sampling parameters in JSON format.
+            slo_latency_s (Optional[float], optional): p99 latency SLO in seconds. Defaults to None.
+            slo_metric (str, optional): latency metric the SLO applies to. Defaults to client E2E latency.
+            plateau_tolerance (float, optional): minimum relative throughput gain to keep increasing concurrency.
+                Defaults to 0.05.
+
+        Raises:
+            ValueError: If the number of input tokens is less than 40.
+
+        Returns:
+            Dict[str, Any]: consolidated sweep results
+        """
+        if num_input_tokens < 40:
+            raise ValueError(
+                "The minimum number of input tokens that will be sent is 40"
+                " because of the prompting logic right now"
+            )
+
+        random.seed(11111)
+        request_configs = self.build_request_configs(
+            num_requests, num_input_tokens, num_output_tokens, sampling_params
+        )
+
+        generation_mode = "stream" if self.is_stream_mode else ""
+        filename = self.sanitize_file_prefix(
+            f"{self.model_name}_{num_input_tokens}_{num_output_tokens}_"
+            f"{min(concurrency_levels)}-{max(concurrency_levels)}_{generation_mode}"
+        )
+        run_metadata = {
+            "num_input_tokens": num_input_tokens,
+            "num_output_tokens": num_output_tokens,
+            "num_unique_prompts": self.num_unique_prompts,
+            "num_requests": num_requests,
+            "additional_sampling_params": sampling_params,
+        }
+        return self.run_concurrency_sweep_on_requests(
+            request_configs,
+            concurrency_levels,
+            filename,
+            run_metadata,
+            slo_latency_s,
+            slo_metric,
+            plateau_tolerance,
+        )
+
     def get_token_throughput_latencies(
         self,
         num_input_tokens: int,
@@ -718,55 +1760,15 @@ class SyntheticPerformanceEvaluator(BasePerformanceEvaluator):
             num_requests, num_input_tokens, num_output_tokens, sampling_params
         )
 
-        # Get the request counts in order to place them into threads to be executed in batches
-        total_request_count = len(request_configs)
-        requests_per_thread = (total_request_count) // self.num_workers
-        remainder = (total_request_count) % self.num_workers
-
-        # Set up empty batch array and index for a sliding window of request selection
-        request_config_batches = []
-        idx = 0
-
-        # Create batches of requests for each worker
-        for worker in range(self.num_workers):
-            num_requests_for_thread = requests_per_thread + (
-                1 if worker < remainder else 0
-            )
-            request_config_batch = request_configs[
-                idx : idx + num_requests_for_thread
-            ].copy()
-            idx += num_requests_for_thread
-            request_config_batches.append(request_config_batch)
-
-        # Create empty `threads` and `completed_requests` arrays to be populated with execution threads and
-        # completed requests respectively
-        threads = []
-        llm_responses = []
-        progress_bar = tqdm(total=total_request_count, desc="Running Requests")
-
-        # Send request threads and add to the threads array
-        for request_config_batch in request_config_batches:
-            thread = threading.Thread(
-                target=self.send_requests,
-                args=(
-                    request_config_batch,
-                    llm_responses,
-                    progress_bar,
-                    start_time,
-                ),
-            )
-            threads.append(thread)
-            thread.start()
+        # Skip requests recorded by a previous run when resuming
+        self.reset_metrics_accumulator()
+        request_configs = self.skip_recorded_requests(request_configs)
 
-        # Wait for all threads to complete
-        for thread in threads:
-            thread.join()
+        # Send requests and collect responses
+        llm_responses = self.run_requests(request_configs, start_time)
 
         # Error handling
-        if llm_responses[0].metrics["error_code"]:
-            raise Exception(
-                f"Unexpected error happened when executing requests: {llm_responses[0].metrics['error_code']}. Additional message: {llm_responses[0].metrics['error_msg']}"
-            )
+        self.check_first_response(llm_responses)
 
         # Capture end time and notify user
         end_time = time.monotonic()
@@ -776,19 +1778,18 @@ class SyntheticPerformanceEvaluator(BasePerformanceEvaluator):
         )
 
         # Build a metrics summary for the results of the benchmarking run
-        results = self.build_metrics_summary(
-            metrics=[response.metrics for response in llm_responses],
-            start_time=start_time,
-            end_time=end_time,
-        )
+        results = self.summarize_run(llm_responses, start_time, end_time)
 
         # Construct metadata payload to be returned
         metadata = {
             "model": self.model_name,
             "num_concurrent_workers": self.num_workers,
+            "request_rate": self.request_rate,
+            "arrival_distribution": self.arrival_distribution if self.request_rate else None,
             "results": results,
             "num_input_tokens": num_input_tokens,
             "num_output_tokens": num_output_tokens,
+            "num_unique_prompts": self.num_unique_prompts,
             "additional_sampling_params": sampling_params,
         }
 
@@ -820,10 +1821,15 @@ class SyntheticPerformanceEvaluator(BasePerformanceEvaluator):
         request_configs = []
 
         # Iterate through data points and build a request config for each
-        for _ in range(num_requests):
+        for request_idx in range(num_requests):
 
             # Build input prompt to be sent in LLM request
-            prompt_tuple = self.build_prompt(input_token_count)
+            if self.num_unique_prompts > 1:
+                prompt_tuple = self.build_prompt(
+                    input_token_count, request_idx % self.num_unique_prompts
+                )
+            else:
+                prompt_tuple = self.build_prompt(input_token_count)
 
             # Add max_tokens_to_generate to `sampling_params` dictionary
             if self.llm_api == "sncloud":
@@ -844,31 +1850,330 @@ class SyntheticPerformanceEvaluator(BasePerformanceEvaluator):
                 llm_api=self.llm_api,
                 is_stream_mode=self.is_stream_mode,
                 num_concurrent_workers=self.num_workers,
+                record_connection_setup_time=self.record_connection_setup_time,
+                metadata={common_metrics.REQ_IDX: request_idx},
             )
 
             request_configs.append(request_config)
 
         return request_configs
 
-    def build_prompt(self, num_input_tokens: int) -> Tuple[str, int]:
+    def build_prompt(
+        self, num_input_tokens: int, prompt_idx: Optional[int] = None
+    ) -> Tuple[str, int]:
         """Synthesizes an input prompt for the LLM to be queried. This prompt is created by repeating a prompt_template
-        multiple times to reach a user set input_token_count.
+        multiple times to reach a user set input_token_count. Prompts are cached, so each distinct prompt is
+        only built and tokenized once per tokenizer.
 
         Args:
             num_input_tokens (int): The user specified length of the input prompt.
+            prompt_idx (Optional[int], optional): Index of the unique prompt to build. If set, the prompt starts with
+                a prefix specific to that index, so prompts with different indexes share no common prefix.
+                Defaults to None.
 
         Returns:
             Tuple[str, int]: A tuple containing the generated prompt and its length in tokens.
         """
 
+        cache_key = (self.tokenizer.name_or_path, num_input_tokens, prompt_idx)
+        if cache_key in _synthetic_prompt_cache:
+            return _synthetic_prompt_cache[cache_key]
+
         # Load from prompt files
-        prompt_template = yaml.safe_load(
-            PromptTemplate.from_file(USER_PROMPT_PATH).template
-        )["template"]
+        prompt_template = load_user_prompt_template()
+        if prompt_idx is not None:
+            prompt_template = f"Request {prompt_idx}. {prompt_template}"
 
         #  Adjust prompt according to desired input tokens
         full_input_prompt = self.adjust_to_exact_tokens(
             prompt_template, num_input_tokens
         )
 
-        return (full_input_prompt, self.get_token_length(full_input_prompt))
+        prompt_tuple = (full_input_prompt, self.get_token_length(full_input_prompt))
+        _synthetic_prompt_cache[cache_key] = prompt_tuple
+        return prompt_tuple
+
+
+class MultiTurnPerformanceEvaluator(BasePerformanceEvaluator):
+    """Runs a benchmark with a multi-turn chat workload, with conversations of growing context and system prompts
+    shared by a configurable share of the conversations, to measure how endpoint latency scales with context reuse.
+    Input and output lengths of each turn are drawn from distributions.
+    """
+
+    def __init__(
+        self,
+        *args,
+        num_conversations: int = 10,
+        num_turns: int = 4,
+        system_prompt_tokens: int = 1000,
+        prefix_sharing_ratio: float = 1.0,
+        input_length: Optional[LengthDistribution] = None,
+        output_length: Optional[LengthDistribution] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.workload_generator = MultiTurnWorkloadGenerator(
+            tokenizer=self.tokenizer,
+            filler_text=load_user_prompt_template(),
+            num_conversations=num_conversations,
+            num_turns=num_turns,
+            system_prompt_tokens=system_prompt_tokens,
+            prefix_sharing_ratio=prefix_sharing_ratio,
+            input_length=input_length or LengthDistribution(mean=200, distribution="lognormal", stddev=100),
+            output_length=output_length or LengthDistribution(mean=150),
+        )
+
+    def create_output_filename(self) -> str:
+        """Utility for creating a unique filename for a multi-turn benchmarking experiment given user specified params.
+
+        Returns:
+            str: Filename for the multi-turn benchmark run.
+        """
+        generation_mode = ""
+        if self.is_stream_mode:
+            generation_mode = "stream"
+
+        workload = self.workload_generator
+        output_file_name = (
+            f"{self.model_name}_multiturn_{workload.num_conversations}x{workload.num_turns}"
+            f"_{workload.system_prompt_tokens}_{workload.prefix_sharing_ratio}_{self.num_workers}_{generation_mode}"
+        )
+        if self.request_rate is not None:
+            output_file_name += f"_{self.request_rate}rps_{self.arrival_distribution}"
+        return self.sanitize_file_prefix(output_file_name)
+
+    def run_benchmark(self, sampling_params: Dict[str, Any]) -> tuple:
+        """Run a benchmark test for the specified LLM using a generated multi-turn workload.
+
+        Args:
+            sampling_params (Dict[str, Any]): The sampling parameters in JSON format.
+
+        Returns:
+            summary (dict): structure with performance metrics and stats for the run
+            individual_responses (tuple): list of performance metrics per request. Empty if a results directory is
+                set, in which case they're streamed to the individual responses file as each request completes.
+        """
+        filename = self.create_output_filename()
+        if self.results_dir:
+            self.open_results_writers(filename)
+
+        # Calculate performance metrics individually and summary
+        try:
+            summary, individual_responses = self.get_token_throughput_latencies(
+                sampling_params=sampling_params,
+            )
+        finally:
+            self.close_results_writers()
+
+        if self.results_dir:
+            self.save_results(filename, summary, individual_responses)
+
+        return summary, individual_responses
+
+    def run_concurrency_sweep(
+        self,
+        concurrency_levels: List[int],
+        sampling_params: Dict[str, Any],
+        slo_latency_s: Optional[float] = None,
+        slo_metric: str = common_metrics.E2E_LAT,
+        plateau_tolerance: float = 0.05,
+    ) -> Dict[str, Any]:
+        """Run the multi-turn workload at each of the concurrency levels, generating the workload only once.
+
+        Args:
+            concurrency_levels (List[int]): concurrency levels to run
+            sampling_params (Dict[str, Any]): The sampling parameters in JSON format.
+            slo_latency_s (Optional[float], optional): p99 latency SLO in seconds. Defaults to None.
+            slo_metric (str, optional): latency metric the SLO applies to. Defaults to client E2E latency.
+            plateau_tolerance (float, optional): minimum relative throughput gain to keep increasing concurrency.
+                Defaults to 0.05.
+
+        Returns:
+            Dict[str, Any]: consolidated sweep results
+        """
+        random.seed(11111)
+        request_configs = self.build_request_configs(sampling_params)
+
+        workload = self.workload_generator
+        generation_mode = "stream" if self.is_stream_mode else ""
+        filename = self.sanitize_file_prefix(
+            f"{self.model_name}_multiturn_{workload.num_conversations}x{workload.num_turns}"
+            f"_{workload.system_prompt_tokens}_{workload.prefix_sharing_ratio}"
+            f"_{min(concurrency_levels)}-{max(concurrency_levels)}_{generation_mode}"
+        )
+        run_metadata = {
+            "num_conversations": workload.num_conversations,
+            "num_turns": workload.num_turns,
+            "system_prompt_tokens": workload.system_prompt_tokens,
+            "prefix_sharing_ratio": workload.prefix_sharing_ratio,
+            "input_length": repr(workload.input_length),
+            "output_length": repr(workload.output_length),
+            "additional_sampling_params": sampling_params,
+        }
+        return self.run_concurrency_sweep_on_requests(
+            request_configs,
+            concurrency_levels,
+            filename,
+            run_metadata,
+            slo_latency_s,
+            slo_metric,
+            plateau_tolerance,
+        )
+
+    def get_token_throughput_latencies(
+        self, sampling_params: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], List[LLMResponse]]:
+        """Gets the token throughput and latencies of the multi-turn workload, along with their breakdown per turn
+        and system prompt sharing.
+
+        Args:
+            sampling_params (Dict[str, Any]): The sampling parameters in JSON format.
+
+        Returns:
+            metadata (dict): A dictionary containing the results of the benchmark and the workload parameters.
+            completed_requests (list): A list of completed requests.
+        """
+        random.seed(11111)
+        start_time = time.monotonic()
+
+        # Build the request config objects that are to be sent to the LLM API endpoint
+        request_configs = self.build_request_configs(sampling_params)
+
+        # Skip requests recorded by a previous run when resuming
+        self.reset_metrics_accumulator()
+        request_configs = self.skip_recorded_requests(request_configs)
+
+        # Send requests and collect responses
+        llm_responses = self.run_requests(request_configs, start_time)
+
+        # Error handling
+        self.check_first_response(llm_responses)
+
+        end_time = time.monotonic()
+        logger.info("Tasks Executed!")
+        logger.info(
+            f"Results for token benchmark for {self.model_name} queried with the {self.llm_api} api."
+        )
+        results = self.summarize_run(llm_responses, start_time, end_time)
+        results["context_reuse"] = self.build_context_reuse_summary(
+            self.get_response_metrics(llm_responses)
+        )
+
+        workload = self.workload_generator
+        metadata = {
+            "model": self.model_name,
+            "num_concurrent_workers": self.num_workers,
+            "request_rate": self.request_rate,
+            "arrival_distribution": self.arrival_distribution if self.request_rate else None,
+            "results": results,
+            "num_conversations": workload.num_conversations,
+            "num_turns": workload.num_turns,
+            "system_prompt_tokens": workload.system_prompt_tokens,
+            "prefix_sharing_ratio": workload.prefix_sharing_ratio,
+            "input_length": repr(workload.input_length),
+            "output_length": repr(workload.output_length),
+            "additional_sampling_params": sampling_params,
+        }
+
+        return metadata, llm_responses
+
+    @staticmethod
+    def build_context_reuse_summary(metrics: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Breaks down the median input tokens, TTFT and E2E latency of the successful requests per turn and per
+        system prompt sharing, to show how latency scales with the reused context
+
+        Args:
+            metrics (Iterable[Dict[str, Any]]): metrics of each request
+
+        Returns:
+            Dict[str, Any]: breakdown per turn and per system prompt sharing
+        """
+        columns = [
+            common_metrics.TURN_IDX,
+            common_metrics.SHARES_SYSTEM_PROMPT,
+            common_metrics.NUM_INPUT_TOKENS,
+            common_metrics.TTFT,
+            common_metrics.E2E_LAT,
+        ]
+        metrics_df = pd.DataFrame(
+            [
+                {column: request_metrics.get(column) for column in columns}
+                for request_metrics in metrics
+                if request_metrics.get(common_metrics.ERROR_CODE) is None
+            ],
+            columns=columns,
+        )
+        value_columns = [common_metrics.NUM_INPUT_TOKENS, common_metrics.TTFT, common_metrics.E2E_LAT]
+        return {
+            "p50_by_turn": metrics_df.groupby(common_metrics.TURN_IDX)[value_columns]
+            .median()
+            .round(4)
+            .to_dict(orient="index"),
+            "p50_by_system_prompt_sharing": metrics_df.groupby(common_metrics.SHARES_SYSTEM_PROMPT)[value_columns]
+            .median()
+            .round(4)
+            .rename(index=lambda shares: "shared" if shares else "unique")
+            .to_dict(orient="index"),
+        }
+
+    def build_request_configs(self, sampling_params: Dict[str, Any]) -> List[RequestConfig]:
+        """Builds a request config for each turn of each conversation of the workload, with its number of output
+        tokens as the maximum number of tokens to generate
+
+        Args:
+            sampling_params (Dict[str, Any]): A dictionary of sampling parameters for the LLM.
+
+        Returns:
+            List[RequestConfig]: A list of request configurations, ordered turn by turn.
+        """
+        request_configs = []
+        for request_idx, workload_request in enumerate(self.workload_generator.generate()):
+            if self.llm_api == "sncloud":
+                updated_sampling_params = {
+                    "max_tokens": workload_request.num_output_tokens,
+                }
+            else:
+                updated_sampling_params = {
+                    "max_tokens_to_generate": workload_request.num_output_tokens,
+                }
+            updated_sampling_params.update(sampling_params)
+
+            request_config = RequestConfig(
+                model=self.model_name,
+                prompt_tuple=self.build_prompt(workload_request.messages),
+                messages=workload_request.messages,
+                sampling_params=updated_sampling_params,
+                llm_api=self.llm_api,
+                is_stream_mode=self.is_stream_mode,
+                num_concurrent_workers=self.num_workers,
+                record_connection_setup_time=self.record_connection_setup_time,
+                metadata={
+                    common_metrics.REQ_IDX: request_idx,
+                    common_metrics.CONVERSATION_IDX: workload_request.conversation_idx,
+                    common_metrics.TURN_IDX: workload_request.turn_idx,
+                    common_metrics.SHARES_SYSTEM_PROMPT: workload_request.shares_system_prompt,
+                },
+            )
+            request_configs.append(request_config)
+
+        return request_configs
+
+    def build_prompt(self, messages: List[Dict[str, str]]) -> Tuple[str, int]:
+        """Renders the chat history of a turn into a prompt, with the model's chat template if its tokenizer has one.
+        Chat endpoints are sent the messages and apply the template themselves, the prompt then only gives the number
+        of input tokens.
+
+        Args:
+            messages (List[Dict[str, str]]): chat history, from the system prompt to the turn's user message
+
+        Returns:
+            Tuple[str, int]: A tuple containing the prompt and its length in tokens.
+        """
+        if getattr(self.tokenizer, "chat_template", None):
+            prompt = self.tokenizer.apply_chat_template(
+                messages, tokenize=False, add_generation_prompt=True
+            )
+        else:
+            prompt = "\n\n".join(f"{message['role']}: {message['content']}" for message in messages)
+            prompt += "\n\nassistant:"
+        return (prompt, self.get_token_length(prompt))
@@ -0,0 +1,215 @@
+import math
+import random
+from typing import Dict, List, NamedTuple, Optional
+
+from transformers import AutoTokenizer
+
+LENGTH_DISTRIBUTIONS = ["constant", "uniform", "normal", "lognormal"]
+
+
+class LengthDistribution:
+    """Distribution of token lengths, from which the input and output lengths of each turn are drawn.
+
+    Args:
+        mean (float): mean length in tokens
+        distribution (str, optional): one of `LENGTH_DISTRIBUTIONS`. Defaults to "constant".
+        stddev (float, optional): standard deviation in tokens. For "uniform", lengths are drawn from
+            [mean - stddev, mean + stddev]. Defaults to 0.
+        min_length (int, optional): minimum length drawn. Defaults to 1.
+        max_length (Optional[int], optional): maximum length drawn. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        mean: float,
+        distribution: str = "constant",
+        stddev: float = 0,
+        min_length: int = 1,
+        max_length: Optional[int] = None,
+    ) -> None:
+        if distribution not in LENGTH_DISTRIBUTIONS:
+            raise ValueError(
+                f"distribution must be one of {LENGTH_DISTRIBUTIONS}, got {distribution}"
+            )
+        if mean <= 0 or stddev < 0:
+            raise ValueError(f"mean must be positive and stddev non-negative, got {mean} and {stddev}")
+        self.mean = mean
+        self.distribution = distribution
+        self.stddev = stddev
+        self.min_length = min_length
+        self.max_length = max_length
+
+    @classmethod
+    def parse(cls, value: str) -> "LengthDistribution":
+        """Parses a distribution formatted as "<distribution>:<mean>[:<stddev>]", e.g. "lognormal:550:200",
+        or as a single number for a constant length
+
+        Args:
+            value (str): distribution to parse
+
+        Returns:
+            LengthDistribution: parsed distribution
+        """
+        parts = value.split(":")
+        if len(parts) == 1:
+            return cls(mean=float(parts[0]))
+        stddev = float(parts[2]) if len(parts) > 2 else 0
+        return cls(mean=float(parts[1]), distribution=parts[0], stddev=stddev)
+
+    def sample(self, rng: random.Random) -> int:
+        """Draws a length
+
+        Args:
+            rng (random.Random): random number generator
+
+        Returns:
+            int: length in tokens
+        """
+        if self.distribution == "constant" or self.stddev == 0:
+            length = self.mean
+        elif self.distribution == "uniform":
+            length = rng.uniform(self.mean - self.stddev, self.mean + self.stddev)
+        elif self.distribution == "normal":
+            length = rng.gauss(self.mean, self.stddev)
+        else:
+            # Parameters of the underlying normal distribution, so the lengths have the given mean and stddev
+            sigma = math.sqrt(math.log(1 + (self.stddev / self.mean) ** 2))
+            mu = math.log(self.mean) - sigma**2 / 2
+            length = rng.lognormvariate(mu, sigma)
+
+        length = max(int(round(length)), self.min_length)
+        if self.max_length is not None:
+            length = min(length, self.max_length)
+        return length
+
+    def __repr__(self) -> str:
+        return f"{self.distribution}:{self.mean}:{self.stddev}"
+
+
+class WorkloadRequest(NamedTuple):
+    """A request of a multi-turn workload: the chat history up to and including the turn's user message, and the
+    number of tokens to generate for it"""
+
+    conversation_idx: int
+    turn_idx: int
+    messages: List[Dict[str, str]]
+    num_output_tokens: int
+    shares_system_prompt: bool
+
+
+class MultiTurnWorkloadGenerator:
+    """Generates multi-turn chat conversations to benchmark how endpoint latency scales with context reuse.
+
+    Each conversation starts with a system prompt. A `prefix_sharing_ratio` share of the conversations use the
+    same system prompt, so their requests share a common prefix across conversations, while the rest use a system
+    prompt of their own. Each turn adds a user message and an assistant reply to the conversation, so the context of
+    a conversation grows turn after turn and every request shares the previous turns as prefix. Since requests are
+    built ahead of the run, the assistant replies in the context are synthetic texts of the sampled output length
+    rather than the endpoint's actual completions.
+
+    Args:
+        tokenizer (AutoTokenizer): tokenizer used to build texts of a given number of tokens
+        filler_text (str): text whose tokens are cycled through to build the messages
+        num_conversations (int): number of conversations
+        num_turns (int): number of turns per conversation
+        system_prompt_tokens (int): length in tokens of the system prompts
+        prefix_sharing_ratio (float): share of the conversations using the common system prompt, between 0 and 1
+        input_length (LengthDistribution): distribution of the user message lengths
+        output_length (LengthDistribution): distribution of the assistant reply lengths, also used as the number of
+            tokens to generate for each request
+        seed (int, optional): seed of the random number generator. Defaults to 11111.
+    """
+
+    def __init__(
+        self,
+        tokenizer: AutoTokenizer,
+        filler_text: str,
+        num_conversations: int,
+        num_turns: int,
+        system_prompt_tokens: int,
+        prefix_sharing_ratio: float,
+        input_length: LengthDistribution,
+        output_length: LengthDistribution,
+        seed: int = 11111,
+    ) -> None:
+        if num_conversations < 1 or num_turns < 1:
+            raise ValueError(
+                f"num_conversations and num_turns must be at least 1, got {num_conversations} and {num_turns}"
+            )
+        if not 0 <= prefix_sharing_ratio <= 1:
+            raise ValueError(f"prefix_sharing_ratio must be between 0 and 1, got {prefix_sharing_ratio}")
+
+        self.tokenizer = tokenizer
+        self.num_conversations = num_conversations
+        self.num_turns = num_turns
+        self.system_prompt_tokens = system_prompt_tokens
+        self.prefix_sharing_ratio = prefix_sharing_ratio
+        self.input_length = input_length
+        self.output_length = output_length
+        self.rng = random.Random(seed)
+
+        self._filler_token_ids = self.tokenizer.encode(filler_text, add_special_tokens=False)
+        self._filler_offset = 0
+
+    def build_text(self, num_tokens: int, prefix: str = "") -> str:
+        """Builds a text of about `num_tokens` tokens by cycling through the filler tokens. Consecutive texts start
+        at different positions of the filler, so they don't share a prefix by accident.
+
+        Args:
+            num_tokens (int): number of tokens
+            prefix (str, optional): text to start with. Defaults to "".
+
+        Returns:
+            str: built text
+        """
+        num_prefix_tokens = len(self.tokenizer.encode(prefix, add_special_tokens=False)) if prefix else 0
+        num_filler_tokens = max(num_tokens - num_prefix_tokens, 0)
+        token_ids = [
+            self._filler_token_ids[(self._filler_offset + idx) % len(self._filler_token_ids)]
+            for idx in range(num_filler_tokens)
+        ]
+        self._filler_offset = (self._filler_offset + 1 + self.rng.randrange(len(self._filler_token_ids))) % len(
+            self._filler_token_ids
+        )
+        return prefix + self.tokenizer.decode(token_ids)
+
+    def generate(self) -> List[WorkloadRequest]:
+        """Generates the requests of the workload, ordered turn by turn: the first turn of every conversation, then
+        the second turn of every conversation, and so on, so the turns of a conversation are sent in order and
+        spread over the run.
+
+        Returns:
+            List[WorkloadRequest]: requests of the workload
+        """
+        num_sharing_conversations = round(self.num_conversations * self.prefix_sharing_ratio)
+        shared_system_prompt = self.build_text(self.system_prompt_tokens)
+
+        conversations = []
+        for conversation_idx in range(self.num_conversations):
+            shares_system_prompt = conversation_idx < num_sharing_conversations
+            system_prompt = (
+                shared_system_prompt
+                if shares_system_prompt
+                else self.build_text(self.system_prompt_tokens, prefix=f"Conversation {conversation_idx}. ")
+            )
+            conversations.append([{"role": "system", "content": system_prompt}])
+
+        requests = []
+        for turn_idx in range(self.num_turns):
+            for conversation_idx, messages in enumerate(conversations):
+                messages.append(
+                    {"role": "user", "content": self.build_text(self.input_length.sample(self.rng))}
+                )
+                num_output_tokens = self.output_length.sample(self.rng)
+                requests.append(
+                    WorkloadRequest(
+                        conversation_idx=conversation_idx,
+                        turn_idx=turn_idx,
+                        messages=list(messages),
+                        num_output_tokens=num_output_tokens,
+                        shares_system_prompt=conversation_idx < num_sharing_conversations,
+                    )
+                )
+                messages.append({"role": "assistant", "content": self.build_text(num_output_tokens)})
+
+        return requests
@@ -11,7 +11,12 @@ from st_pages import Page, show_pages
 import matplotlib.pyplot as plt
 
 from benchmarking.src.performance_evaluation import SyntheticPerformanceEvaluator
-from streamlit_utils import plot_client_vs_server_barplots, plot_dataframe_summary
+from streamlit_utils import (
+    plot_client_vs_server_barplots,
+    plot_concurrency_sweep,
+    plot_dataframe_summary,
+    plot_throughput_timeline,
+)
 
 from dotenv import load_dotenv
 import warnings
@@ -26,12 +31,12 @@ def _init():
     load_dotenv("../.env", override=True)
 
 
-def _run_performance_evaluation() -> pd.DataFrame:
+def _run_performance_evaluation() -> tuple:
     """Runs the performance evaluation process for different number of workers that will run in parallel.
     Each worker will run num_requests_per_worker requests.
 
     Returns:
-        pd.DataFrame: Dataframe with metrics for each number of workers.
+        tuple: Dataframe with metrics for each number of workers, and dataframe with the throughput timeline.
     """
 
     results_path = "./data/results/llmperf"
@@ -53,7 +58,7 @@ def _run_performance_evaluation() -> pd.DataFrame:
     )
 
     # Read generated json and output formatted results
-    df_user = pd.read_json(performance_evaluator.individual_responses_file_path)
+    df_user = pd.read_json(performance_evaluator.individual_responses_file_path, lines=True)
     df_user["concurrent_user"] = st.session_state.number_concurrent_workers
     valid_df = df_user[(df_user["error_code"] != "")]
 
@@ -61,7 +66,43 @@ def _run_performance_evaluation() -> pd.DataFrame:
     if valid_df["batch_size_used"].isnull().all():
         valid_df["batch_size_used"] = 1
 
-    return valid_df
+    # Read throughput timeline saved alongside the summary, not saved if no request was recorded
+    df_timeline = None
+    if performance_evaluator.timeline_file_path is not None:
+        df_timeline = pd.read_json(performance_evaluator.timeline_file_path)
+
+    return valid_df, df_timeline
+
+
+def _run_concurrency_sweep() -> tuple:
+    """Runs the performance evaluation process for each of the concurrency levels of the sweep, reusing the same
+    prompts for all of them.
+
+    Returns:
+        tuple: Dataframe with one row of metrics per concurrency level, and the saturation point of the endpoint.
+    """
+
+    results_path = "./data/results/llmperf"
+
+    performance_evaluator = SyntheticPerformanceEvaluator(
+        model_name=st.session_state.llm,
+        results_dir=results_path,
+        num_workers=st.session_state.number_concurrent_workers,
+        timeout=st.session_state.timeout,
+        llm_api=st.session_state.llm_api,
+    )
+
+    concurrency_levels = [int(level) for level in st.session_state.concurrency_sweep.split(",")]
+    sweep_results = performance_evaluator.run_concurrency_sweep(
+        concurrency_levels=concurrency_levels,
+        num_input_tokens=st.session_state.input_tokens,
+        num_output_tokens=st.session_state.output_tokens,
+        num_requests=st.session_state.number_requests,
+        sampling_params={},
+        slo_latency_s=st.session_state.slo_latency_s or None,
+    )
+
+    return pd.DataFrame(sweep_results["points"]), sweep_results["saturation"]
 
 
 def _initialize_sesion_variables():
@@ -82,6 +123,10 @@ def _initialize_sesion_variables():
         st.session_state.timeout = None
     if "llm_api" not in st.session_state:
         st.session_state.llm_api = None
+    if "concurrency_sweep" not in st.session_state:
+        st.session_state.concurrency_sweep = None
+    if "slo_latency_s" not in st.session_state:
+        st.session_state.slo_latency_s = None
 
 
 def main():
@@ -155,6 +200,21 @@ def main():
             "Timeout", min_value=60, max_value=1800, value=600, step=1
         )
 
+        st.session_state.concurrency_sweep = st.text_input(
+            "Concurrency sweep levels (optional)",
+            value="",
+            help="Comma separated list of concurrency levels, e.g. 1,2,4,8. If set, the benchmark runs at each level "
+            "instead of the number of concurrent workers above, and finds where the endpoint saturates.",
+        )
+
+        st.session_state.slo_latency_s = st.number_input(
+            "p99 E2E latency SLO in seconds (optional)",
+            min_value=0.0,
+            value=0.0,
+            help="Used by the concurrency sweep to find the saturation point. Leave as 0 to only detect the throughput "
+            "plateau.",
+        )
+
         sidebar_option = st.sidebar.button("Run!")
 
     if sidebar_option:
@@ -164,7 +224,28 @@ def main():
 
             try:
 
-                df_req_info = _run_performance_evaluation()
+                if st.session_state.concurrency_sweep:
+                    df_sweep, saturation = _run_concurrency_sweep()
+
+                    st.subheader("Concurrency sweep results")
+                    st.markdown(
+                        f"Throughput plateaus at **{saturation['plateau_concurrency']}** concurrent workers. "
+                        f"Saturation point: **{saturation['saturation_concurrency']}** concurrent workers."
+                    )
+                    st.dataframe(df_sweep)
+
+                    fig, ax = plt.subplots(nrows=1, ncols=1, figsize=(8, 6))
+                    plot_concurrency_sweep(
+                        df_sweep,
+                        "client_end_to_end_latency_s_p99",
+                        ax,
+                        saturation_concurrency=saturation["saturation_concurrency"],
+                        slo_latency_s=st.session_state.slo_latency_s or None,
+                    )
+                    st.pyplot(fig)
+                    return
+
+                df_req_info, df_timeline = _run_performance_evaluation()
 
                 st.subheader("Performance metrics plots")
                 expected_output_tokens = st.session_state.output_tokens
@@ -176,7 +257,7 @@ def main():
                         f"Difference between expected output tokens {expected_output_tokens} and generated output tokens {generated_output_tokens} is: {abs(expected_output_tokens-generated_output_tokens)} token(s)"
                     )
 
-                fig, ax = plt.subplots(nrows=4, ncols=1, figsize=(8, 24))
+                fig, ax = plt.subplots(nrows=5, ncols=1, figsize=(8, 30))
                 plot_client_vs_server_barplots(
                     df_req_info,
                     "batch_size_used",
@@ -206,6 +287,8 @@ def main():
                 )
                 # Compute total throughput per batch
                 plot_dataframe_summary(df_req_info, ax[3])
+                # Plot throughput over time, to tell steady state from warm-up and drain
+                plot_throughput_timeline(df_timeline, ax[4])
                 st.pyplot(fig)
 
             except Exception as e:
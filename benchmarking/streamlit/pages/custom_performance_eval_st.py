@@ -1,6 +1,6 @@
 import pandas as pd
 import streamlit as st
-from streamlit_utils import plot_client_vs_server_barplots, plot_dataframe_summary
+from streamlit_utils import plot_client_vs_server_barplots, plot_dataframe_summary, plot_throughput_timeline
 import matplotlib.pyplot as plt
 
 from benchmarking.src.performance_evaluation import CustomPerformanceEvaluator
@@ -39,11 +39,11 @@ def _initialize_sesion_variables():
         st.session_state.top_p = None
 
 
-def _run_custom_performance_evaluation() -> pd.DataFrame:
+def _run_custom_performance_evaluation() -> tuple:
     """Runs custom performance evaluation
 
     Returns:
-        pd.DataFrame: valid dataframe containing benchmark results
+        tuple: valid dataframe containing benchmark results, and dataframe with the throughput timeline
     """
 
     results_path = "./data/results/llmperf"
@@ -69,14 +69,19 @@ def _run_custom_performance_evaluation() -> pd.DataFrame:
         sampling_params=sampling_params,
     )
 
-    df_user = pd.read_json(custom_performance_evaluator.individual_responses_file_path)
+    df_user = pd.read_json(custom_performance_evaluator.individual_responses_file_path, lines=True)
     df_user["concurrent_user"] = custom_performance_evaluator.num_workers
     valid_df = df_user[(df_user["error_code"] != "")]
 
     if valid_df["batch_size_used"].isnull().all():
         valid_df["batch_size_used"] = 1
 
-    return valid_df
+    # Read throughput timeline saved alongside the summary, not saved if no request was recorded
+    df_timeline = None
+    if custom_performance_evaluator.timeline_file_path is not None:
+        df_timeline = pd.read_json(custom_performance_evaluator.timeline_file_path)
+
+    return valid_df, df_timeline
 
 
 def main():
@@ -163,10 +168,10 @@ def main():
 
             try:
 
-                results_df = _run_custom_performance_evaluation()
+                results_df, df_timeline = _run_custom_performance_evaluation()
 
                 st.subheader("Performance metrics plots")
-                fig, ax = plt.subplots(nrows=4, ncols=1, figsize=(8, 24))
+                fig, ax = plt.subplots(nrows=5, ncols=1, figsize=(8, 30))
                 plot_client_vs_server_barplots(
                     results_df,
                     "batch_size_used",
@@ -196,6 +201,8 @@ def main():
                 )
                 # Compute total throughput per batch
                 plot_dataframe_summary(results_df, ax[3])
+                # Plot throughput over time, to tell steady state from warm-up and drain
+                plot_throughput_timeline(df_timeline, ax[4])
                 st.pyplot(fig)
 
             except Exception as e:
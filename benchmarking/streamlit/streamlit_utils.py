@@ -3,7 +3,7 @@ from matplotlib.axes._axes import Axes
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
-from typing import List
+from typing import List, Optional
 
 
 def plot_dataframe_summary(df_req_info, ax):
@@ -83,3 +83,95 @@ def plot_client_vs_server_barplots(
         title=title,
     )
     ax.legend(title="Metric")
+
+
+def plot_concurrency_sweep(
+    df_sweep: pd.DataFrame,
+    latency_col: str,
+    ax: Axes,
+    saturation_concurrency: Optional[int] = None,
+    slo_latency_s: Optional[float] = None,
+) -> None:
+    """
+    Plots the throughput vs latency curve of a concurrency sweep, annotating each point with its concurrency level.
+
+    Args:
+        df_sweep (pd.DataFrame): The DataFrame containing one row per concurrency level of the sweep.
+        latency_col (str): The column name of the latency percentile to be used as the y-axis.
+        ax (Axes): The axes to draw the plot on.
+        saturation_concurrency (Optional[int]): The concurrency level at which the endpoint saturates, highlighted if
+            provided.
+        slo_latency_s (Optional[float]): The latency SLO in seconds, drawn as a horizontal line if provided.
+
+    Returns:
+        None
+    """
+    x_col = "client_mean_output_token_per_s"
+    sns.lineplot(data=df_sweep, x=x_col, y=latency_col, marker="o", sort=False, ax=ax).set(
+        xlabel="Output throughput (tokens/s)",
+        ylabel=f"{latency_col} (seconds)",
+        title="Throughput vs latency per concurrency level",
+    )
+    for _, row in df_sweep.iterrows():
+        ax.annotate(
+            str(row["num_concurrent_workers"]),
+            (row[x_col], row[latency_col]),
+            textcoords="offset points",
+            xytext=(5, 5),
+        )
+    if saturation_concurrency is not None:
+        saturation_row = df_sweep[df_sweep["num_concurrent_workers"] == saturation_concurrency]
+        ax.scatter(
+            saturation_row[x_col],
+            saturation_row[latency_col],
+            s=200,
+            facecolors="none",
+            edgecolors="red",
+            label=f"Saturation ({saturation_concurrency} workers)",
+        )
+    if slo_latency_s is not None:
+        ax.axhline(slo_latency_s, color="grey", linestyle="--", label="SLO")
+    if saturation_concurrency is not None or slo_latency_s is not None:
+        ax.legend()
+
+
+def plot_throughput_timeline(df_timeline: Optional[pd.DataFrame], ax: Axes) -> None:
+    """
+    Plots the output throughput of a run over time, along with the number of requests in flight and the errors
+    per time window, to show ramp-up, tail drain and throttling.
+
+    Args:
+        df_timeline (Optional[pd.DataFrame]): The DataFrame containing one row per time window of the run, None if
+            the run has no timeline.
+        ax (Axes): The axes to draw the plot on.
+
+    Returns:
+        None
+    """
+    if df_timeline is None or df_timeline.empty:
+        ax.set(title="Throughput timeline", xticks=[], yticks=[])
+        ax.text(0.5, 0.5, "No timeline", ha="center", va="center", transform=ax.transAxes)
+        return
+
+    sns.lineplot(
+        data=df_timeline, x="window_start_s", y="client_mean_output_token_per_s", label="Output throughput", ax=ax
+    ).set(
+        xlabel="Time since start (seconds)",
+        ylabel="tokens/s",
+        title="Throughput timeline",
+    )
+    ax_requests = ax.twinx()
+    ax_requests.step(
+        df_timeline["window_start_s"],
+        df_timeline["in_flight_requests"],
+        where="post",
+        color="grey",
+        label="In-flight requests",
+    )
+    errors = df_timeline[df_timeline["errors"] > 0]
+    ax_requests.scatter(errors["window_start_s"], errors["errors"], color="red", marker="x", label="Errors")
+    ax_requests.set_ylabel("requests")
+
+    lines, labels = ax.get_legend_handles_labels()
+    request_lines, request_labels = ax_requests.get_legend_handles_labels()
+    ax.legend(lines + request_lines, labels + request_labels, loc="upper left")
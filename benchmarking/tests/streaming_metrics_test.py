@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Streaming Metrics Test Script
+
+This script tests the streaming histograms and the metrics accumulator of the benchmarking kit using unittest.
+
+Test cases:
+    test_quantiles_match_numpy: checks that the estimated quantiles are within the relative accuracy of numpy's
+    test_empty_histogram: checks that an empty histogram estimates NaN quantiles, mean and standard deviation
+    test_one_sample_histogram: checks that every quantile of a single recorded value is that value
+    test_missing_values_ignored: checks that None and NaN values aren't recorded
+    test_values_below_min_value: checks that values at or below min_value are estimated as the min
+    test_invalid_relative_accuracy: checks that a relative accuracy outside of (0, 1) is rejected
+    test_welford_mean_and_stddev: checks the streaming mean and sample standard deviation against numpy's
+    test_accumulator_resumed_requests: checks that resumed requests are excluded from the run counters only
+    test_accumulator_errors: checks that failed requests are counted by error code and not recorded
+
+Usage:
+    python tests/streaming_metrics_test.py
+
+Returns:
+    0 if all tests pass, or a positive integer representing the number of failed tests.
+"""
+
+import logging
+import math
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+kit_dir = os.path.abspath(os.path.join(current_dir, ".."))
+
+sys.path.append(os.path.join(kit_dir, "src"))
+
+from llmperf import common_metrics  # type: ignore
+from llmperf.streaming_metrics import StreamingHistogram, StreamingMetricsAccumulator  # type: ignore
+
+QUANTILES = [0.0, 0.01, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+
+class StreamingHistogramTestCase(unittest.TestCase):
+    def assertWithinRelativeAccuracy(self, estimate: float, expected: float, relative_accuracy: float) -> None:
+        self.assertLessEqual(abs(estimate - expected), relative_accuracy * abs(expected) + 1e-12)
+
+    def test_quantiles_match_numpy(self) -> None:
+        rng = np.random.default_rng(0)
+        for relative_accuracy in [0.01, 0.05]:
+            for values in [rng.lognormal(0, 2, 10_000), rng.uniform(0.5, 1.5, 1_000), rng.exponential(3, 7)]:
+                histogram = StreamingHistogram(relative_accuracy)
+                for value in values:
+                    histogram.record(float(value))
+                for q in QUANTILES:
+                    # The histogram estimates the recorded value at rank q * (count - 1), rounded down
+                    expected = np.quantile(values, q, method="lower")
+                    self.assertWithinRelativeAccuracy(histogram.quantile(q), expected, relative_accuracy)
+
+    def test_empty_histogram(self) -> None:
+        histogram = StreamingHistogram()
+        self.assertEqual(histogram.count, 0)
+        for q in QUANTILES:
+            self.assertTrue(math.isnan(histogram.quantile(q)))
+        self.assertTrue(math.isnan(histogram.mean))
+        self.assertTrue(math.isnan(histogram.stddev))
+
+    def test_one_sample_histogram(self) -> None:
+        histogram = StreamingHistogram()
+        histogram.record(0.123)
+        for q in QUANTILES:
+            self.assertEqual(histogram.quantile(q), 0.123)
+        self.assertEqual(histogram.mean, 0.123)
+        self.assertTrue(math.isnan(histogram.stddev))
+
+    def test_missing_values_ignored(self) -> None:
+        histogram = StreamingHistogram()
+        for value in [None, 2.0, math.nan, 4.0]:
+            histogram.record(value)
+        self.assertEqual(histogram.count, 2)
+        self.assertEqual(histogram.mean, 3.0)
+
+    def test_values_below_min_value(self) -> None:
+        histogram = StreamingHistogram(min_value=1e-3)
+        for value in [0.0, 1e-4, 1.0]:
+            histogram.record(value)
+        self.assertEqual(histogram.quantile(0.0), 0.0)
+        self.assertEqual(histogram.quantile(0.5), 0.0)
+        self.assertWithinRelativeAccuracy(histogram.quantile(1.0), 1.0, histogram.relative_accuracy)
+
+    def test_invalid_relative_accuracy(self) -> None:
+        for relative_accuracy in [0.0, 1.0, -0.1]:
+            with self.assertRaises(ValueError):
+                StreamingHistogram(relative_accuracy)
+
+    def test_welford_mean_and_stddev(self) -> None:
+        rng = np.random.default_rng(1)
+        # A large offset makes the naive sum of squares lose the variance to cancellation
+        values = 1e9 + rng.normal(0, 1, 5_000)
+        histogram = StreamingHistogram()
+        for value in values:
+            histogram.record(float(value))
+        self.assertEqual(histogram.count, len(values))
+        self.assertAlmostEqual(histogram.mean, float(np.mean(values)), delta=1e-6)
+        self.assertAlmostEqual(histogram.stddev, float(np.std(values, ddof=1)), delta=1e-6)
+        self.assertEqual(histogram.min, float(values.min()))
+        self.assertEqual(histogram.max, float(values.max()))
+
+
+class StreamingMetricsAccumulatorTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.accumulator = StreamingMetricsAccumulator([common_metrics.TTFT, common_metrics.NUM_OUTPUT_TOKENS])
+
+    def test_accumulator_resumed_requests(self) -> None:
+        self.accumulator.add({common_metrics.TTFT: 0.5, common_metrics.NUM_OUTPUT_TOKENS: 10}, is_resumed=True)
+        self.accumulator.add({common_metrics.TTFT: 0.2, common_metrics.NUM_OUTPUT_TOKENS: 20})
+        self.accumulator.add({common_metrics.TTFT: 0.3, common_metrics.NUM_OUTPUT_TOKENS: None})
+
+        self.assertEqual(self.accumulator.num_requests_started, 3)
+        self.assertEqual(self.accumulator.num_completed_requests, 3)
+        # Resumed requests count in the percentiles, not in the throughput of the run
+        self.assertEqual(self.accumulator.histograms[common_metrics.TTFT].count, 3)
+        self.assertEqual(self.accumulator.num_run_completed_requests, 2)
+        self.assertEqual(self.accumulator.run_output_tokens, 20)
+
+    def test_accumulator_errors(self) -> None:
+        self.accumulator.add({common_metrics.TTFT: 0.5, common_metrics.NUM_OUTPUT_TOKENS: 10})
+        self.accumulator.add({common_metrics.ERROR_CODE: 429, common_metrics.TTFT: 9.0})
+        self.accumulator.add({common_metrics.ERROR_CODE: 429}, is_resumed=True)
+
+        self.assertEqual(self.accumulator.num_requests_started, 3)
+        self.assertEqual(self.accumulator.num_completed_requests, 1)
+        self.assertEqual(dict(self.accumulator.error_code_counts), {429: 2})
+        self.assertEqual(self.accumulator.num_run_completed_requests, 1)
+        self.assertEqual(self.accumulator.quantiles(common_metrics.TTFT, [0.5, 1.0]), {0.5: 0.5, 1.0: 0.5})
+
+
+def main() -> int:
+    suite = unittest.TestSuite()
+    for test_case in [StreamingHistogramTestCase, StreamingMetricsAccumulatorTestCase]:
+        suite.addTests(unittest.TestLoader().loadTestsFromTestCase(test_case))
+    test_result = unittest.TextTestRunner().run(suite)
+
+    failed_tests = len(test_result.failures) + len(test_result.errors)
+    logger.info(f"Tests passed: {test_result.testsRun - failed_tests}/{test_result.testsRun}")
+
+    if failed_tests:
+        logger.error(f"Number of failed tests: {failed_tests}")
+        return failed_tests
+    else:
+        logger.info("All tests passed successfully!")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
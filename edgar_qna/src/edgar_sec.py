@@ -14,6 +14,7 @@ from langchain.prompts import PromptTemplate, load_prompt
 from langchain.docstore.document import Document
 from langchain_community.document_loaders import DirectoryLoader, TextLoader
 from utils.vectordb.vector_db import VectorDb
+from utils.vectordb.qdrant_utils import get_qdrant_filter
 from utils.model_wrappers.api_gateway import APIGateway
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -162,7 +163,7 @@ class SecFiling:
             )
         
         if persist_directory and os.path.exists(persist_directory) and not force_reload:
-            self.vector_store = vectordb.load_vdb(persist_directory, embeddings)
+            self.vector_store = vectordb.load_vdb(persist_directory, embeddings, self.retrieval_info["db_type"])
         else:
             all_chunks = []
             for ticker in tickers:
@@ -252,10 +253,14 @@ class SecFiling:
         
         tickers = self.config.get("tickers", None)
         filter_rule = [{'company_ticker': {'$eq': ticker}} for ticker in tickers]
+        search_filter = {'$or': filter_rule}
+        if self.retrieval_info["db_type"] == "qdrant":
+            # uses the payload index on company_ticker
+            search_filter = get_qdrant_filter(search_filter)
         multiquery_retriever = MultiQueryRetriever(
             retriever=self.vector_store.as_retriever(search_kwargs={
                 'k': self.retrieval_info["n_retrieved_documents"],
-                'filter': {'$or': filter_rule},
+                'filter': search_filter,
             }), 
             llm_chain=llm_chain, 
             parser_key="decomposed_questions",  
@@ -83,6 +83,7 @@ def process_bulk_QA(vectordb_path, questions_file_path):
             llm=documentRetrieval.llm,
             qa_prompt = load_prompt(os.path.join(kit_dir, documentRetrieval.prompts["qa_prompt"])),
             rerank = documentRetrieval.retrieval_info["rerank"],
+            reranker = documentRetrieval.retrieval_info.get("reranker", "BAAI/bge-reranker-large"),
             final_k_retrieved_documents = documentRetrieval.retrieval_info["final_k_retrieved_documents"]
         
         )
@@ -3,7 +3,6 @@ import shutil
 import sys
 from typing import Any, Dict, List, Optional
 
-import torch
 import yaml
 from dotenv import load_dotenv
 from langchain.chains.base import Chain
@@ -13,7 +12,6 @@ from langchain_core.callbacks import CallbackManagerForChainRun
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.retrievers import BaseRetriever
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 kit_dir = os.path.abspath(os.path.join(current_dir, '..'))
@@ -24,6 +22,7 @@ sys.path.append(repo_dir)
 import streamlit as st
 
 from utils.model_wrappers.api_gateway import APIGateway
+from utils.rag.reranker import get_reranker_service
 from utils.vectordb.vector_db import VectorDb
 from utils.visual.env_utils import get_wandb_key
 
@@ -53,6 +52,7 @@ class RetrievalQAChain(Chain):
 
     retriever: BaseRetriever
     rerank: bool = True
+    reranker: str = 'BAAI/bge-reranker-large'
     llm: BaseLanguageModel
     qa_prompt: BasePromptTemplate
     final_k_retrieved_documents: int = 3
@@ -75,37 +75,7 @@ class RetrievalQAChain(Chain):
         return '\n\n'.join(doc.page_content for doc in docs)
 
     def rerank_docs(self, query, docs, final_k):
-        # Lazy hardcoding for now
-        tokenizer = AutoTokenizer.from_pretrained('BAAI/bge-reranker-large')
-        reranker = AutoModelForSequenceClassification.from_pretrained('BAAI/bge-reranker-large')
-        pairs = []
-        for d in docs:
-            pairs.append([query, d.page_content])
-
-        with torch.no_grad():
-            inputs = tokenizer(
-                pairs,
-                padding=True,
-                truncation=True,
-                return_tensors='pt',
-                max_length=512,
-            )
-            scores = (
-                reranker(**inputs, return_dict=True)
-                .logits.view(
-                    -1,
-                )
-                .float()
-            )
-
-        scores_list = scores.tolist()
-        scores_sorted_idx = sorted(range(len(scores_list)), key=lambda k: scores_list[k], reverse=True)
-
-        docs_sorted = [docs[k] for k in scores_sorted_idx]
-        # docs_sorted = [docs[k] for k in scores_sorted_idx if scores_list[k]>0]
-        docs_sorted = docs_sorted[:final_k]
-
-        return docs_sorted
+        return get_reranker_service(self.reranker).rerank(query, docs, final_k)
 
     def _call(
         self,
@@ -285,6 +255,7 @@ class DocumentRetrieval:
             llm=self.llm,
             qa_prompt=load_prompt(os.path.join(repo_dir, self.prompts['qa_prompt'])),
             rerank=self.retrieval_info['rerank'],
+            reranker=self.retrieval_info.get('reranker', 'BAAI/bge-reranker-large'),
             final_k_retrieved_documents=self.retrieval_info['final_k_retrieved_documents'],
         )
         return retrievalQAChain
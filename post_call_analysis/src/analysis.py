@@ -276,6 +276,7 @@ def set_retriever(documents_path, urls):
         batch_size=embedding_model_info['batch_size'],
         coe=embedding_model_info['coe'],
         select_expert=embedding_model_info['select_expert'],
+        num_workers=retrieval_info.get('num_workers', 1),
     ).as_retriever()
 
     print('retriever set')
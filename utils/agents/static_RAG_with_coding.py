@@ -97,6 +97,7 @@ class CodeRAG(RAGComponents, CodeGenComponents):
         workflow.add_node('reformulate_query', self.reformulate_query)
         workflow.add_node('get_new_query', self.pass_state)
         workflow.add_node('generate_subquestions', self.generate_subquestions)
+        workflow.add_node('answer_subquestions', self.answer_subquestions)
         workflow.add_node('detect_entities', self.detect_entities)
         workflow.add_node('retrieve', self.retrieve_w_filtering)
         workflow.add_node('grade_documents', self.grade_documents)
@@ -150,7 +151,8 @@ class CodeRAG(RAGComponents, CodeGenComponents):
                 'subquery_generation': 'generate_subquestions',
             },
         )
-        workflow.add_edge('generate_subquestions', 'detect_entities')
+        workflow.add_edge('generate_subquestions', 'answer_subquestions')
+        workflow.add_edge('answer_subquestions', 'pass_from_qa')
         workflow.add_edge('detect_entities', 'retrieve')
         workflow.add_edge('retrieve', 'grade_documents')
         workflow.add_edge('grade_documents', 'generate')
@@ -1,22 +1,396 @@
 import os
 import json
+import atexit
 import logging
+import queue
+import random
+import threading
+import time
 from functools import wraps
-import copy
-from typing import Any, Callable
+from typing import Any, Callable, Dict, List, Optional, TextIO
 
 # Set up logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rough number of characters per token, to estimate token counts without tokenizing
+APPROX_CHARS_PER_TOKEN = 4
+# Max number of items of a list or dict kept in a logged payload
+MAX_PAYLOAD_ITEMS = 50
+# Max nesting depth of a logged payload
+MAX_PAYLOAD_DEPTH = 4
+# Queued to stop the trace writer thread
+_STOP_WRITER = object()
+
+
+def summarize_payload(value: Any, max_chars: int, depth: int = 0) -> Any:
+    """
+    Builds a JSON serializable snapshot of a value to log, truncating texts to max_chars characters,
+    lists and dicts to MAX_PAYLOAD_ITEMS items, and nesting to MAX_PAYLOAD_DEPTH levels.
+
+    Args:
+        value: The value to log.
+        max_chars: The max number of characters of each text.
+        depth: The nesting depth of the value.
+
+    Returns:
+        The snapshot of the value.
+    """
+
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        return value[:max_chars] + f'... [{len(value) - max_chars} chars truncated]'
+    if depth >= MAX_PAYLOAD_DEPTH:
+        return summarize_payload(repr(value), max_chars)
+    # Langchain Documents
+    if hasattr(value, 'page_content') and hasattr(value, 'metadata'):
+        return {
+            'page_content': summarize_payload(value.page_content, max_chars),
+            'metadata': summarize_payload(value.metadata, max_chars, depth + 1),
+        }
+    if isinstance(value, dict):
+        snapshot = {
+            str(k): summarize_payload(v, max_chars, depth + 1) for k, v in list(value.items())[:MAX_PAYLOAD_ITEMS]
+        }
+        if len(value) > MAX_PAYLOAD_ITEMS:
+            snapshot['...'] = f'{len(value) - MAX_PAYLOAD_ITEMS} items truncated'
+        return snapshot
+    if isinstance(value, (list, tuple)):
+        snapshot_list = [summarize_payload(v, max_chars, depth + 1) for v in value[:MAX_PAYLOAD_ITEMS]]
+        if len(value) > MAX_PAYLOAD_ITEMS:
+            snapshot_list.append(f'... {len(value) - MAX_PAYLOAD_ITEMS} items truncated')
+        return snapshot_list
+    return summarize_payload(repr(value), max_chars)
+
+
+def count_payload_chars(value: Any, depth: int = 0) -> int:
+    """
+    Counts the characters of the texts of a value, including Langchain Documents, without copying them.
+
+    Args:
+        value: The value.
+        depth: The nesting depth of the value.
+
+    Returns:
+        The number of characters.
+    """
+
+    if isinstance(value, str):
+        return len(value)
+    if depth >= MAX_PAYLOAD_DEPTH:
+        return 0
+    if hasattr(value, 'page_content'):
+        return len(value.page_content)
+    if isinstance(value, dict):
+        return sum(count_payload_chars(v, depth + 1) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(count_payload_chars(v, depth + 1) for v in value)
+    return 0
+
+
+class Tracer:
+    """
+    Traces method calls without blocking them: records are put in a bounded in-memory queue and written by a
+    background thread to a rotating JSONL file per method, {log_dir}/{method}.jsonl. Records are dropped when the
+    queue is full.
+
+    Per-method wall-time and approximate token counters are kept in memory for every call, while only a
+    sample_rate share of the calls are written, with texts truncated to max_payload_chars characters.
+
+    Args:
+        log_dir: The directory of the trace files.
+        sample_rate: The share of calls written, between 0 and 1.
+        max_payload_chars: The max number of characters of each logged text.
+        queue_size: The max number of records waiting to be written.
+        max_file_bytes: The size after which a trace file is rotated.
+        backup_count: The number of rotated trace files kept per method.
+    """
+
+    def __init__(
+        self,
+        log_dir: str = './../logs',
+        sample_rate: float = 1.0,
+        max_payload_chars: int = 2000,
+        queue_size: int = 1000,
+        max_file_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 5,
+    ) -> None:
+        if not 0 <= sample_rate <= 1:
+            raise ValueError(f'sample_rate must be between 0 and 1, got {sample_rate}')
+        self.log_dir = log_dir
+        self.sample_rate = sample_rate
+        self.max_payload_chars = max_payload_chars
+        self.max_file_bytes = max_file_bytes
+        self.backup_count = backup_count
+
+        self.num_dropped = 0
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._files: Dict[str, TextIO] = {}
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        self._closed = False
+
+    def record_call(
+        self,
+        method: str,
+        cls: str,
+        args: Any,
+        kwargs: Dict[str, Any],
+        result: Any,
+        wall_time_s: float,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        """
+        Records a method call, updating the method counters and queuing it to be written if sampled.
+
+        Args:
+            method: The method name.
+            cls: The class name.
+            args: The method arguments.
+            kwargs: The method keyword arguments.
+            result: The result of the method.
+            wall_time_s: The wall time of the call in seconds.
+            error: The exception raised by the method, if any.
+        """
+
+        input_tokens = (count_payload_chars(args) + count_payload_chars(kwargs)) // APPROX_CHARS_PER_TOKEN
+        output_tokens = count_payload_chars(result) // APPROX_CHARS_PER_TOKEN
+        with self._stats_lock:
+            stats = self._stats.setdefault(
+                method,
+                {
+                    'calls': 0,
+                    'errors': 0,
+                    'total_time_s': 0.0,
+                    'max_time_s': 0.0,
+                    'input_tokens': 0,
+                    'output_tokens': 0,
+                },
+            )
+            stats['calls'] += 1
+            stats['errors'] += error is not None
+            stats['total_time_s'] += wall_time_s
+            stats['max_time_s'] = max(stats['max_time_s'], wall_time_s)
+            stats['input_tokens'] += input_tokens
+            stats['output_tokens'] += output_tokens
+
+        if self._closed or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return
+
+        record = {
+            'timestamp': time.time(),
+            'method': method,
+            'class': cls,
+            'wall_time_s': wall_time_s,
+            'approx_input_tokens': input_tokens,
+            'approx_output_tokens': output_tokens,
+            'args': summarize_payload(args, self.max_payload_chars),
+            'kwargs': summarize_payload(kwargs, self.max_payload_chars),
+            'result': summarize_payload(result, self.max_payload_chars),
+        }
+        if error is not None:
+            record['error'] = summarize_payload(repr(error), self.max_payload_chars)
+
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._stats_lock:
+                self.num_dropped += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Gets the per-method counters.
+
+        Returns:
+            The calls, errors, total and max wall time, and approximate input and output tokens of each method,
+            with the mean wall time.
+        """
+
+        with self._stats_lock:
+            return {
+                method: {**stats, 'mean_time_s': stats['total_time_s'] / stats['calls']}
+                for method, stats in self._stats.items()
+            }
+
+    def _ensure_writer(self) -> None:
+        """
+        Starts the writer thread, if not started yet.
+        """
+
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run_writer, name='trace-writer', daemon=True)
+                self._writer.start()
+
+    def _get_file(self, method: str) -> TextIO:
+        """
+        Gets the trace file of a method, rotating it if it exceeds max_file_bytes.
+
+        Args:
+            method: The method name.
+
+        Returns:
+            The open trace file.
+        """
+
+        file = self._files.get(method)
+        if file is not None and file.tell() >= self.max_file_bytes:
+            file.close()
+            path = os.path.join(self.log_dir, f'{method}.jsonl')
+            for idx in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f'{path}.{idx}'):
+                    os.replace(f'{path}.{idx}', f'{path}.{idx + 1}')
+            if self.backup_count > 0:
+                os.replace(path, f'{path}.1')
+            else:
+                os.remove(path)
+            file = None
+
+        if file is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            file = open(os.path.join(self.log_dir, f'{method}.jsonl'), 'a')
+            self._files[method] = file
+        return file
+
+    def _run_writer(self) -> None:
+        """
+        Writes the queued records, flushing the files whenever the queue is empty.
+        """
+
+        while True:
+            record = self._queue.get()
+            if record is _STOP_WRITER:
+                self._queue.task_done()
+                return
+            try:
+                if record is not None:
+                    file = self._get_file(record['method'])
+                    file.write(json.dumps(record, default=str))
+                    file.write('\n')
+                if record is None or self._queue.empty():
+                    for file in self._files.values():
+                        file.flush()
+            except Exception as e:
+                logger.warning(f'Failed to write trace: {e}')
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits for the queued records to be written.
+
+        Args:
+            timeout: The max number of seconds to wait, no limit if None.
+        """
+
+        if self._writer is None or not self._writer.is_alive():
+            return
+        self._queue.put(None)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.01)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Writes the queued records, stops the writer thread and closes the trace files. Calls recorded afterwards
+        only update the counters.
+
+        Args:
+            timeout: The max number of seconds to wait for the queued records to be written, no limit if None.
+        """
+
+        self._closed = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.flush(timeout)
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                self._queue.put(_STOP_WRITER, timeout=remaining)
+            except queue.Full:
+                pass
+            writer.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+            if writer.is_alive():
+                logger.warning('Trace writer did not stop, trace files are left open')
+                return
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+
+
+def _get_env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+_tracer = Tracer(
+    log_dir=os.environ.get('TRACE_LOG_DIR', './../logs'),
+    sample_rate=_get_env_float('TRACE_SAMPLE_RATE', 1.0),
+    max_payload_chars=int(_get_env_float('TRACE_MAX_PAYLOAD_CHARS', 2000)),
+    queue_size=int(_get_env_float('TRACE_QUEUE_SIZE', 1000)),
+    max_file_bytes=int(_get_env_float('TRACE_MAX_FILE_BYTES', 10 * 1024 * 1024)),
+    backup_count=int(_get_env_float('TRACE_BACKUP_COUNT', 5)),
+)
+atexit.register(lambda: _tracer.close(timeout=5))
+
+
+def configure_tracing(**kwargs: Any) -> Tracer:
+    """
+    Replaces the tracer used by log_method, closing the current one.
+
+    Args:
+        **kwargs: The Tracer arguments: log_dir, sample_rate, max_payload_chars, queue_size,
+            max_file_bytes and backup_count.
+
+    Returns:
+        The new tracer.
+    """
+
+    global _tracer
+    _tracer.close(timeout=5)
+    _tracer = Tracer(**kwargs)
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    """
+    Gets the tracer used by log_method.
+
+    Returns:
+        The tracer.
+    """
+
+    return _tracer
+
+
+def get_trace_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Gets the per-method counters of the methods decorated with log_method.
+
+    Returns:
+        The calls, errors, wall times and approximate token counts of each method.
+    """
+
+    return _tracer.get_stats()
+
 
 def log_method(func: Callable[..., Any]) -> Callable[..., Any]:
     """
-    Decorator to log method calls and save to JSON file.
+    Decorator to trace method calls.
 
-    This decorator logs the method call, including the method name, class name,
-    method arguments, keyword arguments, and the result of the method. The log
-    information is saved to a JSON file.
+    This decorator records the method call, including the method name, class name,
+    method arguments, keyword arguments, the result of the method and its wall time.
+    The record is written to a JSONL file in the background by the tracer, see Tracer.
 
     Args:
         func: The method to be decorated.
@@ -28,11 +402,11 @@ def log_method(func: Callable[..., Any]) -> Callable[..., Any]:
     @wraps(func)
     def wrapper(self, *args: Any, **kwargs: Any) -> Any:
         """
-        Wrapper function to log method calls and save to JSON file.
+        Wrapper function to trace method calls.
 
-        This function logs the method call, including the method name, class name,
-        method arguments, keyword arguments, and the result of the method. The log
-        information is saved to a JSON file.
+        This function records the method call, including the method name, class name,
+        method arguments, keyword arguments, the result of the method and its wall time,
+        without blocking on the trace file.
 
         Args:
             self: The instance of the class.
@@ -45,41 +419,18 @@ def log_method(func: Callable[..., Any]) -> Callable[..., Any]:
         # Log method call
         logger.info(f"Method '{func.__name__}' called on {self.__class__.__name__}")
 
-        result = func(self, *args, **kwargs)
-
-        serializable_result = {}
-        serializable_args = copy.deepcopy(args)
-
-        # Handle JSON serialization errors from Langchain Documents object
-        if isinstance(result, dict) and result.get('documents'):
-            docs = result['documents']
-            serializable_result['documents'] = '\n\n'.join(doc.page_content for doc in docs)
-        else:
-            serializable_result = result
-
-        # Handle JSON serialization errors from Langchain Documents object
-        if 'documents' in args[0] and args[0]['documents'] is not None:
-            docs = args[0]['documents']
-            serializable_args[0]['documents'] = '\n\n'.join(doc.page_content for doc in docs)
-        else:
-            serializable_args = args
-
-        # Save log info to JSON file
-        log_data = {
-            'method': func.__name__,
-            'class': self.__class__.__name__,
-            'args': serializable_args,
-            'kwargs': kwargs,
-            'result': serializable_result,
-        }
-
-        log_dir = './../logs'
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
+        start_time = time.perf_counter()
+        try:
+            result = func(self, *args, **kwargs)
+        except BaseException as e:
+            _tracer.record_call(
+                func.__name__, self.__class__.__name__, args, kwargs, None, time.perf_counter() - start_time, e
+            )
+            raise
 
-        with open(f'{log_dir}/{func.__name__}.json', 'a') as f:
-            json.dump(log_data, f)
-            f.write('\n')
+        _tracer.record_call(
+            func.__name__, self.__class__.__name__, args, kwargs, result, time.perf_counter() - start_time
+        )
 
         return result
 
@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 import sys
@@ -14,8 +15,10 @@ repo_dir = os.path.abspath(os.path.join(utils_dir, '..'))
 sys.path.append(utils_dir)
 sys.path.append(repo_dir)
 
+from utils.model_wrappers.embedding_cache import CachedEmbeddings, get_embeddings_cache_path
 from utils.model_wrappers.langchain_embeddings import SambaStudioEmbeddings
 from utils.model_wrappers.langchain_llms import SambaNovaCloud
+from utils.model_wrappers.llm_cache import ResponseCache
 
 EMBEDDING_MODEL = 'intfloat/e5-large-v2'
 NORMALIZE_EMBEDDINGS = True
@@ -43,6 +46,8 @@ class APIGateway:
         sambastudio_embeddings_project_id: Optional[str] = None,
         sambastudio_embeddings_endpoint_id: Optional[str] = None,
         sambastudio_embeddings_api_key: Optional[str] = None,
+        max_concurrency: int = 8,
+        cache_dir: Optional[str] = None,
     ) -> Embeddings:
         """Loads a langchain embedding model given a type and parameters
         Args:
@@ -56,6 +61,11 @@ class APIGateway:
             sambastudio_embeddings_project_id (str, optional): project id for sambastudio model. Defaults to None.
             sambastudio_embeddings_endpoint_id (str, optional): endpoint id for sambastudio model. Defaults to None.
             sambastudio_embeddings_api_key (str, optional): api key for sambastudio model. Defaults to None.
+            max_concurrency (int, optional): max number of batches embedded concurrently by sambastudio model.
+                Defaults to 8.
+            cache_dir (str, optional): directory of the persistent embeddings cache, so texts already embedded by
+                the same model are read from disk instead of embedded again. Defaults to the EMBEDDINGS_CACHE_DIR
+                environment variable, no cache if not set.
         Returns:
             langchain embedding model
         """
@@ -69,6 +79,7 @@ class APIGateway:
                 'sambastudio_embeddings_api_key': sambastudio_embeddings_api_key,
             }
             envs = {k: v for k, v in envs.items() if v is not None}
+            envs['max_concurrency'] = max_concurrency
 
             if coe:
                 if batch_size is None:
@@ -80,6 +91,16 @@ class APIGateway:
                 if batch_size is None:
                     batch_size = 32
                 embeddings = SambaStudioEmbeddings(**envs, batch_size=batch_size)
+            namespace = '/'.join(
+                [
+                    embeddings.sambastudio_embeddings_base_url,
+                    embeddings.sambastudio_embeddings_base_uri,
+                    embeddings.sambastudio_embeddings_project_id,
+                    embeddings.sambastudio_embeddings_endpoint_id,
+                    json.dumps(embeddings.model_kwargs, sort_keys=True),
+                ]
+            )
+            document_instruction = query_instruction = ''
         elif type == 'cpu':
             encode_kwargs = {'normalize_embeddings': NORMALIZE_EMBEDDINGS}
             embedding_model = EMBEDDING_MODEL
@@ -89,9 +110,22 @@ class APIGateway:
                 query_instruction='Represent this sentence for searching relevant passages: ',
                 encode_kwargs=encode_kwargs,
             )
+            namespace = f'{embedding_model}/{json.dumps(encode_kwargs, sort_keys=True)}'
+            document_instruction = embeddings.embed_instruction
+            query_instruction = embeddings.query_instruction
         else:
             raise ValueError(f'{type} is not a valid embedding model type')
 
+        cache_path = get_embeddings_cache_path(cache_dir)
+        if cache_path is not None:
+            embeddings = CachedEmbeddings(
+                embeddings,
+                cache_path=cache_path,
+                namespace=namespace,
+                document_instruction=document_instruction,
+                query_instruction=query_instruction,
+            )
+
         return embeddings
 
     @staticmethod
@@ -115,6 +149,11 @@ class APIGateway:
         sambastudio_api_key: Optional[str] = None,
         sambanova_url: Optional[str] = None,
         sambanova_api_key: Optional[str] = None,
+        cache: bool = False,
+        cache_max_size: int = 1000,
+        cache_ttl: Optional[float] = None,
+        semantic_cache_embeddings: Optional[Embeddings] = None,
+        semantic_cache_threshold: float = 0.99,
     ) -> LLM:
         """Loads a langchain Sambanova llm model given a type and parameters
         Args:
@@ -141,9 +180,31 @@ class APIGateway:
             sambanova_url (str): Optional SambaNova Cloud URL",
             sambanova_api_key (str): Optional SambaNovaCloud API key.
 
+            cache (bool): wether to cache the responses, so repeated prompts don't call the model. Defaults to False.
+            cache_max_size (int): max number of cached responses, least recently used ones are evicted.
+                Defaults to 1000.
+            cache_ttl (float): Optional seconds after which a cached response expires, never if not set.
+            semantic_cache_embeddings (Embeddings): Optional embedding model to also return the cached response of
+                similar prompts. Only used for deterministic generation, do_sample False for sambastudio and
+                temperature 0 for sncloud. Unsafe for classification prompts, see ResponseCache.
+            semantic_cache_threshold (float): min cosine similarity between prompts to return a cached response
+                of a similar prompt. Defaults to 0.99.
+
         Returns:
             langchain llm model
         """
+        llm_cache = None
+        if cache:
+            if type == 'sncloud':
+                deterministic = not temperature
+            else:
+                deterministic = not do_sample
+            llm_cache = ResponseCache(
+                max_size=cache_max_size,
+                ttl=cache_ttl,
+                embeddings=semantic_cache_embeddings if deterministic else None,
+                similarity_threshold=semantic_cache_threshold,
+            )
 
         if type == 'sambastudio':
             envs = {
@@ -172,6 +233,7 @@ class APIGateway:
                     **envs,
                     streaming=streaming,
                     model_kwargs=model_kwargs,
+                    cache=llm_cache,
                 )
             else:
                 model_kwargs = {
@@ -188,6 +250,7 @@ class APIGateway:
                     **envs,
                     streaming=streaming,
                     model_kwargs=model_kwargs,
+                    cache=llm_cache,
                 )
 
         elif type == 'sncloud':
@@ -203,6 +266,7 @@ class APIGateway:
                 temperature=temperature,
                 top_k=top_k,
                 top_p=top_p,
+                cache=llm_cache,
             )
 
         else:
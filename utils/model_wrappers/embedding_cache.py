@@ -0,0 +1,201 @@
+"""Persistent content-addressed cache for langchain embedding models."""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# SQLite limits the number of parameters of a query, so keys are looked up in chunks
+LOOKUP_CHUNK_SIZE = 500
+
+
+class CachedEmbeddings(Embeddings):
+    """Embedding model wrapper caching the embeddings on disk, keyed by a hash of the model, the instruction and
+    the text. Re-embedding an unchanged corpus only reads the cache, and embedding a changed corpus only calls
+    the model for the texts not seen before. Identical texts within a call are embedded once.
+
+    Embeddings are stored as float32 blobs in a SQLite database, so the cache can be shared by concurrent
+    processes and threads.
+
+    Args:
+        embeddings (Embeddings): embedding model to cache the embeddings of
+        cache_path (str): path of the SQLite database file, created if it doesn't exist
+        namespace (str): identifier of the model and its parameters, part of the cache keys so embeddings of
+            different models never collide
+        document_instruction (str, optional): instruction the model prepends to documents. Defaults to "".
+        query_instruction (str, optional): instruction the model prepends to queries. Defaults to "".
+        cache_queries (bool, optional): whether to cache the query embeddings too. Defaults to True.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        cache_path: str,
+        namespace: str,
+        document_instruction: str = '',
+        query_instruction: str = '',
+        cache_queries: bool = True,
+    ) -> None:
+        self.embeddings = embeddings
+        self.cache_path = cache_path
+        self.namespace = namespace
+        self.document_instruction = document_instruction
+        self.query_instruction = query_instruction
+        self.cache_queries = cache_queries
+
+        cache_dir = os.path.dirname(os.path.abspath(cache_path))
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(cache_path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, embedding BLOB)')
+            self._connection.commit()
+
+    def get_key(self, text: str, instruction: str) -> str:
+        """Gets the cache key of a text
+
+        Args:
+            text (str): text to embed
+            instruction (str): instruction the model prepends to the text
+
+        Returns:
+            str: hex digest of the hash of the namespace, instruction and text
+        """
+        return hashlib.sha256('\x00'.join([self.namespace, instruction, text]).encode('utf-8')).hexdigest()
+
+    def lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Looks up embeddings in the cache
+
+        Args:
+            keys (List[str]): cache keys
+
+        Returns:
+            Dict[str, List[float]]: embeddings found, by key
+        """
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+                chunk = keys[i : i + LOOKUP_CHUNK_SIZE]
+                rows = self._connection.execute(
+                    f'SELECT key, embedding FROM embeddings WHERE key IN ({",".join("?" * len(chunk))})', chunk
+                )
+                for key, blob in rows:
+                    found[key] = array('f', blob).tolist()
+        return found
+
+    def store(self, embeddings: Dict[str, List[float]]) -> None:
+        """Stores embeddings in the cache
+
+        Args:
+            embeddings (Dict[str, List[float]]): embeddings to store, by key
+        """
+        if not embeddings:
+            return
+        with self._lock:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO embeddings (key, embedding) VALUES (?, ?)',
+                [(key, array('f', embedding).tobytes()) for key, embedding in embeddings.items()],
+            )
+            self._connection.commit()
+
+    def _get_missing_texts(self, texts: List[str], keys: List[str], cached: Dict[str, List[float]]) -> Dict[str, str]:
+        """Gets the texts that aren't cached yet, deduplicated, by key"""
+        return {key: text for key, text in zip(keys, texts) if key not in cached}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeds documents, only calling the model for the ones not cached
+
+        Args:
+            texts (List[str]): texts to embed
+
+        Returns:
+            List[List[float]]: embeddings of the texts
+        """
+        keys = [self.get_key(text, self.document_instruction) for text in texts]
+        cached = self.lookup(list(set(keys)))
+        missing = self._get_missing_texts(texts, keys, cached)
+        if missing:
+            new_embeddings = dict(zip(missing, self.embeddings.embed_documents(list(missing.values()))))
+            self.store(new_embeddings)
+            cached.update(new_embeddings)
+        return [cached[key] for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeds documents asynchronously, only calling the model for the ones not cached
+
+        Args:
+            texts (List[str]): texts to embed
+
+        Returns:
+            List[List[float]]: embeddings of the texts
+        """
+        keys = [self.get_key(text, self.document_instruction) for text in texts]
+        cached = self.lookup(list(set(keys)))
+        missing = self._get_missing_texts(texts, keys, cached)
+        if missing:
+            new_embeddings = dict(zip(missing, await self.embeddings.aembed_documents(list(missing.values()))))
+            self.store(new_embeddings)
+            cached.update(new_embeddings)
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embeds a query, reading it from the cache when `cache_queries` is set
+
+        Args:
+            text (str): query to embed
+
+        Returns:
+            List[float]: embedding of the query
+        """
+        if not self.cache_queries:
+            return self.embeddings.embed_query(text)
+        key = self.get_key(text, self.query_instruction)
+        cached = self.lookup([key])
+        if key not in cached:
+            cached[key] = self.embeddings.embed_query(text)
+            self.store(cached)
+        return cached[key]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embeds a query asynchronously, reading it from the cache when `cache_queries` is set
+
+        Args:
+            text (str): query to embed
+
+        Returns:
+            List[float]: embedding of the query
+        """
+        if not self.cache_queries:
+            return await self.embeddings.aembed_query(text)
+        key = self.get_key(text, self.query_instruction)
+        cached = self.lookup([key])
+        if key not in cached:
+            cached[key] = await self.embeddings.aembed_query(text)
+            self.store(cached)
+        return cached[key]
+
+    def close(self) -> None:
+        """Closes the cache database"""
+        with self._lock:
+            self._connection.close()
+
+
+def get_embeddings_cache_path(cache_dir: Optional[str] = None) -> Optional[str]:
+    """Gets the path of the embeddings cache database
+
+    Args:
+        cache_dir (Optional[str], optional): cache directory, defaults to the EMBEDDINGS_CACHE_DIR environment
+            variable. Defaults to None.
+
+    Returns:
+        Optional[str]: path of the database, None if no cache directory is set
+    """
+    cache_dir = cache_dir or os.environ.get('EMBEDDINGS_CACHE_DIR')
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, 'embeddings.sqlite')
@@ -1,12 +1,56 @@
 """Langchain Wrapper around Sambanova embedding APIs."""
 
+import asyncio
 import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Generator, List, Optional
 
 import requests
 from langchain_core.embeddings import Embeddings
-from langchain_core.pydantic_v1 import BaseModel
+from langchain_core.pydantic_v1 import BaseModel, PrivateAttr
 from langchain_core.utils import get_from_dict_or_env, pre_init
+from requests.adapters import HTTPAdapter
+
+from utils.model_wrappers.langchain_llms import RETRY_STATUS_CODES, _get_aiohttp_session, _get_aiohttp_timeout
+
+logger = logging.getLogger(__name__)
+
+# Status code of a request rejected for its payload size
+PAYLOAD_TOO_LARGE_STATUS_CODE = 413
+
+# Details of a 400 response rejecting a request for its input size
+INPUT_TOO_LARGE_PATTERN = re.compile(
+    r'too (large|long|many)|exceed|maximum (batch|input|context|sequence|number)|payload', re.IGNORECASE
+)
+
+
+class EmbeddingsRequestError(RuntimeError):
+    """Error raised by a failed call to the embeddings endpoint.
+
+    Args:
+        message (str): error message
+        status_code (Optional[int]): status code of the response, None if the call failed before getting one
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:
+        """Whether the failure is transient, e.g. a connection error, rate limiting or a server error"""
+        return self.status_code is None or self.status_code in RETRY_STATUS_CODES
+
+    @property
+    def input_too_large(self) -> bool:
+        """Whether the request was rejected for the size of its input, so a smaller batch may succeed"""
+        if self.status_code == PAYLOAD_TOO_LARGE_STATUS_CODE:
+            return True
+        return self.status_code == 400 and INPUT_TOO_LARGE_PATTERN.search(str(self)) is not None
 
 
 class SambaStudioEmbeddings(BaseModel, Embeddings):
@@ -66,6 +110,26 @@ class SambaStudioEmbeddings(BaseModel, Embeddings):
     batch_size: int = 32
     """Batch size for the embedding models"""
 
+    max_concurrency: int = 8
+    """Max number of batches embedded concurrently"""
+
+    max_retries: int = 3
+    """Max number of retries of a batch failing with a transient error"""
+
+    retry_backoff_factor: float = 0.5
+    """Backoff factor between retries, sleeping {factor} * 2 ** retry seconds"""
+
+    timeout: Optional[float] = None
+    """Timeout of the calls in seconds, None for no timeout"""
+
+    adaptive_batch_size: bool = True
+    """Whether to split batches rejected by the endpoint for being too large, and use the smaller batch size for the
+    next batches"""
+
+    _http_session: Optional[requests.Session] = PrivateAttr(default=None)
+    _batch_size_limit: Optional[int] = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
     @pre_init
     def validate_environment(cls, values: Dict) -> Dict:
         """Validate that api key and python package exists in environment."""
@@ -119,6 +183,15 @@ class SambaStudioEmbeddings(BaseModel, Embeddings):
         """
         return f'{self.sambastudio_embeddings_base_url}/{self.sambastudio_embeddings_base_uri}/{path}'  # noqa: E501
 
+    def _get_url(self) -> str:
+        """
+        Return the API URL of the embeddings endpoint.
+
+        :returns: the API URL of the endpoint
+        :rtype: str
+        """
+        return self._get_full_url(f'{self.sambastudio_embeddings_project_id}/{self.sambastudio_embeddings_endpoint_id}')
+
     def _iterate_over_batches(self, texts: List[str], batch_size: int) -> Generator:
         """Generator for creating batches in the embed documents method
         Args:
@@ -131,179 +204,307 @@ class SambaStudioEmbeddings(BaseModel, Embeddings):
         for i in range(0, len(texts), batch_size):
             yield texts[i : i + batch_size]
 
-    def embed_documents(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
-        """Returns a list of embeddings for the given sentences.
-        Args:
-            texts (`List[str]`): List of texts to encode
-            batch_size (`int`): Batch size for the encoding
+    def _get_http_session(self) -> requests.Session:
+        """
+        Get the HTTP session of the model, creating it on first use. It's shared by all the calls made with the
+        model, with a connection pool large enough for the concurrent batches.
 
         Returns:
-            `List[np.ndarray]` or `List[tensor]`: List of embeddings
-            for the given sentences
+            The requests session.
         """
-        if batch_size is None:
-            batch_size = self.batch_size
-        http_session = requests.Session()
-        url = self._get_full_url(f'{self.sambastudio_embeddings_project_id}/{self.sambastudio_embeddings_endpoint_id}')
-        params = json.loads(self._get_tuning_params())
-        embeddings = []
+        if self._http_session is None:
+            with self._lock:
+                if self._http_session is None:
+                    adapter = HTTPAdapter(pool_connections=self.max_concurrency, pool_maxsize=self.max_concurrency)
+                    http_session = requests.Session()
+                    http_session.mount('https://', adapter)
+                    http_session.mount('http://', adapter)
+                    self._http_session = http_session
+        return self._http_session
+
+    def _get_batch_data(self, batch: List[str], params: Dict) -> Dict:
+        """
+        Get the request body to embed a batch of texts.
 
-        if 'api/predict/nlp' in self.sambastudio_embeddings_base_uri:
-            for batch in self._iterate_over_batches(texts, batch_size):
-                data = {'inputs': batch, 'params': params}
-                response = http_session.post(
-                    url,
-                    headers={'key': self.sambastudio_embeddings_api_key},
-                    json=data,
-                )
-                if response.status_code != 200:
-                    raise RuntimeError(
-                        f'Sambanova /complete call failed with status code '
-                        f'{response.status_code}.\n Details: {response.text}'
-                    )
-                try:
-                    embedding = response.json()['data']
-                    embeddings.extend(embedding)
-                except KeyError:
-                    raise KeyError(
-                        "'data' not found in endpoint response",
-                        response.json(),
-                    )
+        Args:
+            batch: texts to embed
+            params: tuning parameters
 
+        Returns:
+            The request body.
+        """
+        if 'api/predict/nlp' in self.sambastudio_embeddings_base_uri:
+            return {'inputs': batch, 'params': params}
         elif 'api/v2/predict/generic' in self.sambastudio_embeddings_base_uri:
-            for batch in self._iterate_over_batches(texts, batch_size):
-                items = [{'id': f'item{i}', 'value': item} for i, item in enumerate(batch)]
-                data = {'items': items, 'params': params}
-                response = http_session.post(
-                    url,
-                    headers={'key': self.sambastudio_embeddings_api_key},
-                    json=data,
-                )
-                if response.status_code != 200:
-                    raise RuntimeError(
-                        f'Sambanova /complete call failed with status code '
-                        f'{response.status_code}.\n Details: {response.text}'
-                    )
-                try:
-                    embedding = [item['value'] for item in response.json()['items']]
-                    embeddings.extend(embedding)
-                except KeyError:
-                    raise KeyError(
-                        "'items' not found in endpoint response",
-                        response.json(),
-                    )
-
+            items = [{'id': f'item{i}', 'value': item} for i, item in enumerate(batch)]
+            return {'items': items, 'params': params}
         elif 'api/predict/generic' in self.sambastudio_embeddings_base_uri:
-            for batch in self._iterate_over_batches(texts, batch_size):
-                data = {'instances': batch, 'params': params}
-                response = http_session.post(
-                    url,
-                    headers={'key': self.sambastudio_embeddings_api_key},
-                    json=data,
-                )
-                if response.status_code != 200:
-                    raise RuntimeError(
-                        f'Sambanova /complete call failed with status code '
-                        f'{response.status_code}.\n Details: {response.text}'
-                    )
-                try:
-                    if params.get('select_expert'):
-                        embedding = response.json()['predictions']
-                    else:
-                        embedding = response.json()['predictions']
-                    embeddings.extend(embedding)
-                except KeyError:
-                    raise KeyError(
-                        "'predictions' not found in endpoint response",
-                        response.json(),
-                    )
-
+            return {'instances': batch, 'params': params}
         else:
             raise ValueError(
                 f'handling of endpoint uri: {self.sambastudio_embeddings_base_uri} not implemented'  # noqa: E501
             )
 
-        return embeddings
+    def _get_batch_embeddings(self, response: Dict) -> List[List[float]]:
+        """
+        Get the embeddings of a batch from the endpoint response.
 
-    def embed_query(self, text: str) -> List[float]:
-        """Returns a list of embeddings for the given sentences.
         Args:
-            sentences (`List[str]`): List of sentences to encode
+            response: the json endpoint response
 
         Returns:
-            `List[np.ndarray]` or `List[tensor]`: List of embeddings
-            for the given sentences
+            The embeddings of the batch texts.
         """
-        http_session = requests.Session()
-        url = self._get_full_url(f'{self.sambastudio_embeddings_project_id}/{self.sambastudio_embeddings_endpoint_id}')
-        params = json.loads(self._get_tuning_params())
-
         if 'api/predict/nlp' in self.sambastudio_embeddings_base_uri:
-            data = {'inputs': [text], 'params': params}
-            response = http_session.post(
-                url,
-                headers={'key': self.sambastudio_embeddings_api_key},
-                json=data,
-            )
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f'Sambanova /complete call failed with status code '
-                    f'{response.status_code}.\n Details: {response.text}'
-                )
             try:
-                embedding = response.json()['data'][0]
+                return response['data']
             except KeyError:
                 raise KeyError(
                     "'data' not found in endpoint response",
-                    response.json(),
+                    response,
                 )
-
         elif 'api/v2/predict/generic' in self.sambastudio_embeddings_base_uri:
-            data = {'items': [{'id': 'item0', 'value': text}], 'params': params}
-            response = http_session.post(
-                url,
-                headers={'key': self.sambastudio_embeddings_api_key},
-                json=data,
-            )
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f'Sambanova /complete call failed with status code '
-                    f'{response.status_code}.\n Details: {response.text}'
-                )
             try:
-                embedding = response.json()['items'][0]['value']
+                return [item['value'] for item in response['items']]
             except KeyError:
                 raise KeyError(
                     "'items' not found in endpoint response",
-                    response.json(),
+                    response,
+                )
+        else:
+            try:
+                return response['predictions']
+            except KeyError:
+                raise KeyError(
+                    "'predictions' not found in endpoint response",
+                    response,
                 )
 
-        elif 'api/predict/generic' in self.sambastudio_embeddings_base_uri:
-            data = {'instances': [text], 'params': params}
-            response = http_session.post(
-                url,
+    def _post_batch(self, batch: List[str], params: Dict) -> List[List[float]]:
+        """
+        Embed a batch of texts with a single call to the endpoint.
+
+        Args:
+            batch: texts to embed
+            params: tuning parameters
+
+        Returns:
+            The embeddings of the batch texts.
+        """
+        data = self._get_batch_data(batch, params)
+        try:
+            response = self._get_http_session().post(
+                self._get_url(),
                 headers={'key': self.sambastudio_embeddings_api_key},
                 json=data,
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            raise EmbeddingsRequestError(f'Sambanova embeddings call failed: {e}') from e
+        if response.status_code != 200:
+            raise EmbeddingsRequestError(
+                f'Sambanova /complete call failed with status code '
+                f'{response.status_code}.\n Details: {response.text}',
+                status_code=response.status_code,
             )
-            if response.status_code != 200:
-                raise RuntimeError(
-                    f'Sambanova /complete call failed with status code '
-                    f'{response.status_code}.\n Details: {response.text}'
+        return self._get_batch_embeddings(response.json())
+
+    async def _apost_batch(self, batch: List[str], params: Dict) -> List[List[float]]:
+        """
+        Embed a batch of texts with a single async call to the endpoint, on the aiohttp session shared by the
+        event loop.
+
+        Args:
+            batch: texts to embed
+            params: tuning parameters
+
+        Returns:
+            The embeddings of the batch texts.
+        """
+        import aiohttp
+
+        data = self._get_batch_data(batch, params)
+        try:
+            async with _get_aiohttp_session().post(
+                self._get_url(),
+                headers={'key': self.sambastudio_embeddings_api_key},
+                json=data,
+                timeout=_get_aiohttp_timeout(self.timeout),
+            ) as response:
+                if response.status != 200:
+                    raise EmbeddingsRequestError(
+                        f'Sambanova /complete call failed with status code '
+                        f'{response.status}.\n Details: {await response.text()}',
+                        status_code=response.status,
+                    )
+                return self._get_batch_embeddings(await response.json(content_type=None))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise EmbeddingsRequestError(f'Sambanova embeddings call failed: {e}') from e
+
+    def _split_batch(self, batch: List[str], error: EmbeddingsRequestError) -> Optional[List[List[str]]]:
+        """
+        Get the smaller batches to retry a batch rejected by the endpoint for being too large with, lowering the
+        batch size used for the next batches too when `adaptive_batch_size` is set. Other rejections, e.g. an invalid
+        API key or model, are not split.
+
+        Args:
+            batch: texts of the rejected batch
+            error: the error raised by the endpoint
+
+        Returns:
+            The smaller batches, or None if the batch can't be split.
+        """
+        if not error.input_too_large or not self.adaptive_batch_size or len(batch) <= 1:
+            return None
+        batch_size = len(batch) // 2
+        with self._lock:
+            if self._batch_size_limit is None or batch_size < self._batch_size_limit:
+                logger.warning(
+                    f'Batch of {len(batch)} texts too large for the endpoint, reducing batch size to {batch_size}'
                 )
+                self._batch_size_limit = batch_size
+        return list(self._iterate_over_batches(batch, batch_size))
+
+    def _get_retry_delay(self, retry: int) -> float:
+        """Get the seconds to wait before a retry, with exponential backoff"""
+        return self.retry_backoff_factor * 2**retry
+
+    def _embed_batch(self, batch: List[str], params: Dict) -> List[List[float]]:
+        """
+        Embed a batch of texts, retrying transient failures with backoff and splitting batches rejected by the
+        endpoint into smaller ones.
+
+        Args:
+            batch: texts to embed
+            params: tuning parameters
+
+        Returns:
+            The embeddings of the batch texts.
+        """
+        batch_size_limit = self._batch_size_limit
+        if batch_size_limit is not None and len(batch) > batch_size_limit:
+            return [
+                embedding
+                for sub_batch in self._iterate_over_batches(batch, batch_size_limit)
+                for embedding in self._embed_batch(sub_batch, params)
+            ]
+
+        for retry in range(self.max_retries + 1):
             try:
-                if params.get('select_expert'):
-                    embedding = response.json()['predictions'][0]
-                else:
-                    embedding = response.json()['predictions'][0]
-            except KeyError:
-                raise KeyError(
-                    "'predictions' not found in endpoint response",
-                    response.json(),
-                )
+                return self._post_batch(batch, params)
+            except EmbeddingsRequestError as e:
+                sub_batches = self._split_batch(batch, e)
+                if sub_batches is not None:
+                    return [
+                        embedding for sub_batch in sub_batches for embedding in self._embed_batch(sub_batch, params)
+                    ]
+                if not e.retryable or retry == self.max_retries:
+                    raise
+                time.sleep(self._get_retry_delay(retry))
+        return []
+
+    async def _aembed_batch(self, batch: List[str], params: Dict) -> List[List[float]]:
+        """
+        Embed a batch of texts asynchronously, retrying transient failures with backoff and splitting batches
+        rejected by the endpoint into smaller ones.
 
+        Args:
+            batch: texts to embed
+            params: tuning parameters
+
+        Returns:
+            The embeddings of the batch texts.
+        """
+        batch_size_limit = self._batch_size_limit
+        if batch_size_limit is not None and len(batch) > batch_size_limit:
+            sub_batches = list(self._iterate_over_batches(batch, batch_size_limit))
         else:
-            raise ValueError(
-                f'handling of endpoint uri: {self.sambastudio_embeddings_base_uri} not implemented'  # noqa: E501
-            )
+            sub_batches = None
+            for retry in range(self.max_retries + 1):
+                try:
+                    return await self._apost_batch(batch, params)
+                except EmbeddingsRequestError as e:
+                    sub_batches = self._split_batch(batch, e)
+                    if sub_batches is not None:
+                        break
+                    if not e.retryable or retry == self.max_retries:
+                        raise
+                    await asyncio.sleep(self._get_retry_delay(retry))
+
+        embeddings = []
+        for sub_batch in sub_batches or []:
+            embeddings.extend(await self._aembed_batch(sub_batch, params))
+        return embeddings
+
+    def embed_documents(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Returns a list of embeddings for the given sentences.
+        Batches are sent concurrently, up to `max_concurrency` at the same time, keeping the order of the texts.
+        Args:
+            texts (`List[str]`): List of texts to encode
+            batch_size (`int`): Batch size for the encoding
 
-        return embedding
+        Returns:
+            `List[np.ndarray]` or `List[tensor]`: List of embeddings
+            for the given sentences
+        """
+        if batch_size is None:
+            batch_size = self.batch_size
+        params = json.loads(self._get_tuning_params())
+        batches = list(self._iterate_over_batches(texts, batch_size))
+
+        if len(batches) <= 1 or self.max_concurrency <= 1:
+            batch_embeddings = [self._embed_batch(batch, params) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                batch_embeddings = list(executor.map(lambda batch: self._embed_batch(batch, params), batches))
+
+        return [embedding for embeddings in batch_embeddings for embedding in embeddings]
+
+    async def aembed_documents(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Returns a list of embeddings for the given sentences, asynchronously.
+        Batches are sent concurrently, up to `max_concurrency` at the same time, keeping the order of the texts.
+        Args:
+            texts (`List[str]`): List of texts to encode
+            batch_size (`int`): Batch size for the encoding
+
+        Returns:
+            `List[np.ndarray]` or `List[tensor]`: List of embeddings
+            for the given sentences
+        """
+        if batch_size is None:
+            batch_size = self.batch_size
+        params = json.loads(self._get_tuning_params())
+        semaphore = asyncio.Semaphore(max(self.max_concurrency, 1))
+
+        async def _aembed_batch_with_semaphore(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self._aembed_batch(batch, params)
+
+        batch_embeddings = await asyncio.gather(
+            *(_aembed_batch_with_semaphore(batch) for batch in self._iterate_over_batches(texts, batch_size))
+        )
+        return [embedding for embeddings in batch_embeddings for embedding in embeddings]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Returns a list of embeddings for the given sentences.
+        Args:
+            sentences (`List[str]`): List of sentences to encode
+
+        Returns:
+            `List[np.ndarray]` or `List[tensor]`: List of embeddings
+            for the given sentences
+        """
+        params = json.loads(self._get_tuning_params())
+        return self._embed_batch([text], params)[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Returns a list of embeddings for the given sentences, asynchronously.
+        Args:
+            sentences (`List[str]`): List of sentences to encode
+
+        Returns:
+            `List[np.ndarray]` or `List[tensor]`: List of embeddings
+            for the given sentences
+        """
+        params = json.loads(self._get_tuning_params())
+        return (await self._aembed_batch([text], params))[0]
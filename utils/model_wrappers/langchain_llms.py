@@ -1,14 +1,184 @@
 """Langchain Wrapper around Sambanova LLM APIs."""
 
+import asyncio
 import json
-from typing import Any, Dict, Generator, Iterator, List, Optional, Union
+import threading
+import weakref
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, Generator, Iterator, List, Optional, Tuple, Union
 
 import requests
-from langchain_core.callbacks.manager import CallbackManagerForLLMRun
+from langchain_core.callbacks.manager import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
 from langchain_core.language_models.llms import LLM
-from langchain_core.outputs import GenerationChunk
-from langchain_core.pydantic_v1 import Extra
+from langchain_core.outputs import Generation, GenerationChunk, LLMResult
+from langchain_core.pydantic_v1 import Extra, PrivateAttr
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langchain_core.utils import get_from_dict_or_env, pre_init
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# aiohttp sessions shared by all the async calls made from the same event loop, so they reuse its connection pool.
+# They are keyed by the id of the loop, each with a weak reference to its loop and the async generator closing it when
+# the loop shuts down, which removes it.
+_aiohttp_sessions: Dict[int, Tuple['weakref.ref[asyncio.AbstractEventLoop]', Any, AsyncIterator[None]]] = {}
+
+
+async def _close_aiohttp_session_on_shutdown(loop_id: int, session: Any) -> AsyncIterator[None]:
+    """
+    Async generator suspended for the lifetime of an event loop, closing the loop's aiohttp session when the loop
+    shuts down its async generators, e.g. at the end of `asyncio.run`.
+
+    :param int loop_id: id of the event loop of the session
+    :param session: the aiohttp client session
+    """
+    try:
+        yield
+    finally:
+        if _aiohttp_sessions.get(loop_id, (None, None, None))[1] is session:
+            del _aiohttp_sessions[loop_id]
+        await session.close()
+
+
+def _get_aiohttp_session() -> Any:
+    """
+    Get the aiohttp session of the running event loop, creating it on first use. The session is closed when the
+    loop shuts down its async generators.
+
+    :returns: the aiohttp client session
+    :type: aiohttp.ClientSession
+    """
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError('could not import aiohttp library' 'Please install it with `pip install aiohttp`.')
+    loop = asyncio.get_running_loop()
+    loop_ref, session, _ = _aiohttp_sessions.get(id(loop), (None, None, None))
+    if loop_ref is None or loop_ref() is not loop or session.closed:
+        # Drop the sessions of the loops closed without shutting down their async generators
+        for loop_id, (other_loop_ref, _, _) in list(_aiohttp_sessions.items()):
+            other_loop = other_loop_ref()
+            if other_loop is None or other_loop.is_closed():
+                _aiohttp_sessions.pop(loop_id, None)
+
+        session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None), read_bufsize=2**20)
+        closer = _close_aiohttp_session_on_shutdown(id(loop), session)
+        # The loop tracks an async generator from its first iteration, run here up to the yield in a task, and
+        # closes it when shutting down, running its finally block
+        asyncio.ensure_future(closer.__anext__())
+        _aiohttp_sessions[id(loop)] = (weakref.ref(loop), session, closer)
+    return session
+
+
+def _build_http_session(pool_size: int, max_retries: int, retry_backoff_factor: float) -> requests.Session:
+    """
+    Build a requests session with a connection pool, so keep-alive connections are reused across calls,
+    retrying failed connections and retryable status codes with exponential backoff.
+
+    :param int pool_size: max number of connections kept alive per host
+    :param int max_retries: max number of retries of a call
+    :param float retry_backoff_factor: backoff factor between retries, sleeping {factor} * 2 ** (retry - 1) seconds
+    :returns: the requests session
+    :type: requests.Session
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=retry_backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    http_session = requests.Session()
+    http_session.mount('https://', adapter)
+    http_session.mount('http://', adapter)
+    return http_session
+
+
+def _get_aiohttp_timeout(timeout: Optional[float]) -> Any:
+    """
+    Get the aiohttp timeout of a call.
+
+    :param float timeout: total timeout of the call in seconds, None for no timeout
+    :returns: the aiohttp timeout
+    :type: aiohttp.ClientTimeout
+    """
+    import aiohttp
+
+    return aiohttp.ClientTimeout(total=timeout)
+
+
+async def _aiter_sse_events(response: Any) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Parse the server-sent events of an aiohttp streaming response.
+
+    :param aiohttp.ClientResponse response: the streaming response
+    :returns: async iterator of (event, data) tuples
+    """
+    event = 'message'
+    data_lines: List[str] = []
+    async for raw_line in response.content:
+        line = raw_line.decode('utf-8').rstrip('\r\n')
+        if not line:
+            if data_lines:
+                yield event, '\n'.join(data_lines)
+            event = 'message'
+            data_lines = []
+        elif line.startswith('event:'):
+            event = line[len('event:') :].strip()
+        elif line.startswith('data:'):
+            data_lines.append(line[len('data:') :].lstrip())
+    if data_lines:
+        yield event, '\n'.join(data_lines)
+
+
+def _generate_concurrently(
+    call: Callable[..., str],
+    prompts: List[str],
+    max_concurrency: int,
+    **call_kwargs: Any,
+) -> LLMResult:
+    """
+    Run the LLM call on a list of prompts concurrently in a thread pool.
+
+    :param call: the LLM call for a single prompt
+    :param List[str] prompts: the prompts
+    :param int max_concurrency: maximum number of prompts processed at the same time
+    :returns: the generations, in the order of the prompts
+    :type: LLMResult
+    """
+    if len(prompts) == 1:
+        texts = [call(prompts[0], **call_kwargs)]
+    else:
+        with ContextThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(prompts)))) as executor:
+            texts = list(executor.map(lambda prompt: call(prompt, **call_kwargs), prompts))
+    return LLMResult(generations=[[Generation(text=text)] for text in texts])
+
+
+async def _agenerate_concurrently(
+    acall: Callable[..., Coroutine[Any, Any, str]],
+    prompts: List[str],
+    max_concurrency: int,
+    **call_kwargs: Any,
+) -> LLMResult:
+    """
+    Run the async LLM call on a list of prompts concurrently.
+
+    :param acall: the async LLM call for a single prompt
+    :param List[str] prompts: the prompts
+    :param int max_concurrency: maximum number of prompts processed at the same time
+    :returns: the generations, in the order of the prompts
+    :type: LLMResult
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _acall_prompt(prompt: str) -> str:
+        async with semaphore:
+            return await acall(prompt, **call_kwargs)
+
+    texts = await asyncio.gather(*[_acall_prompt(prompt) for prompt in prompts])
+    return LLMResult(generations=[[Generation(text=text)] for text in texts])
 
 
 class SSEndpointHandler:
@@ -18,16 +188,25 @@ class SSEndpointHandler:
     :param str host_url: Base URL of the DaaS API service
     """
 
-    def __init__(self, host_url: str, api_base_uri: str):
+    def __init__(
+        self,
+        host_url: str,
+        api_base_uri: str,
+        http_session: Optional[requests.Session] = None,
+        timeout: Optional[float] = None,
+    ):
         """
         Initialize the SSEndpointHandler.
 
         :param str host_url: Base URL of the DaaS API service
         :param str api_base_uri: Base URI of the DaaS API service
+        :param requests.Session http_session: session to make the calls with, a new one if not set
+        :param float timeout: timeout of the calls in seconds, None for no timeout
         """
         self.host_url = host_url
         self.api_base_uri = api_base_uri
-        self.http_session = requests.Session()
+        self.http_session = http_session or requests.Session()
+        self.timeout = timeout
 
     def _process_response(self, response: requests.Response) -> Dict:
         """
@@ -92,6 +271,48 @@ class SSEndpointHandler:
         else:
             raise ValueError(f'handling of endpoint uri: {self.api_base_uri} not implemented')
 
+    async def _aprocess_response(self, response: Any) -> Dict:
+        """
+        Processes the async API response and returns the resulting dict.
+
+        :param aiohttp.ClientResponse response: the response object to process
+        :return: the response dict
+        :type: dict
+        """
+        result: Dict[str, Any] = {}
+        try:
+            result = await response.json(content_type=None)
+        except Exception as e:
+            result['detail'] = str(e)
+        if 'status_code' not in result:
+            result['status_code'] = response.status
+        return result
+
+    async def _aprocess_streaming_response(self, response: Any) -> AsyncIterator[Dict]:
+        """Process the async streaming response"""
+        if 'api/predict/nlp' in self.api_base_uri:
+            async for event, data in _aiter_sse_events(response):
+                yield {
+                    'event': event,
+                    'data': data,
+                    'status_code': response.status,
+                }
+                if event == 'error_event':
+                    break
+        elif 'api/v2/predict/generic' in self.api_base_uri or 'api/predict/generic' in self.api_base_uri:
+            try:
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    chunk = json.loads(line)
+                    if 'status_code' not in chunk:
+                        chunk['status_code'] = response.status
+                    yield chunk
+            except Exception as e:
+                raise RuntimeError(f'Error processing streaming response: {e}')
+        else:
+            raise ValueError(f'handling of endpoint uri: {self.api_base_uri} not implemented')
+
     def _get_full_url(self, path: str) -> str:
         """
         Return the full API URL for a given path.
@@ -102,24 +323,13 @@ class SSEndpointHandler:
         """
         return f'{self.host_url}/{self.api_base_uri}/{path}'
 
-    def nlp_predict(
-        self,
-        project: str,
-        endpoint: str,
-        key: str,
-        input: Union[List[str], str],
-        params: Optional[str] = '',
-        stream: bool = False,
-    ) -> Dict:
+    def _get_predict_data(self, input: Union[List[str], str], params: Optional[str] = '') -> Dict:
         """
-        NLP predict using inline input string.
+        Build the request body of an NLP predict call.
 
-        :param str project: Project ID in which the endpoint exists
-        :param str endpoint: Endpoint ID
-        :param str key: API Key
-        :param str input_str: Input string
+        :param input: Input string or list of input strings
         :param str params: Input params string
-        :returns: Prediction results
+        :returns: request body
         :type: dict
         """
         if isinstance(input, str):
@@ -142,30 +352,15 @@ class SSEndpointHandler:
                 data = {'instances': input}
         else:
             raise ValueError(f'handling of endpoint uri: {self.api_base_uri} not implemented')
-        response = self.http_session.post(
-            self._get_full_url(f'{project}/{endpoint}'),
-            headers={'key': key},
-            json=data,
-        )
-        return self._process_response(response)
+        return data
 
-    def nlp_predict_stream(
-        self,
-        project: str,
-        endpoint: str,
-        key: str,
-        input: Union[List[str], str],
-        params: Optional[str] = '',
-    ) -> Iterator[Dict]:
+    def _get_predict_stream_data(self, input: Union[List[str], str], params: Optional[str] = '') -> Dict:
         """
-        NLP predict using inline input string.
+        Build the request body of a streaming NLP predict call.
 
-        :param str project: Project ID in which the endpoint exists
-        :param str endpoint: Endpoint ID
-        :param str key: API Key
-        :param str input_str: Input string
+        :param input: Input string or list of input strings
         :param str params: Input params string
-        :returns: Prediction results
+        :returns: request body
         :type: dict
         """
         if 'api/predict/nlp' in self.api_base_uri:
@@ -192,15 +387,126 @@ class SSEndpointHandler:
                 data = {'instance': input}
         else:
             raise ValueError(f'handling of endpoint uri: {self.api_base_uri} not implemented')
+        return data
+
+    def nlp_predict(
+        self,
+        project: str,
+        endpoint: str,
+        key: str,
+        input: Union[List[str], str],
+        params: Optional[str] = '',
+        stream: bool = False,
+    ) -> Dict:
+        """
+        NLP predict using inline input string.
+
+        :param str project: Project ID in which the endpoint exists
+        :param str endpoint: Endpoint ID
+        :param str key: API Key
+        :param str input_str: Input string
+        :param str params: Input params string
+        :returns: Prediction results
+        :type: dict
+        """
+        data = self._get_predict_data(input, params)
+        response = self.http_session.post(
+            self._get_full_url(f'{project}/{endpoint}'),
+            headers={'key': key},
+            json=data,
+            timeout=self.timeout,
+        )
+        return self._process_response(response)
+
+    def nlp_predict_stream(
+        self,
+        project: str,
+        endpoint: str,
+        key: str,
+        input: Union[List[str], str],
+        params: Optional[str] = '',
+    ) -> Iterator[Dict]:
+        """
+        NLP predict using inline input string.
+
+        :param str project: Project ID in which the endpoint exists
+        :param str endpoint: Endpoint ID
+        :param str key: API Key
+        :param str input_str: Input string
+        :param str params: Input params string
+        :returns: Prediction results
+        :type: dict
+        """
+        data = self._get_predict_stream_data(input, params)
         # Streaming output
         response = self.http_session.post(
             self._get_full_url(f'stream/{project}/{endpoint}'),
             headers={'key': key},
             json=data,
             stream=True,
+            timeout=self.timeout,
         )
-        for chunk in self._process_streaming_response(response):
-            yield chunk
+        # Release the connection to the pool, or discard it if the stream isn't fully read
+        with response:
+            for chunk in self._process_streaming_response(response):
+                yield chunk
+
+    async def anlp_predict(
+        self,
+        project: str,
+        endpoint: str,
+        key: str,
+        input: Union[List[str], str],
+        params: Optional[str] = '',
+    ) -> Dict:
+        """
+        Async NLP predict using inline input string, on the aiohttp session shared by the event loop.
+
+        :param str project: Project ID in which the endpoint exists
+        :param str endpoint: Endpoint ID
+        :param str key: API Key
+        :param str input_str: Input string
+        :param str params: Input params string
+        :returns: Prediction results
+        :type: dict
+        """
+        data = self._get_predict_data(input, params)
+        async with _get_aiohttp_session().post(
+            self._get_full_url(f'{project}/{endpoint}'),
+            headers={'key': key},
+            json=data,
+            timeout=_get_aiohttp_timeout(self.timeout),
+        ) as response:
+            return await self._aprocess_response(response)
+
+    async def anlp_predict_stream(
+        self,
+        project: str,
+        endpoint: str,
+        key: str,
+        input: Union[List[str], str],
+        params: Optional[str] = '',
+    ) -> AsyncIterator[Dict]:
+        """
+        Async streaming NLP predict using inline input string, on the aiohttp session shared by the event loop.
+
+        :param str project: Project ID in which the endpoint exists
+        :param str endpoint: Endpoint ID
+        :param str key: API Key
+        :param str input_str: Input string
+        :param str params: Input params string
+        :returns: Prediction results
+        :type: dict
+        """
+        data = self._get_predict_stream_data(input, params)
+        async with _get_aiohttp_session().post(
+            self._get_full_url(f'stream/{project}/{endpoint}'),
+            headers={'key': key},
+            json=data,
+            timeout=_get_aiohttp_timeout(self.timeout),
+        ) as response:
+            async for chunk in self._aprocess_streaming_response(response):
+                yield chunk
 
 
 class SambaStudio(LLM):
@@ -263,6 +569,24 @@ class SambaStudio(LLM):
     streaming: Optional[bool] = False
     """Streaming flag to get streamed response."""
 
+    max_concurrency: int = 8
+    """Max number of prompts processed concurrently when generating for a list of prompts, e.g. with batch."""
+
+    http_pool_size: int = 10
+    """Max number of HTTP connections kept alive and reused across calls."""
+
+    max_retries: int = 3
+    """Max number of retries of a call failing to connect or with a retryable status code."""
+
+    retry_backoff_factor: float = 0.5
+    """Backoff factor between retries, sleeping {factor} * 2 ** (retry - 1) seconds."""
+
+    timeout: Optional[float] = None
+    """Timeout of the calls in seconds, None for no timeout."""
+
+    _http_session: Optional[requests.Session] = PrivateAttr(default=None)
+    _http_session_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
     class Config:
         """Configuration for this pydantic object."""
 
@@ -301,6 +625,36 @@ class SambaStudio(LLM):
         values['sambastudio_api_key'] = get_from_dict_or_env(values, 'sambastudio_api_key', 'SAMBASTUDIO_API_KEY')
         return values
 
+    def _get_http_session(self) -> requests.Session:
+        """
+        Get the HTTP session of the LLM, creating it on first use. It's shared by all the calls made with the LLM,
+        including concurrent ones, so they reuse its pooled keep-alive connections.
+
+        Returns:
+            The requests session.
+        """
+        if self._http_session is None:
+            with self._http_session_lock:
+                if self._http_session is None:
+                    self._http_session = _build_http_session(
+                        self.http_pool_size, self.max_retries, self.retry_backoff_factor
+                    )
+        return self._http_session
+
+    def _get_endpoint_handler(self) -> SSEndpointHandler:
+        """
+        Get the SSEndpointHandler to call the endpoint with, on the HTTP session of the LLM.
+
+        Returns:
+            The endpoint handler.
+        """
+        return SSEndpointHandler(
+            self.sambastudio_base_url,
+            self.sambastudio_base_uri,
+            http_session=self._get_http_session(),
+            timeout=self.timeout,
+        )
+
     def _get_tuning_params(self, stop: Optional[List[str]]) -> str:
         """
         Get the tuning parameters to use when calling the LLM.
@@ -349,6 +703,47 @@ class SambaStudio(LLM):
             prompt,
             tuning_params,
         )
+        return self._get_completion(response)
+
+    async def _ahandle_nlp_predict(
+        self, sdk: SSEndpointHandler, prompt: Union[List[str], str], tuning_params: str
+    ) -> str:
+        """
+        Perform an async NLP prediction using the SambaStudio endpoint handler.
+
+        Args:
+            sdk: The SSEndpointHandler to use for the prediction.
+            prompt: The prompt to use for the prediction.
+            tuning_params: The tuning parameters to use for the prediction.
+
+        Returns:
+            The prediction result.
+
+        Raises:
+            ValueError: If the prediction fails.
+        """
+        response = await sdk.anlp_predict(
+            self.sambastudio_project_id,
+            self.sambastudio_endpoint_id,
+            self.sambastudio_api_key,
+            prompt,
+            tuning_params,
+        )
+        return self._get_completion(response)
+
+    def _get_completion(self, response: Dict) -> str:
+        """
+        Get the completion of an NLP prediction response.
+
+        Args:
+            response: The prediction response.
+
+        Returns:
+            The completion.
+
+        Raises:
+            ValueError: If the prediction failed.
+        """
         if response['status_code'] != 200:
             optional_detail = response.get('detail')
             if optional_detail:
@@ -384,10 +779,28 @@ class SambaStudio(LLM):
         Raises:
             ValueError: If the prediction fails.
         """
-        ss_endpoint = SSEndpointHandler(self.sambastudio_base_url, self.sambastudio_base_uri)
+        ss_endpoint = self._get_endpoint_handler()
         tuning_params = self._get_tuning_params(stop)
         return self._handle_nlp_predict(ss_endpoint, prompt, tuning_params)
 
+    async def _ahandle_completion_requests(self, prompt: Union[List[str], str], stop: Optional[List[str]]) -> str:
+        """
+        Perform an async prediction using the SambaStudio endpoint handler.
+
+        Args:
+            prompt: The prompt to use for the prediction.
+            stop: stop sequences.
+
+        Returns:
+            The prediction result.
+
+        Raises:
+            ValueError: If the prediction fails.
+        """
+        ss_endpoint = self._get_endpoint_handler()
+        tuning_params = self._get_tuning_params(stop)
+        return await self._ahandle_nlp_predict(ss_endpoint, prompt, tuning_params)
+
     def _handle_nlp_predict_stream(
         self, sdk: SSEndpointHandler, prompt: Union[List[str], str], tuning_params: str
     ) -> Iterator[GenerationChunk]:
@@ -409,44 +822,80 @@ class SambaStudio(LLM):
             prompt,
             tuning_params,
         ):
-            if chunk['status_code'] != 200:
-                error = chunk.get('error')
-                if error:
-                    optional_code = error.get('code')
-                    optional_details = error.get('details')
-                    optional_message = error.get('message')
-                    raise ValueError(
-                        f"Sambanova /complete call failed with status code "
-                        f"{chunk['status_code']}.\n"
-                        f"Message: {optional_message}\n"
-                        f"Details: {optional_details}\n"
-                        f"Code: {optional_code}\n"
-                    )
-                else:
-                    raise RuntimeError(
-                        f"Sambanova /complete call failed with status code " f"{chunk['status_code']}." f"{chunk}."
-                    )
-            if 'api/predict/nlp' in self.sambastudio_base_uri:
-                text = json.loads(chunk['data'])['stream_token']
-            elif 'api/v2/predict/generic' in self.sambastudio_base_uri:
-                text = chunk['result']['items'][0]['value']['stream_token']
-            elif 'api/predict/generic' in self.sambastudio_base_uri:
-                if len(chunk['result']['responses']) > 0:
-                    text = chunk['result']['responses'][0]['stream_token']
-                else:
-                    text = ''
-            else:
-                raise ValueError(f'handling of endpoint uri: {self.sambastudio_base_uri}' f'not implemented')
-            generated_chunk = GenerationChunk(text=text)
-            yield generated_chunk
+            yield GenerationChunk(text=self._get_stream_token(chunk))
 
-    def _stream(
-        self,
-        prompt: Union[List[str], str],
-        stop: Optional[List[str]] = None,
-        run_manager: Optional[CallbackManagerForLLMRun] = None,
-        **kwargs: Any,
-    ) -> Iterator[GenerationChunk]:
+    async def _ahandle_nlp_predict_stream(
+        self, sdk: SSEndpointHandler, prompt: Union[List[str], str], tuning_params: str
+    ) -> AsyncIterator[GenerationChunk]:
+        """
+        Perform an async streaming request to the LLM.
+
+        Args:
+            sdk: The SVEndpointHandler to use for the prediction.
+            prompt: The prompt to use for the prediction.
+            tuning_params: The tuning parameters to use for the prediction.
+
+        Returns:
+            An async iterator of GenerationChunks.
+        """
+        async for chunk in sdk.anlp_predict_stream(
+            self.sambastudio_project_id,
+            self.sambastudio_endpoint_id,
+            self.sambastudio_api_key,
+            prompt,
+            tuning_params,
+        ):
+            yield GenerationChunk(text=self._get_stream_token(chunk))
+
+    def _get_stream_token(self, chunk: Dict) -> str:
+        """
+        Get the stream token of a streamed chunk.
+
+        Args:
+            chunk: The streamed chunk.
+
+        Returns:
+            The stream token.
+
+        Raises:
+            ValueError: If the streaming request failed.
+        """
+        if chunk['status_code'] != 200:
+            error = chunk.get('error')
+            if error:
+                optional_code = error.get('code')
+                optional_details = error.get('details')
+                optional_message = error.get('message')
+                raise ValueError(
+                    f"Sambanova /complete call failed with status code "
+                    f"{chunk['status_code']}.\n"
+                    f"Message: {optional_message}\n"
+                    f"Details: {optional_details}\n"
+                    f"Code: {optional_code}\n"
+                )
+            else:
+                raise RuntimeError(
+                    f"Sambanova /complete call failed with status code " f"{chunk['status_code']}." f"{chunk}."
+                )
+        if 'api/predict/nlp' in self.sambastudio_base_uri:
+            return json.loads(chunk['data'])['stream_token']
+        elif 'api/v2/predict/generic' in self.sambastudio_base_uri:
+            return chunk['result']['items'][0]['value']['stream_token']
+        elif 'api/predict/generic' in self.sambastudio_base_uri:
+            if len(chunk['result']['responses']) > 0:
+                return chunk['result']['responses'][0]['stream_token']
+            else:
+                return ''
+        else:
+            raise ValueError(f'handling of endpoint uri: {self.sambastudio_base_uri}' f'not implemented')
+
+    def _stream(
+        self,
+        prompt: Union[List[str], str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
         """Call out to Sambanova's complete endpoint.
 
         Args:
@@ -456,7 +905,7 @@ class SambaStudio(LLM):
         Returns:
             The string generated by the model.
         """
-        ss_endpoint = SSEndpointHandler(self.sambastudio_base_url, self.sambastudio_base_uri)
+        ss_endpoint = self._get_endpoint_handler()
         tuning_params = self._get_tuning_params(stop)
         try:
             if self.streaming:
@@ -522,6 +971,130 @@ class SambaStudio(LLM):
             # Handle any errors raised by the inference endpoint
             raise ValueError(f'Error raised by the inference endpoint: {e}') from e
 
+    async def _astream(
+        self,
+        prompt: Union[List[str], str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[GenerationChunk]:
+        """Call out to Sambanova's complete endpoint asynchronously.
+
+        Args:
+            prompt: The prompt to pass into the model.
+            stop: Optional list of stop words to use when generating.
+
+        Returns:
+            The string generated by the model.
+        """
+        ss_endpoint = self._get_endpoint_handler()
+        tuning_params = self._get_tuning_params(stop)
+        try:
+            if self.streaming:
+                async for chunk in self._ahandle_nlp_predict_stream(ss_endpoint, prompt, tuning_params):
+                    if run_manager:
+                        await run_manager.on_llm_new_token(chunk.text)
+                    yield chunk
+            else:
+                return
+        except Exception as e:
+            # Handle any errors raised by the inference endpoint
+            raise ValueError(f'Error raised by the inference endpoint: {e}') from e
+
+    async def _ahandle_stream_request(
+        self,
+        prompt: Union[List[str], str],
+        stop: Optional[List[str]],
+        run_manager: Optional[AsyncCallbackManagerForLLMRun],
+        kwargs: Dict[str, Any],
+    ) -> str:
+        """
+        Perform an async streaming request to the LLM.
+
+        Args:
+            prompt: The prompt to generate from.
+            stop: Stop words to use when generating. Model output is cut off at the
+                first occurrence of any of the stop substrings.
+            run_manager: Callback manager for the run.
+            **kwargs: Additional keyword arguments. directly passed
+                to the sambastudio model in API call.
+
+        Returns:
+            The model output as a string.
+        """
+        completion = ''
+        async for chunk in self._astream(prompt=prompt, stop=stop, run_manager=run_manager, **kwargs):
+            completion += chunk.text
+        return completion
+
+    async def _acall(
+        self,
+        prompt: Union[List[str], str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        """Call out to Sambanova's complete endpoint asynchronously.
+
+        Args:
+            prompt: The prompt to pass into the model.
+            stop: Optional list of stop words to use when generating.
+
+        Returns:
+            The string generated by the model.
+        """
+        if stop is not None:
+            raise Exception('stop not implemented')
+        try:
+            if self.streaming:
+                return await self._ahandle_stream_request(prompt, stop, run_manager, kwargs)
+            return await self._ahandle_completion_requests(prompt, stop)
+        except Exception as e:
+            # Handle any errors raised by the inference endpoint
+            raise ValueError(f'Error raised by the inference endpoint: {e}') from e
+
+    def _generate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        """Call out to Sambanova's complete endpoint for each of the prompts, processing up to
+        `max_concurrency` prompts at the same time.
+
+        Args:
+            prompts: The prompts to pass into the model.
+            stop: Optional list of stop words to use when generating.
+
+        Returns:
+            The generations of the model, in the order of the prompts.
+        """
+        return _generate_concurrently(
+            self._call, prompts, self.max_concurrency, stop=stop, run_manager=run_manager, **kwargs
+        )
+
+    async def _agenerate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        """Call out to Sambanova's complete endpoint asynchronously for each of the prompts, processing up to
+        `max_concurrency` prompts at the same time.
+
+        Args:
+            prompts: The prompts to pass into the model.
+            stop: Optional list of stop words to use when generating.
+
+        Returns:
+            The generations of the model, in the order of the prompts.
+        """
+        return await _agenerate_concurrently(
+            self._acall, prompts, self.max_concurrency, stop=stop, run_manager=run_manager, **kwargs
+        )
+
 
 class SambaNovaCloud(LLM):
     """
@@ -575,6 +1148,24 @@ class SambaNovaCloud(LLM):
     stream_options: dict = {'include_usage': True}
     """stream options, include usage to get generation metrics"""
 
+    max_concurrency: int = 8
+    """Max number of prompts processed concurrently when generating for a list of prompts, e.g. with batch."""
+
+    http_pool_size: int = 10
+    """Max number of HTTP connections kept alive and reused across calls."""
+
+    max_retries: int = 3
+    """Max number of retries of a call failing to connect or with a retryable status code."""
+
+    retry_backoff_factor: float = 0.5
+    """Backoff factor between retries, sleeping {factor} * 2 ** (retry - 1) seconds."""
+
+    timeout: Optional[float] = None
+    """Timeout of the calls in seconds, None for no timeout."""
+
+    _http_session: Optional[requests.Session] = PrivateAttr(default=None)
+    _http_session_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
     class Config:
         """Configuration for this pydantic object."""
 
@@ -610,6 +1201,22 @@ class SambaNovaCloud(LLM):
         values['sambanova_api_key'] = get_from_dict_or_env(values, 'sambanova_api_key', 'SAMBANOVA_API_KEY')
         return values
 
+    def _get_http_session(self) -> requests.Session:
+        """
+        Get the HTTP session of the LLM, creating it on first use. It's shared by all the calls made with the LLM,
+        including concurrent ones, so they reuse its pooled keep-alive connections.
+
+        Returns:
+            The requests session.
+        """
+        if self._http_session is None:
+            with self._http_session_lock:
+                if self._http_session is None:
+                    self._http_session = _build_http_session(
+                        self.http_pool_size, self.max_retries, self.retry_backoff_factor
+                    )
+        return self._http_session
+
     def _handle_nlp_predict_stream(
         self,
         prompt: Union[List[str], str],
@@ -629,15 +1236,99 @@ class SambaNovaCloud(LLM):
             import sseclient
         except ImportError:
             raise ImportError('could not import sseclient library' 'Please install it with `pip install sseclient-py`.')
+
+        data = self._get_request_data(prompt, stop)
+        # Streaming output
+        response = self._get_http_session().post(
+            self.sambanova_url,
+            headers=self._get_headers(),
+            json=data,
+            stream=True,
+            timeout=self.timeout,
+        )
+
+        # Release the connection to the pool, or discard it if the stream isn't fully read
+        with response:
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f'Sambanova /complete call failed with status code ' f'{response.status_code}.' f'{response.text}.'
+                )
+
+            client = sseclient.SSEClient(response)
+            for event in client.events():
+                chunk = {
+                    'event': event.event,
+                    'data': event.data,
+                    'status_code': response.status_code,
+                }
+                text = self._get_chunk_text(chunk)
+                if text is not None:
+                    yield GenerationChunk(text=text)
+
+    async def _ahandle_nlp_predict_stream(
+        self,
+        prompt: Union[List[str], str],
+        stop: List[str],
+    ) -> AsyncIterator[GenerationChunk]:
+        """
+        Perform an async streaming request to the LLM, on the aiohttp session shared by the event loop.
+
+        Args:
+            prompt: The prompt to use for the prediction.
+            stop: list of stop tokens
+
+        Returns:
+            An async iterator of GenerationChunks.
+        """
+        data = self._get_request_data(prompt, stop)
+        async with _get_aiohttp_session().post(
+            self.sambanova_url,
+            headers=self._get_headers(),
+            json=data,
+            timeout=_get_aiohttp_timeout(self.timeout),
+        ) as response:
+            if response.status != 200:
+                raise RuntimeError(
+                    f'Sambanova /complete call failed with status code '
+                    f'{response.status}.'
+                    f'{await response.text()}.'
+                )
+
+            async for event, event_data in _aiter_sse_events(response):
+                chunk = {
+                    'event': event,
+                    'data': event_data,
+                    'status_code': response.status,
+                }
+                text = self._get_chunk_text(chunk)
+                if text is not None:
+                    yield GenerationChunk(text=text)
+                if event == 'error_event':
+                    break
+
+    def _get_headers(self) -> Dict[str, str]:
+        """Get the headers of the API calls"""
+        return {'Authorization': f'Bearer {self.sambanova_api_key}', 'Content-Type': 'application/json'}
+
+    def _get_request_data(self, prompt: Union[List[str], str], stop: Optional[List[str]]) -> Dict[str, Any]:
+        """
+        Build the request body of the API call.
+
+        Args:
+            prompt: The prompt to use for the prediction, either a text or a json list of messages.
+            stop: list of stop tokens
+
+        Returns:
+            The request body.
+        """
         try:
             formatted_prompt = json.loads(prompt)
         except:
             formatted_prompt = [{'role': 'user', 'content': prompt}]
 
-        http_session = requests.Session()
         if not stop:
             stop = self.stop_tokens
-        data = {
+        return {
             'messages': formatted_prompt,
             'max_tokens': self.max_tokens,
             'stop': stop,
@@ -648,53 +1339,38 @@ class SambaNovaCloud(LLM):
             'stream': self.stream_api,
             'stream_options': self.stream_options,
         }
-        # Streaming output
-        response = http_session.post(
-            self.sambanova_url,
-            headers={'Authorization': f'Bearer {self.sambanova_api_key}', 'Content-Type': 'application/json'},
-            json=data,
-            stream=True,
-        )
 
-        client = sseclient.SSEClient(response)
-        close_conn = False
+    def _get_chunk_text(self, chunk: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the content of a streamed chunk.
 
-        if response.status_code != 200:
+        Args:
+            chunk: The streamed chunk.
+
+        Returns:
+            The content of the chunk, None if it's a final chunk without content.
+        """
+        if chunk.get('error'):
             raise RuntimeError(
-                f'Sambanova /complete call failed with status code ' f'{response.status_code}.' f'{response.text}.'
+                f"Sambanova /complete call failed with status code " f"{chunk['status_code']}." f"{chunk}."
             )
 
-        for event in client.events():
-            if event.event == 'error_event':
-                close_conn = True
-            chunk = {
-                'event': event.event,
-                'data': event.data,
-                'status_code': response.status_code,
-            }
-
-            if chunk.get('error'):
-                raise RuntimeError(
-                    f"Sambanova /complete call failed with status code " f"{chunk['status_code']}." f"{chunk}."
-                )
-
-            try:
-                # check if the response is a final event in that case event data response is '[DONE]'
-                if chunk['data'] != '[DONE]':
-                    data = json.loads(chunk['data'])
-                    if data.get('error'):
-                        raise RuntimeError(
-                            f"Sambanova /complete call failed with status code " f"{chunk['status_code']}." f"{chunk}."
-                        )
-                    # check if the response is a final response with usage stats (not includes content)
-                    if data.get('usage') is None:
-                        # check is not "end of text" response
-                        if data['choices'][0]['finish_reason'] is None:
-                            text = data['choices'][0]['delta']['content']
-                            generated_chunk = GenerationChunk(text=text)
-                            yield generated_chunk
-            except Exception as e:
-                raise Exception(f'Error getting content chunk raw streamed response: {chunk}')
+        try:
+            # check if the response is a final event in that case event data response is '[DONE]'
+            if chunk['data'] != '[DONE]':
+                data = json.loads(chunk['data'])
+                if data.get('error'):
+                    raise RuntimeError(
+                        f"Sambanova /complete call failed with status code " f"{chunk['status_code']}." f"{chunk}."
+                    )
+                # check if the response is a final response with usage stats (not includes content)
+                if data.get('usage') is None:
+                    # check is not "end of text" response
+                    if data['choices'][0]['finish_reason'] is None:
+                        return data['choices'][0]['delta']['content']
+        except Exception as e:
+            raise Exception(f'Error getting content chunk raw streamed response: {chunk}')
+        return None
 
     def _stream(
         self,
@@ -768,3 +1444,95 @@ class SambaNovaCloud(LLM):
         except Exception as e:
             # Handle any errors raised by the inference endpoint
             raise ValueError(f'Error raised by the inference endpoint: {e}') from e
+
+    async def _astream(
+        self,
+        prompt: Union[List[str], str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[GenerationChunk]:
+        """Call out to Sambanova's complete endpoint asynchronously.
+
+        Args:
+            prompt: The prompt to pass into the model.
+            stop: Optional list of stop words to use when generating.
+
+        Returns:
+            The string generated by the model.
+        """
+        try:
+            async for chunk in self._ahandle_nlp_predict_stream(prompt, stop):
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text)
+                yield chunk
+        except Exception as e:
+            # Handle any errors raised by the inference endpoint
+            raise ValueError(f'Error raised by the inference endpoint: {e}') from e
+
+    async def _acall(
+        self,
+        prompt: Union[List[str], str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        """Call out to Sambanova's complete endpoint asynchronously.
+
+        Args:
+            prompt: The prompt to pass into the model.
+            stop: Optional list of stop words to use when generating.
+
+        Returns:
+            The string generated by the model.
+        """
+        try:
+            completion = ''
+            async for chunk in self._astream(prompt=prompt, stop=stop, run_manager=run_manager, **kwargs):
+                completion += chunk.text
+            return completion
+        except Exception as e:
+            # Handle any errors raised by the inference endpoint
+            raise ValueError(f'Error raised by the inference endpoint: {e}') from e
+
+    def _generate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        """Call out to Sambanova's complete endpoint for each of the prompts, processing up to
+        `max_concurrency` prompts at the same time.
+
+        Args:
+            prompts: The prompts to pass into the model.
+            stop: Optional list of stop words to use when generating.
+
+        Returns:
+            The generations of the model, in the order of the prompts.
+        """
+        return _generate_concurrently(
+            self._call, prompts, self.max_concurrency, stop=stop, run_manager=run_manager, **kwargs
+        )
+
+    async def _agenerate(
+        self,
+        prompts: List[str],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> LLMResult:
+        """Call out to Sambanova's complete endpoint asynchronously for each of the prompts, processing up to
+        `max_concurrency` prompts at the same time.
+
+        Args:
+            prompts: The prompts to pass into the model.
+            stop: Optional list of stop words to use when generating.
+
+        Returns:
+            The generations of the model, in the order of the prompts.
+        """
+        return await _agenerate_concurrently(
+            self._acall, prompts, self.max_concurrency, stop=stop, run_manager=run_manager, **kwargs
+        )
@@ -0,0 +1,254 @@
+"""Local response cache for langchain LLMs, with an exact-match and an optional semantic tier."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.embeddings import Embeddings
+
+
+class _CacheEntry(NamedTuple):
+    llm_string: str
+    return_val: RETURN_VAL_TYPE
+    expires_at: float
+    embedding: Optional[np.ndarray]
+
+
+class ResponseCache(BaseCache):
+    """LLM response cache kept in memory, to be set as the `cache` of a langchain LLM.
+
+    The exact-match tier returns the cached response of the same prompt sent to the same model with the same
+    parameters (langchain's llm_string). When `embeddings` is set, a semantic tier returns the cached response of
+    the most similar prompt sent to the same model with the same parameters, if its cosine similarity is at least
+    `similarity_threshold`. It should only be enabled for deterministic generation, e.g. with do_sample=False, as
+    near-identical prompts are then expected to get the same response.
+
+    The whole rendered prompt is embedded, template included, so prompts sharing a long template are similar
+    whatever their inputs, and a high threshold is needed for the inputs to matter. The semantic tier is unsafe for
+    classification, extraction and other prompts where a small change of the input changes the expected answer,
+    e.g. "is this review positive" of two reviews differing by a negation: it must be disabled for them.
+
+    Entries expire after `ttl` seconds, and the least recently used entries are evicted beyond `max_size`.
+
+    Args:
+        max_size (int, optional): max number of cached responses. Defaults to 1000.
+        ttl (Optional[float], optional): seconds after which a cached response expires, never if None.
+            Defaults to None.
+        embeddings (Optional[Embeddings], optional): embedding model of the semantic tier, disabled if None.
+            Defaults to None.
+        similarity_threshold (float, optional): min cosine similarity of a semantic hit. Defaults to 0.99.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl: Optional[float] = None,
+        embeddings: Optional[Embeddings] = None,
+        similarity_threshold: float = 0.99,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError(f'max_size must be at least 1, got {max_size}')
+        self.max_size = max_size
+        self.ttl = ttl
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+
+        self._entries: OrderedDict = OrderedDict()
+        # Prompt embeddings computed by semantic lookups that missed, reused when the response is cached
+        self._pending_embeddings: OrderedDict = OrderedDict()
+        # Normalized prompt embeddings of the cached responses, stacked per llm_string, rebuilt when entries change
+        self._semantic_index: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_key(prompt: str, llm_string: str) -> str:
+        """Gets the cache key of a prompt sent to a model
+
+        Args:
+            prompt (str): prompt
+            llm_string (str): model and parameters
+
+        Returns:
+            str: hex digest of the hash of the model, parameters and prompt
+        """
+        return hashlib.sha256(f'{llm_string}\x00{prompt}'.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        if entry.embedding is not None:
+            self._semantic_index.pop(entry.llm_string, None)
+
+    def _lookup_exact(self, key: str) -> Optional[RETURN_VAL_TYPE]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.return_val
+
+    def _lookup_semantic(self, llm_string: str, embedding: np.ndarray) -> Optional[RETURN_VAL_TYPE]:
+        if llm_string not in self._semantic_index:
+            keys = [
+                key
+                for key, entry in self._entries.items()
+                if entry.llm_string == llm_string and entry.embedding is not None
+            ]
+            matrix = np.stack([self._entries[key].embedding for key in keys]) if keys else None
+            self._semantic_index[llm_string] = (keys, matrix)
+
+        keys, matrix = self._semantic_index[llm_string]
+        if matrix is None:
+            return None
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return self._lookup_exact(keys[best])
+
+    def _record_lookup(
+        self, key: str, llm_string: str, prompt_embedding: Optional[np.ndarray]
+    ) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            return_val = self._lookup_exact(key)
+            if return_val is not None:
+                self.hits += 1
+                return return_val
+            if prompt_embedding is not None:
+                return_val = self._lookup_semantic(llm_string, prompt_embedding)
+                if return_val is not None:
+                    self.semantic_hits += 1
+                    return return_val
+                self._pending_embeddings[key] = prompt_embedding
+                while len(self._pending_embeddings) > self.max_size:
+                    self._pending_embeddings.popitem(last=False)
+            self.misses += 1
+            return None
+
+    def _is_cached(self, key: str) -> bool:
+        with self._lock:
+            return self._lookup_exact(key) is not None
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Looks up the cached response of a prompt, in the exact-match tier then in the semantic tier
+
+        Args:
+            prompt (str): prompt
+            llm_string (str): model and parameters
+
+        Returns:
+            Optional[RETURN_VAL_TYPE]: cached generations, None on a miss
+        """
+        key = self.get_key(prompt, llm_string)
+        prompt_embedding = None
+        if self.embeddings is not None and not self._is_cached(key):
+            prompt_embedding = self._normalize(self.embeddings.embed_query(prompt))
+        return self._record_lookup(key, llm_string, prompt_embedding)
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Looks up the cached response of a prompt asynchronously, in the exact-match tier then in the semantic tier
+
+        Args:
+            prompt (str): prompt
+            llm_string (str): model and parameters
+
+        Returns:
+            Optional[RETURN_VAL_TYPE]: cached generations, None on a miss
+        """
+        key = self.get_key(prompt, llm_string)
+        prompt_embedding = None
+        if self.embeddings is not None and not self._is_cached(key):
+            prompt_embedding = self._normalize(await self.embeddings.aembed_query(prompt))
+        return self._record_lookup(key, llm_string, prompt_embedding)
+
+    def _store(self, key: str, llm_string: str, return_val: RETURN_VAL_TYPE, embedding: Optional[np.ndarray]) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float('inf')
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(llm_string, return_val, expires_at, embedding)
+            if embedding is not None:
+                self._semantic_index.pop(llm_string, None)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _pop_pending_embedding(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            return self._pending_embeddings.pop(key, None)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Caches the response of a prompt
+
+        Args:
+            prompt (str): prompt
+            llm_string (str): model and parameters
+            return_val (RETURN_VAL_TYPE): generations to cache
+        """
+        key = self.get_key(prompt, llm_string)
+        embedding = None
+        if self.embeddings is not None:
+            embedding = self._pop_pending_embedding(key)
+            if embedding is None:
+                embedding = self._normalize(self.embeddings.embed_query(prompt))
+        self._store(key, llm_string, return_val, embedding)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Caches the response of a prompt asynchronously
+
+        Args:
+            prompt (str): prompt
+            llm_string (str): model and parameters
+            return_val (RETURN_VAL_TYPE): generations to cache
+        """
+        key = self.get_key(prompt, llm_string)
+        embedding = None
+        if self.embeddings is not None:
+            embedding = self._pop_pending_embedding(key)
+            if embedding is None:
+                embedding = self._normalize(await self.embeddings.aembed_query(prompt))
+        self._store(key, llm_string, return_val, embedding)
+
+    def clear(self, **kwargs: Any) -> None:
+        """Clears the cache and its counters"""
+        with self._lock:
+            self._entries.clear()
+            self._pending_embeddings.clear()
+            self._semantic_index.clear()
+            self.hits = 0
+            self.semantic_hits = 0
+            self.misses = 0
+
+    async def aclear(self, **kwargs: Any) -> None:
+        """Clears the cache and its counters"""
+        self.clear(**kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Gets the cache counters
+
+        Returns:
+            Dict[str, Any]: number of cached responses, exact hits, semantic hits, misses and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'semantic_hits': self.semantic_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+            }
@@ -1,12 +1,10 @@
 import os
 import sys
 import yaml  # type: ignore
-import torch
 import base64
 import nest_asyncio  # type: ignore
 from typing import Any, List
 from langchain_core.output_parsers import StrOutputParser
-from transformers import AutoModelForSequenceClassification, AutoTokenizer  # type: ignore
 from IPython.display import display, HTML
 from langchain_core.prompts import load_prompt
 from langchain_core.runnables.graph import CurveStyle, MermaidDrawMethod
@@ -23,6 +21,7 @@ sys.path.append(repo_dir)
 
 from utils.model_wrappers.api_gateway import APIGateway
 from utils.logging_utils import log_method # type: ignore
+from utils.rag.reranker import get_reranker_service
 
 
 class BaseComponents:
@@ -169,8 +168,8 @@ class BaseComponents:
         """
         Rerank a list of documents based on their relevance to a given query.
 
-        This method uses a pre-trained reranker model to compute the relevance scores of the documents
-        to the query, and then returns the top-scoring documents.
+        This method uses a pre-trained reranker model, loaded once per process, to compute the relevance scores
+        of the documents to the query, and then returns the top-scoring documents.
 
         Args:
             query: The query string.
@@ -181,36 +180,14 @@ class BaseComponents:
             A list of the top-scoring Lanchgain Documents, in order of their relevance to the query.
         """
 
-        tokenizer = AutoTokenizer.from_pretrained(self.configs['retrieval']['reranker'])
-        reranker = AutoModelForSequenceClassification.from_pretrained(self.configs['retrieval']['reranker'])
-        pairs = []
-        for d in docs:
-            pairs.append([query, d.page_content])
-
-        with torch.no_grad():
-            inputs = tokenizer(
-                pairs,
-                padding=True,
-                truncation=True,
-                return_tensors='pt',
-                max_length=512,
-            )
-            scores = (
-                reranker(**inputs, return_dict=True)
-                .logits.view(
-                    -1,
-                )
-                .float()
-            )
-
-        scores_list = scores.tolist()
-        scores_sorted_idx = sorted(range(len(scores_list)), key=lambda k: scores_list[k], reverse=True)
-
-        docs_sorted: List[Document] = [docs[k] for k in scores_sorted_idx]
-        # docs_sorted = [docs[k] for k in scores_sorted_idx if scores_list[k]>0]
-        docs_sorted = docs_sorted[:final_k]
-
-        return docs_sorted
+        retrieval_configs = self.configs['retrieval']
+        reranker = get_reranker_service(
+            retrieval_configs['reranker'],
+            max_batch_size=retrieval_configs.get('reranker_batch_size', 32),
+            quantize=retrieval_configs.get('reranker_quantize', False),
+            backend=retrieval_configs.get('reranker_backend', 'torch'),
+        )
+        return reranker.rerank(query, docs, final_k)
 
     @log_method
     def llm_generation(self, state: dict) -> dict:
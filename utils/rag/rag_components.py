@@ -10,6 +10,7 @@ from langchain_community.vectorstores import Chroma
 from langchain_core.prompts import load_prompt
 from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 kit_dir = os.path.abspath(os.path.join(current_dir, '..'))
@@ -157,6 +158,13 @@ class RAGComponents(BaseComponents):
         retrieval_grader_prompt: Any = load_prompt(repo_dir + '/' + self.prompts_paths['retrieval_grader_prompt'])
         self.retrieval_grader = retrieval_grader_prompt | self.llm | JsonOutputParser()
 
+        self.multi_retrieval_grader = None
+        if 'multi_retrieval_grader_prompt' in self.prompts_paths:
+            multi_retrieval_grader_prompt: Any = load_prompt(
+                repo_dir + '/' + self.prompts_paths['multi_retrieval_grader_prompt']
+            )
+            self.multi_retrieval_grader = multi_retrieval_grader_prompt | self.llm | JsonOutputParser()
+
     def init_qa_chain(self) -> None:
         """
         Initializes the QA chain by loading the QA prompt and
@@ -612,10 +620,71 @@ class RAGComponents(BaseComponents):
 
         return {'generation': generation, 'answers': answers}
 
+    def _grade_documents_concurrently(self, question: str, documents: List[Document]) -> List[str]:
+        """
+        Grades the relevance of each document to a question with the retrieval grader,
+        running up to grading_max_concurrency gradings at the same time.
+
+        Args:
+            question: The question.
+            documents: The documents to grade.
+
+        Returns:
+            The grade of each document, 'no' for the documents that failed to be graded.
+        """
+
+        max_concurrency: int = self.configs['retrieval'].get('grading_max_concurrency', 8)
+        scores: List[Any] = self.retrieval_grader.batch(
+            [{'question': question, 'document': d.page_content} for d in documents],
+            config={'max_concurrency': max_concurrency},
+            return_exceptions=True,
+        )
+
+        grades: List[str] = []
+        for score in scores:
+            try:
+                if isinstance(score, Exception):
+                    raise score
+                grades.append(str(score['score']))
+            except Exception as e:
+                print(e)
+                grades.append('no')
+        return grades
+
+    def _grade_documents_together(self, question: str, documents: List[Document]) -> Optional[List[str]]:
+        """
+        Grades the relevance of all the documents to a question in a single call to the multi-document retrieval grader.
+
+        Args:
+            question: The question.
+            documents: The documents to grade.
+
+        Returns:
+            The grade of each document, or None if the grader didn't return one grade per document.
+        """
+
+        assert self.multi_retrieval_grader is not None
+        numbered_docs: str = '\n\n'.join(f'Document {i + 1}:\n{d.page_content}' for i, d in enumerate(documents))
+        try:
+            scores: Dict[str, List[str]] = self.multi_retrieval_grader.invoke(
+                {'question': question, 'documents': numbered_docs}
+            )
+            grades: List[str] = [str(score) for score in scores['scores']]
+        except Exception as e:
+            print(e)
+            return None
+
+        if len(grades) != len(documents):
+            print(f'---MULTI-DOCUMENT GRADER RETURNED {len(grades)} GRADES FOR {len(documents)} DOCUMENTS---')
+            return None
+        return grades
+
     @log_method
     def grade_documents(self, state: dict) -> dict:
         """
         Grades a list of documents based on their relevance to a given question.
+        Documents are graded concurrently, or all in a single call when the retrieval grading_mode config
+        is multi_document, falling back to concurrent grading if that call fails.
 
         Args:
             state: A dictionary containing the question and documents to be graded.
@@ -629,15 +698,15 @@ class RAGComponents(BaseComponents):
         question: str = state['question']
         documents: List[Document] = state['documents']
 
-        # Score each doc
-        filtered_docs: List = []
-        for d in documents:
-            try:
-                score: Dict[str, str] = self.retrieval_grader.invoke({'question': question, 'document': d.page_content})
-            except Exception as e:
-                print(e)
-            grade: str = score['score']
+        grading_mode: str = self.configs['retrieval'].get('grading_mode', 'parallel')
+        grades: Optional[List[str]] = None
+        if grading_mode == 'multi_document' and self.multi_retrieval_grader is not None:
+            grades = self._grade_documents_together(question, documents)
+        if grades is None:
+            grades = self._grade_documents_concurrently(question, documents)
 
+        filtered_docs: List = []
+        for d, grade in zip(documents, grades):
             # Document relevant
             if grade.lower() == 'yes':
                 print('---GRADE: DOCUMENT RELEVANT---')
@@ -685,6 +754,65 @@ class RAGComponents(BaseComponents):
 
         return {'subquestions': subquestions_list}
 
+    def _answer_subquestion(self, state: dict, subquestion: str) -> dict:
+        """
+        Answers a subquestion, detecting its entities, retrieving and grading its documents,
+        generating an answer and checking it for hallucinations.
+
+        Args:
+            state: The current graph state.
+            subquestion: The subquestion to answer.
+
+        Returns:
+            A dictionary with the answer, or the failure message if the answer isn't useful,
+            and the graded documents.
+        """
+
+        sub_state: dict = {**state, 'question': subquestion, 'subquestions': [], 'answers': []}
+        sub_state.update(self.detect_entities(sub_state))
+        sub_state.update(self.retrieve_w_filtering(sub_state))
+        sub_state.update(self.grade_documents(sub_state))
+        sub_state.update(self.rag_generate(sub_state))
+
+        answer: str = sub_state['generation']
+        if self.check_hallucinations(sub_state) != 'useful':
+            answer = self.failure_msg(sub_state)['answers']
+
+        return {'answer': answer, 'documents': sub_state['documents']}
+
+    @log_method
+    def answer_subquestions(self, state: dict) -> dict:
+        """
+        Answers all the subquestions concurrently, running up to subquestion_max_concurrency
+        subquestion pipelines at the same time, and joins their answers in the subquestions order.
+
+        Args:
+            state: The input state dict, containing the subquestions.
+
+        Returns:
+            The updated state dict containing the answers and documents of all the subquestions.
+        """
+
+        print('---ANSWERING SUBQUESTIONS---')
+        subquestions: List[str] = [q for q in state['subquestions'] if q.strip()]
+        max_concurrency: int = self.configs['retrieval'].get('subquestion_max_concurrency', 4)
+
+        with ContextThreadPoolExecutor(max_workers=max(min(max_concurrency, len(subquestions)), 1)) as executor:
+            results: List[dict] = list(
+                executor.map(lambda subquestion: self._answer_subquestion(state, subquestion), subquestions)
+            )
+
+        answers: List[str] = [result['answer'] for result in results]
+        documents: List[Document] = [doc for result in results for doc in result['documents']]
+
+        return {
+            'answers': answers,
+            'documents': documents,
+            'generation': answers[-1] if answers else '',
+            'subquestions': [],
+            'rag_counter': state['rag_counter'] + len(subquestions),
+        }
+
     @log_method
     def detect_entities(self, state: dict) -> dict:
         """
@@ -0,0 +1,235 @@
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import torch
+from langchain_core.documents.base import Document
+from transformers import AutoModelForSequenceClassification, AutoTokenizer  # type: ignore
+
+RERANKER_BACKENDS = ['torch', 'onnx']
+
+
+class _RerankRequest(NamedTuple):
+    query: str
+    texts: List[str]
+    future: Future
+
+
+class RerankerService:
+    """
+    Cross-encoder reranker shared by the whole process.
+
+    The model is loaded once, on first use. Rerank requests are put in a queue and scored by a worker thread, which
+    coalesces the requests pending at the same time into the same forward passes, in mini-batches of at most
+    `max_batch_size` query-document pairs. Pairs are sorted by length before batching to reduce padding.
+
+    Args:
+        model_name: Hugging Face name or local path of the reranker model.
+        max_batch_size: Max number of query-document pairs per forward pass.
+        max_length: Max number of tokens of a query-document pair, longer pairs are truncated.
+        quantize: Whether to apply dynamic int8 quantization to the linear layers, for faster CPU inference.
+            Only used by the torch backend.
+        backend: One of `RERANKER_BACKENDS`. "onnx" exports the model to ONNX and runs it with onnxruntime,
+            which requires `optimum[onnxruntime]`.
+        max_coalesced_pairs: Max number of query-document pairs the worker coalesces before scoring them.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_batch_size: int = 32,
+        max_length: int = 512,
+        quantize: bool = False,
+        backend: str = 'torch',
+        max_coalesced_pairs: int = 256,
+    ) -> None:
+        if backend not in RERANKER_BACKENDS:
+            raise ValueError(f'backend must be one of {RERANKER_BACKENDS}, got {backend}')
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_length = max_length
+        self.quantize = quantize
+        self.backend = backend
+        self.max_coalesced_pairs = max_coalesced_pairs
+
+        self.tokenizer: Optional[Any] = None
+        self.model: Optional[Any] = None
+        self._load_lock = threading.Lock()
+        self._requests: queue.Queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    def load(self) -> None:
+        """
+        Loads the tokenizer and the model, if not loaded yet.
+        """
+
+        if self.model is not None:
+            return
+        with self._load_lock:
+            if self.model is not None:
+                return
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            if self.backend == 'onnx':
+                try:
+                    from optimum.onnxruntime import ORTModelForSequenceClassification
+                except ImportError:
+                    raise ImportError(
+                        'could not import optimum onnxruntime library, '
+                        'Please install it with `pip install optimum[onnxruntime]`.'
+                    )
+                model = ORTModelForSequenceClassification.from_pretrained(self.model_name, export=True)
+            else:
+                model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+                model.eval()
+                if self.quantize:
+                    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            self.tokenizer = tokenizer
+            self.model = model
+
+    def score_pairs(self, pairs: List[List[str]]) -> List[float]:
+        """
+        Scores query-document pairs, in mini-batches of at most `max_batch_size` pairs.
+
+        Args:
+            pairs: A list of [query, document] pairs.
+
+        Returns:
+            The relevance score of each pair.
+        """
+
+        self.load()
+        assert self.tokenizer is not None and self.model is not None
+        order = sorted(range(len(pairs)), key=lambda idx: len(pairs[idx][0]) + len(pairs[idx][1]))
+        scores = [0.0] * len(pairs)
+
+        with torch.inference_mode():
+            for start in range(0, len(order), self.max_batch_size):
+                batch_idx = order[start : start + self.max_batch_size]
+                inputs = self.tokenizer(
+                    [pairs[idx] for idx in batch_idx],
+                    padding=True,
+                    truncation=True,
+                    return_tensors='pt',
+                    max_length=self.max_length,
+                )
+                batch_scores = self.model(**inputs, return_dict=True).logits.view(-1).float().tolist()
+                for idx, score in zip(batch_idx, batch_scores):
+                    scores[idx] = score
+
+        return scores
+
+    def _run_worker(self) -> None:
+        """
+        Scores the queued requests, coalescing the ones pending at the same time.
+        """
+
+        while True:
+            requests = [self._requests.get()]
+            num_pairs = len(requests[0].texts)
+            while num_pairs < self.max_coalesced_pairs:
+                try:
+                    request = self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                requests.append(request)
+                num_pairs += len(request.texts)
+
+            pairs = [[request.query, text] for request in requests for text in request.texts]
+            try:
+                scores = self.score_pairs(pairs)
+            except Exception as e:
+                for request in requests:
+                    request.future.set_exception(e)
+                continue
+
+            start = 0
+            for request in requests:
+                request.future.set_result(scores[start : start + len(request.texts)])
+                start += len(request.texts)
+
+    def _ensure_worker(self) -> None:
+        """
+        Starts the worker thread, if not started yet.
+        """
+
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run_worker, name='reranker-worker', daemon=True)
+                self._worker.start()
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """
+        Scores the relevance of texts to a query. Safe to call from concurrent threads, whose requests are
+        scored together.
+
+        Args:
+            query: The query string.
+            texts: The texts to score.
+
+        Returns:
+            The relevance score of each text.
+        """
+
+        if not texts:
+            return []
+        self._ensure_worker()
+        future: Future = Future()
+        self._requests.put(_RerankRequest(query, list(texts), future))
+        return future.result()
+
+    def rerank(self, query: str, docs: List[Document], final_k: int) -> List[Document]:
+        """
+        Rerank a list of documents based on their relevance to a given query.
+
+        Args:
+            query: The query string.
+            docs: A list of Langchain document objects, each containing a page_content attribute.
+            final_k: The number of top-scoring documents to return.
+
+        Returns:
+            A list of the top-scoring Langchain Documents, in order of their relevance to the query.
+        """
+
+        scores_list = self.score(query, [doc.page_content for doc in docs])
+        scores_sorted_idx = sorted(range(len(scores_list)), key=lambda k: scores_list[k], reverse=True)
+        return [docs[k] for k in scores_sorted_idx][:final_k]
+
+
+_reranker_services: Dict[Tuple, RerankerService] = {}
+_reranker_services_lock = threading.Lock()
+
+
+def get_reranker_service(
+    model_name: str,
+    max_batch_size: int = 32,
+    max_length: int = 512,
+    quantize: bool = False,
+    backend: str = 'torch',
+) -> RerankerService:
+    """
+    Gets the reranker service of a model, created once per process and configuration.
+
+    Args:
+        model_name: Hugging Face name or local path of the reranker model.
+        max_batch_size: Max number of query-document pairs per forward pass.
+        max_length: Max number of tokens of a query-document pair, longer pairs are truncated.
+        quantize: Whether to apply dynamic int8 quantization, for faster CPU inference.
+        backend: One of `RERANKER_BACKENDS`.
+
+    Returns:
+        The reranker service.
+    """
+
+    key = (model_name, max_batch_size, max_length, quantize, backend)
+    with _reranker_services_lock:
+        if key not in _reranker_services:
+            _reranker_services[key] = RerankerService(
+                model_name,
+                max_batch_size=max_batch_size,
+                max_length=max_length,
+                quantize=quantize,
+                backend=backend,
+            )
+        return _reranker_services[key]
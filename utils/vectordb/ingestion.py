@@ -0,0 +1,593 @@
+"""Streaming ingestion of documents into a vector store, with bounded queues between the pipeline stages."""
+
+import abc
+import logging
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set
+
+from langchain_community.vectorstores import FAISS, Chroma, Qdrant
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from utils.vectordb.manifest import IngestionManifest, IngestionPlan, get_source_mtime
+from utils.vectordb.mmap_store import COMPACT_FRACTION, MmapVectorStore, delete_store_files
+from utils.vectordb.qdrant_utils import (
+    QDRANT_INDEXED_METADATA_KEYS,
+    QDRANT_UPSERT_BATCH_SIZE,
+    QDRANT_UPSERT_PARALLEL,
+    create_payload_indexes,
+    get_qdrant_client,
+)
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the items of a stage queue
+_DONE = object()
+
+# Seconds between checks of the stop event while waiting on a stage queue
+_QUEUE_POLL_INTERVAL = 0.1
+
+
+# Loader and splitter of a worker process, set once by its initializer instead of being pickled with each task
+_worker_load: Optional[Callable[[str], List[Document]]] = None
+_worker_split: Optional[Callable[[List[Document]], List[Document]]] = None
+
+
+def _init_worker(
+    load: Callable[[str], List[Document]], split: Optional[Callable[[List[Document]], List[Document]]]
+) -> None:
+    global _worker_load, _worker_split
+    _worker_load = load
+    _worker_split = split
+
+
+def _load_and_split_in_worker(source: str) -> List[Document]:
+    assert _worker_load is not None
+    documents = _worker_load(source)
+    return _worker_split(documents) if _worker_split is not None else documents
+
+
+def load_sources(
+    sources: Iterable[str],
+    load: Callable[[str], List[Document]],
+    split: Optional[Callable[[List[Document]], List[Document]]] = None,
+    num_workers: int = 1,
+) -> Iterator[List[Document]]:
+    """Loads and splits sources, in a pool of worker processes if num_workers is more than 1. The chunks of each
+    source are yielded in the order of the sources, whatever the order the workers finish in. At most
+    2 * num_workers sources are in flight, so memory stays bounded.
+
+    Args:
+        sources (Iterable[str]): sources to load, e.g. file paths or urls
+        load (Callable[[str], List[Document]]): loads the documents of a source, picklable if num_workers > 1
+        split (Optional[Callable[[List[Document]], List[Document]]], optional): splits documents into chunks,
+            picklable if num_workers > 1, None to yield the documents. Defaults to None.
+        num_workers (int, optional): number of worker processes. Defaults to 1.
+
+    Yields:
+        List[Document]: chunks of each source
+    """
+    if num_workers <= 1:
+        for source in sources:
+            documents = load(source)
+            yield split(documents) if split is not None else documents
+        return
+
+    executor = ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=(load, split))
+    futures: deque = deque()
+    try:
+        for source in sources:
+            futures.append(executor.submit(_load_and_split_in_worker, source))
+            if len(futures) >= 2 * num_workers:
+                future: Future = futures.popleft()
+                yield future.result()
+        while futures:
+            yield futures.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class _WriteBatch(NamedTuple):
+    ids_to_delete: List[str]
+    chunks: List[Document]
+    ids: List[str]
+    vectors: List[List[float]]
+    plans: List[IngestionPlan]
+
+
+def merge_plans(plans: List[IngestionPlan]) -> IngestionPlan:
+    """Merges ingestion plans of distinct sources into one
+
+    Args:
+        plans (List[IngestionPlan]): plans to merge
+
+    Returns:
+        IngestionPlan: merged plan
+    """
+    return IngestionPlan(
+        [chunk for plan in plans for chunk in plan.chunks_to_add],
+        [chunk_id for plan in plans for chunk_id in plan.ids_to_add],
+        [chunk_id for plan in plans for chunk_id in plan.ids_to_delete],
+        {source: record for plan in plans for source, record in plan.sources.items()},
+        [source for plan in plans for source in plan.removed_sources],
+    )
+
+
+class VectorStoreWriter(abc.ABC):
+    """Writes pre-computed embeddings to a persisted vector store, upserting by chunk ID
+
+    Args:
+        db_path (str): path of the persisted vector db
+        embeddings (Embeddings): embedding model of the vector store, used at query time
+        rebuild (bool): whether to drop the existing vectors
+    """
+
+    # Whether the vectors are persisted as soon as they are written, otherwise only on close
+    persists_incrementally = True
+
+    def __init__(self, db_path: str, embeddings: Embeddings, rebuild: bool) -> None:
+        self.db_path = db_path
+        self.embeddings = embeddings
+        self.rebuild = rebuild
+
+    @abc.abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        """Deletes the vectors of chunks"""
+
+    @abc.abstractmethod
+    def add(self, chunks: List[Document], vectors: List[List[float]], ids: List[str]) -> None:
+        """Adds or replaces the vectors of chunks"""
+
+    @abc.abstractmethod
+    def close(self) -> Any:
+        """Persists the vector store and returns it"""
+
+
+class FaissWriter(VectorStoreWriter):
+    """Writes to a FAISS index, kept in memory and saved on close"""
+
+    persists_incrementally = False
+
+    def __init__(self, db_path: str, embeddings: Embeddings, rebuild: bool) -> None:
+        super().__init__(db_path, embeddings, rebuild)
+        self.vector_store: Optional[FAISS] = None
+        self._stored_ids: Set[str] = set()
+        if not rebuild:
+            self.vector_store = FAISS.load_local(db_path, embeddings, allow_dangerous_deserialization=True)
+            self._stored_ids = set(self.vector_store.index_to_docstore_id.values())
+
+    def delete(self, ids: List[str]) -> None:
+        ids = [chunk_id for chunk_id in dict.fromkeys(ids) if chunk_id in self._stored_ids]
+        if self.vector_store is not None and ids:
+            self.vector_store.delete(ids)
+            self._stored_ids.difference_update(ids)
+
+    def add(self, chunks: List[Document], vectors: List[List[float]], ids: List[str]) -> None:
+        # Chunks already in the index, e.g. after an interrupted sync, are replaced
+        self.delete(ids)
+        text_embeddings = list(zip([chunk.page_content for chunk in chunks], vectors))
+        metadatas = [chunk.metadata for chunk in chunks]
+        if self.vector_store is None:
+            self.vector_store = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=ids)
+        else:
+            self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+        self._stored_ids.update(ids)
+
+    def close(self) -> FAISS:
+        if self.vector_store is None:
+            raise ValueError(f'No chunks to create the vector db at {self.db_path}')
+        self.vector_store.save_local(self.db_path)
+        return self.vector_store
+
+
+class ChromaWriter(VectorStoreWriter):
+    """Writes to a persisted Chroma collection"""
+
+    def __init__(self, db_path: str, embeddings: Embeddings, rebuild: bool, collection_name: str) -> None:
+        super().__init__(db_path, embeddings, rebuild)
+        self.collection_name = collection_name
+        self.vector_store = Chroma(
+            persist_directory=db_path, embedding_function=embeddings, collection_name=collection_name
+        )
+        if rebuild:
+            self.vector_store.delete_collection()
+            self.vector_store = Chroma(
+                persist_directory=db_path, embedding_function=embeddings, collection_name=collection_name
+            )
+
+    def delete(self, ids: List[str]) -> None:
+        if ids:
+            self.vector_store.delete(ids=ids)
+
+    def add(self, chunks: List[Document], vectors: List[List[float]], ids: List[str]) -> None:
+        # Chroma rejects empty metadata, so chunks without metadata are upserted separately
+        with_metadata = [idx for idx, chunk in enumerate(chunks) if chunk.metadata]
+        without_metadata = [idx for idx, chunk in enumerate(chunks) if not chunk.metadata]
+        if with_metadata:
+            self.vector_store._collection.upsert(
+                ids=[ids[idx] for idx in with_metadata],
+                embeddings=[vectors[idx] for idx in with_metadata],
+                metadatas=[chunks[idx].metadata for idx in with_metadata],
+                documents=[chunks[idx].page_content for idx in with_metadata],
+            )
+        if without_metadata:
+            self.vector_store._collection.upsert(
+                ids=[ids[idx] for idx in without_metadata],
+                embeddings=[vectors[idx] for idx in without_metadata],
+                documents=[chunks[idx].page_content for idx in without_metadata],
+            )
+
+    def close(self) -> Chroma:
+        return self.vector_store
+
+
+class QdrantWriter(VectorStoreWriter):
+    """Writes to a Qdrant collection, created on the first write, in batched parallel upserts. Only the last upsert of
+    each write waits for its points to be applied. On a Qdrant server, the metadata keys the retrieval filters on
+    get payload indexes.
+
+    Args:
+        db_path (Optional[str]): directory of a local Qdrant, in memory if None
+        embeddings (Embeddings): embedding model of the vector store, used at query time
+        rebuild (bool): whether to drop the existing collection
+        collection_name (str): collection name
+        url (Optional[str], optional): url of a Qdrant server, used instead of db_path if set. Defaults to None.
+        indexed_metadata_keys (Sequence[str], optional): metadata keys to index on a Qdrant server.
+            Defaults to QDRANT_INDEXED_METADATA_KEYS.
+        upsert_batch_size (int, optional): number of points per upsert request. Defaults to QDRANT_UPSERT_BATCH_SIZE.
+        upsert_parallel (int, optional): number of upsert requests sent in parallel to a Qdrant server.
+            Defaults to QDRANT_UPSERT_PARALLEL.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str],
+        embeddings: Embeddings,
+        rebuild: bool,
+        collection_name: str,
+        url: Optional[str] = None,
+        indexed_metadata_keys: Sequence[str] = QDRANT_INDEXED_METADATA_KEYS,
+        upsert_batch_size: int = QDRANT_UPSERT_BATCH_SIZE,
+        upsert_parallel: int = QDRANT_UPSERT_PARALLEL,
+    ) -> None:
+        super().__init__(db_path, embeddings, rebuild)
+        self.collection_name = collection_name
+        self.url = url
+        self.indexed_metadata_keys = indexed_metadata_keys
+        self.upsert_batch_size = upsert_batch_size
+        self.upsert_parallel = upsert_parallel
+        self.client = get_qdrant_client(path=db_path, url=url)
+        self._collection_exists = self.client.collection_exists(collection_name)
+        if rebuild and self._collection_exists:
+            self.client.delete_collection(collection_name)
+            self._collection_exists = False
+        if self._collection_exists:
+            self._create_payload_indexes()
+
+    def _create_payload_indexes(self) -> None:
+        # A local Qdrant ignores payload indexes
+        if self.url is not None:
+            create_payload_indexes(self.client, self.collection_name, self.indexed_metadata_keys)
+
+    def delete(self, ids: List[str]) -> None:
+        from qdrant_client.http import models as rest
+
+        if ids and self._collection_exists:
+            self.client.delete(self.collection_name, points_selector=rest.PointIdsList(points=ids))
+
+    def add(self, chunks: List[Document], vectors: List[List[float]], ids: List[str]) -> None:
+        from qdrant_client.http import models as rest
+
+        if not self._collection_exists:
+            self.client.create_collection(
+                self.collection_name,
+                vectors_config=rest.VectorParams(size=len(vectors[0]), distance=rest.Distance.COSINE),
+            )
+            self._collection_exists = True
+            # Indexing before the points are added spares re-indexing them
+            self._create_payload_indexes()
+        points = [
+            rest.PointStruct(
+                id=chunk_id,
+                vector=vector,
+                payload={Qdrant.CONTENT_KEY: chunk.page_content, Qdrant.METADATA_KEY: chunk.metadata},
+            )
+            for chunk, vector, chunk_id in zip(chunks, vectors, ids)
+        ]
+        last_batch_start = (len(points) - 1) // self.upsert_batch_size * self.upsert_batch_size
+        if last_batch_start > 0:
+            # Acknowledged once written to the write-ahead log, before being applied
+            self.client.upload_points(
+                self.collection_name,
+                points=points[:last_batch_start],
+                batch_size=self.upsert_batch_size,
+                parallel=self.upsert_parallel,
+                wait=False,
+            )
+        # The updates of a collection are applied in the order of the log, so once the last batch is applied the
+        # points are all searchable, before the manifest records them or the vector store is returned
+        self.client.upsert(self.collection_name, points=points[last_batch_start:], wait=True)
+
+    def close(self) -> Qdrant:
+        if not self._collection_exists:
+            raise ValueError(f'No chunks to create the vector db at {self.db_path or self.url}')
+        return Qdrant(client=self.client, collection_name=self.collection_name, embeddings=self.embeddings)
+
+
+class MmapWriter(VectorStoreWriter):
+    """Writes to a memory-mapped vector store, compacting it and building or refreshing its approximate index on
+    close"""
+
+    def __init__(
+        self,
+        db_path: str,
+        embeddings: Embeddings,
+        rebuild: bool,
+        dtype: str = 'float16',
+        index_type: Optional[str] = None,
+    ) -> None:
+        super().__init__(db_path, embeddings, rebuild)
+        if rebuild:
+            delete_store_files(db_path)
+        self.index_type = index_type
+        self.vector_store = MmapVectorStore(db_path, embeddings, dtype=dtype)
+
+    def delete(self, ids: List[str]) -> None:
+        self.vector_store.delete(ids)
+
+    def add(self, chunks: List[Document], vectors: List[List[float]], ids: List[str]) -> None:
+        self.vector_store.add_embeddings(
+            zip([chunk.page_content for chunk in chunks], vectors),
+            metadatas=[chunk.metadata for chunk in chunks],
+            ids=ids,
+        )
+
+    def close(self) -> MmapVectorStore:
+        if self.vector_store.deleted_fraction() > COMPACT_FRACTION:
+            self.vector_store.compact()
+        if self.index_type is not None and self.vector_store.config['index_type'] != self.index_type:
+            self.vector_store.build_index(self.index_type)
+        else:
+            self.vector_store.refresh_index()
+        return self.vector_store
+
+
+class IngestionPipeline:
+    """Streams documents into a vector store in overlapping stages, each running in its own thread:
+    load and split -> diff against the manifest -> embed in batches -> write to the vector store.
+
+    The stages are connected by queues of at most `queue_size` items, so memory stays bounded whatever the size of
+    the corpus: a slow stage makes the previous ones wait instead of buffering. Only the chunks missing from the
+    manifest are embedded.
+
+    Args:
+        writer (VectorStoreWriter): writer of the vector store
+        embeddings (Embeddings): embedding model
+        manifest (IngestionManifest): manifest of the vector store
+        batch_size (int, optional): number of chunks embedded and written at once. Defaults to 32.
+        queue_size (int, optional): max number of items waiting between two stages. Defaults to 8.
+        full_sync (bool, optional): whether the documents are the whole corpus, so the vectors of the sources
+            missing from them are deleted. Defaults to True.
+        chunking_config (Optional[str], optional): identifier of the splitter configuration. When it matches the
+            one of the previous ingestion, sources whose modification time didn't change are skipped without
+            loading them. Defaults to None.
+        num_workers (int, optional): number of worker processes loading and splitting the sources, see
+            load_sources. Defaults to 1.
+    """
+
+    def __init__(
+        self,
+        writer: VectorStoreWriter,
+        embeddings: Embeddings,
+        manifest: IngestionManifest,
+        batch_size: int = 32,
+        queue_size: int = 8,
+        full_sync: bool = True,
+        chunking_config: Optional[str] = None,
+        num_workers: int = 1,
+    ) -> None:
+        self.writer = writer
+        self.embeddings = embeddings
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.full_sync = full_sync
+        self.chunking_config = chunking_config
+        self.num_workers = num_workers
+        self._skip_unchanged = chunking_config is not None and manifest.get_meta('chunking_config') == chunking_config
+
+        self._seen_sources: Set[str] = set()
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self.num_chunks = 0
+        self.num_embedded = 0
+        self.num_skipped_sources = 0
+
+    def is_unchanged(self, source: str) -> bool:
+        """Checks whether a source can be skipped without loading it: it was ingested with the same chunking
+        configuration, and its modification time didn't change since.
+
+        Args:
+            source (str): source path
+
+        Returns:
+            bool: whether the source is unchanged
+        """
+        if not self._skip_unchanged:
+            return False
+        mtime = get_source_mtime(source)
+        record = self.manifest.get_sources([source]).get(source)
+        if mtime is None or record is None or record.mtime != mtime:
+            return False
+        self._seen_sources.add(source)
+        self.num_skipped_sources += 1
+        return True
+
+    def _put(self, output: queue.Queue, item: Any) -> bool:
+        """Puts an item in a stage queue, waiting for room unless the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                output.put(item, timeout=_QUEUE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(self, input: queue.Queue) -> Iterator[Any]:
+        """Yields the items of a stage queue until the previous stage is done or the pipeline is stopped"""
+        while True:
+            try:
+                item = input.get(timeout=_QUEUE_POLL_INTERVAL)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if item is _DONE:
+                return
+            yield item
+
+    def _start_stage(self, name: str, items: Iterable[Any], output: queue.Queue) -> threading.Thread:
+        """Starts a thread putting the items of a stage in its output queue"""
+
+        def run_stage() -> None:
+            try:
+                for item in items:
+                    if not self._put(output, item):
+                        return
+            except BaseException as e:
+                self._errors.append(e)
+                self._stop.set()
+            finally:
+                self._put(output, _DONE)
+
+        thread = threading.Thread(target=run_stage, name=f'ingestion-{name}', daemon=True)
+        thread.start()
+        return thread
+
+    def _plan(self, chunk_groups: Iterable[List[Document]]) -> Iterator[IngestionPlan]:
+        """Diffs the chunks of each source against the manifest"""
+        for chunks in chunk_groups:
+            plan = self.manifest.plan(chunks)
+            self._seen_sources.update(plan.sources)
+            self.num_chunks += len(chunks)
+            yield plan
+
+    def _embed(self, plans: Iterable[IngestionPlan]) -> Iterator[_WriteBatch]:
+        """Embeds the chunks to add in batches, each carrying the plans it completes"""
+        chunks: List[Document] = []
+        ids: List[str] = []
+        ids_to_delete: List[str] = []
+        # Plans not written yet, with their number of chunks not embedded yet
+        pending: List[List[Any]] = []
+
+        def flush(size: int) -> _WriteBatch:
+            nonlocal chunks, ids, ids_to_delete
+            batch_chunks, chunks = chunks[:size], chunks[size:]
+            batch_ids, ids = ids[:size], ids[size:]
+            vectors = self.embeddings.embed_documents([chunk.page_content for chunk in batch_chunks]) if size else []
+            self.num_embedded += size
+            remaining = size
+            completed = []
+            while pending and pending[0][1] <= remaining:
+                plan, num_chunks = pending.pop(0)
+                remaining -= num_chunks
+                # Only the source records are needed to commit the plan, the chunks can be released
+                completed.append(plan._replace(chunks_to_add=[], ids_to_add=[]))
+            if pending:
+                pending[0][1] -= remaining
+            batch = _WriteBatch(ids_to_delete, batch_chunks, batch_ids, vectors, completed)
+            ids_to_delete = []
+            return batch
+
+        for plan in plans:
+            chunks.extend(plan.chunks_to_add)
+            ids.extend(plan.ids_to_add)
+            ids_to_delete.extend(plan.ids_to_delete)
+            pending.append([plan, len(plan.chunks_to_add)])
+            while len(chunks) >= self.batch_size:
+                yield flush(self.batch_size)
+            if not chunks and pending:
+                # Plans without chunks to embed, e.g. unchanged sources, are committed right away
+                yield flush(0)
+        if pending or ids_to_delete:
+            yield flush(len(chunks))
+
+    def run(
+        self,
+        sources: Iterable[str],
+        load: Callable[[str], List[Document]],
+        split: Optional[Callable[[List[Document]], List[Document]]] = None,
+    ) -> Any:
+        """Runs the pipeline
+
+        Args:
+            sources (Iterable[str]): sources to ingest, e.g. file paths or urls
+            load (Callable[[str], List[Document]]): loads the documents of a source
+            split (Optional[Callable[[List[Document]], List[Document]]], optional): splits documents into chunks,
+                None if the loaded documents are chunks already. Defaults to None.
+
+        Returns:
+            vector store
+        """
+        chunks_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        plans_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        batches_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            self._start_stage(
+                'load',
+                load_sources(
+                    (source for source in sources if not self.is_unchanged(source)), load, split, self.num_workers
+                ),
+                chunks_queue,
+            ),
+            self._start_stage('plan', self._plan(self._drain(chunks_queue)), plans_queue),
+            self._start_stage('embed', self._embed(self._drain(plans_queue)), batches_queue),
+        ]
+
+        # Plans are only committed once their vectors are persisted, so an interrupted ingestion is redone
+        uncommitted: List[IngestionPlan] = []
+        try:
+            for batch in self._drain(batches_queue):
+                self.writer.delete(batch.ids_to_delete)
+                if batch.chunks:
+                    self.writer.add(batch.chunks, batch.vectors, batch.ids)
+                uncommitted.extend(batch.plans)
+                if self.writer.persists_incrementally and uncommitted:
+                    self.manifest.commit(merge_plans(uncommitted))
+                    uncommitted = []
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+        if self.full_sync:
+            removal = self.manifest.plan_removal(self._seen_sources)
+            self.writer.delete(removal.ids_to_delete)
+            uncommitted.append(removal)
+        vector_store = self.writer.close()
+        self.manifest.commit(merge_plans(uncommitted))
+        if self.chunking_config is not None:
+            self.manifest.set_meta('chunking_config', self.chunking_config)
+
+        logger.info(
+            f'Ingestion: {self.num_chunks} chunks, {self.num_embedded} embedded, '
+            f'{self.num_skipped_sources} unchanged sources skipped'
+        )
+
+        return vector_store
+
+
+def get_chunking_config(chunk_size: int, chunk_overlap: int, tokenizer: Any = None) -> str:
+    """Gets an identifier of a splitter configuration, stored in the manifest"""
+    if tokenizer is None:
+        return f'characters/{chunk_size}/{chunk_overlap}'
+    tokenizer_name = getattr(tokenizer, 'name_or_path', type(tokenizer).__name__)
+    return f'tokens/{tokenizer_name}/{chunk_size}/{chunk_overlap}'
+
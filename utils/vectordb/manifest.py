@@ -0,0 +1,275 @@
+"""Manifest of the documents ingested into a vector store, used to ingest a corpus incrementally."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from langchain_core.documents import Document
+
+MANIFEST_FILE_NAME = 'ingestion_manifest.sqlite'
+
+# Namespace of the chunk IDs, so the same chunk always gets the same ID
+CHUNK_ID_NAMESPACE = uuid.UUID('6f1c6f5e-2b0e-4d4e-9a51-3f0c1a6c9d27')
+
+# SQLite limits the number of parameters of a query, so IDs are written in chunks
+WRITE_CHUNK_SIZE = 500
+
+
+class SourceRecord(NamedTuple):
+    mtime: Optional[float]
+    content_hash: str
+    chunk_ids: List[str]
+
+
+class IngestionPlan(NamedTuple):
+    """Changes to apply to a vector store to make it match a set of chunks
+
+    Attributes:
+        chunks_to_add (List[Document]): new or changed chunks, the only ones to embed
+        ids_to_add (List[str]): IDs of the chunks to add
+        ids_to_delete (List[str]): IDs of the chunks that were changed or removed
+        sources (Dict[str, SourceRecord]): records of the ingested sources
+        removed_sources (List[str]): sources to remove from the manifest
+    """
+
+    chunks_to_add: List[Document]
+    ids_to_add: List[str]
+    ids_to_delete: List[str]
+    sources: Dict[str, SourceRecord]
+    removed_sources: List[str]
+
+
+def get_chunk_hash(chunk: Document) -> str:
+    """Gets the hash of the content and metadata of a chunk
+
+    Args:
+        chunk (Document): chunk
+
+    Returns:
+        str: hex digest of the hash
+    """
+    metadata = json.dumps(chunk.metadata, sort_keys=True, default=str)
+    return hashlib.sha256(f'{chunk.page_content}\x00{metadata}'.encode('utf-8')).hexdigest()
+
+
+def get_chunk_ids(chunks: List[Document]) -> List[str]:
+    """Gets stable IDs of chunks, derived from their source, content and metadata. A chunk keeps its ID when the
+    chunks around it change, and identical chunks of a source get distinct IDs.
+
+    The IDs are UUIDs, valid in FAISS, Chroma and Qdrant.
+
+    Args:
+        chunks (List[Document]): chunks
+
+    Returns:
+        List[str]: ID of each chunk
+    """
+    occurrences: Dict[str, int] = {}
+    ids = []
+    for chunk in chunks:
+        name = f'{chunk.metadata.get("source", "")}\x00{get_chunk_hash(chunk)}'
+        occurrence = occurrences.get(name, 0)
+        occurrences[name] = occurrence + 1
+        ids.append(str(uuid.uuid5(CHUNK_ID_NAMESPACE, f'{name}\x00{occurrence}')))
+    return ids
+
+
+def get_source_mtime(source: str) -> Optional[float]:
+    """Gets the modification time of a source, None if it isn't a local file"""
+    try:
+        return os.path.getmtime(source)
+    except (OSError, TypeError):
+        return None
+
+
+class IngestionManifest:
+    """SQLite manifest of the sources ingested into a vector store: path, modification time, content hash and chunk
+    IDs of each source. It is diffed against the chunks of a corpus to only embed the new or changed chunks and
+    delete the vectors of the removed ones.
+
+    Args:
+        path (str): path of the SQLite database file, created if it doesn't exist
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, mtime REAL, content_hash TEXT)'
+            )
+            self._connection.execute('CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, source TEXT)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._connection.commit()
+
+    @classmethod
+    def from_db_path(cls, db_path: str) -> 'IngestionManifest':
+        """Opens the manifest stored in a vector db directory
+
+        Args:
+            db_path (str): vector db directory
+
+        Returns:
+            IngestionManifest: manifest of the vector db
+        """
+        return cls(os.path.join(db_path, MANIFEST_FILE_NAME))
+
+    def is_empty(self) -> bool:
+        """Whether no source was ingested yet"""
+        with self._lock:
+            return self._connection.execute('SELECT 1 FROM sources LIMIT 1').fetchone() is None
+
+    def clear(self) -> None:
+        """Removes all the sources and metadata from the manifest"""
+        with self._lock:
+            self._connection.execute('DELETE FROM sources')
+            self._connection.execute('DELETE FROM chunks')
+            self._connection.execute('DELETE FROM meta')
+            self._connection.commit()
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Gets a metadata value of the vector store, e.g. its collection name"""
+        with self._lock:
+            row = self._connection.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        """Sets a metadata value of the vector store"""
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+            self._connection.commit()
+
+    def get_sources(self, sources: Optional[List[str]] = None) -> Dict[str, SourceRecord]:
+        """Gets the records of ingested sources
+
+        Args:
+            sources (Optional[List[str]], optional): sources to get the records of, all if None. Defaults to None.
+
+        Returns:
+            Dict[str, SourceRecord]: record of each ingested source
+        """
+        if sources is None:
+            source_query, chunk_query, batches = (
+                'SELECT source, mtime, content_hash FROM sources',
+                'SELECT chunk_id, source FROM chunks',
+                [[]],
+            )
+        else:
+            source_query, chunk_query = (
+                'SELECT source, mtime, content_hash FROM sources WHERE source IN ({})',
+                'SELECT chunk_id, source FROM chunks WHERE source IN ({})',
+            )
+            batches = [sources[i : i + WRITE_CHUNK_SIZE] for i in range(0, len(sources), WRITE_CHUNK_SIZE)]
+
+        records: Dict[str, SourceRecord] = {}
+        with self._lock:
+            for batch in batches:
+                placeholders = ','.join('?' * len(batch))
+                for source, mtime, content_hash in self._connection.execute(
+                    source_query.format(placeholders), batch
+                ):
+                    records[source] = SourceRecord(mtime, content_hash, [])
+                for chunk_id, source in self._connection.execute(chunk_query.format(placeholders), batch):
+                    if source in records:
+                        records[source].chunk_ids.append(chunk_id)
+        return records
+
+    def plan(self, chunks: List[Document], delete_missing_sources: bool = False) -> IngestionPlan:
+        """Diffs chunks against the manifest
+
+        Args:
+            chunks (List[Document]): chunks of the sources to ingest, all the chunks of a source at once
+            delete_missing_sources (bool, optional): whether the chunks are the whole corpus, so the sources
+                missing from them were removed. Defaults to False.
+
+        Returns:
+            IngestionPlan: chunks to embed and add, and chunk IDs to delete
+        """
+        ids = get_chunk_ids(chunks)
+        chunks_by_source: Dict[str, List[int]] = {}
+        for idx, chunk in enumerate(chunks):
+            chunks_by_source.setdefault(chunk.metadata.get('source', ''), []).append(idx)
+
+        previous = self.get_sources(list(chunks_by_source))
+        chunks_to_add: List[Document] = []
+        ids_to_add: List[str] = []
+        ids_to_delete: List[str] = []
+        sources: Dict[str, SourceRecord] = {}
+        for source, indices in chunks_by_source.items():
+            source_ids = [ids[idx] for idx in indices]
+            content_hash = hashlib.sha256('\x00'.join(source_ids).encode('utf-8')).hexdigest()
+            sources[source] = SourceRecord(get_source_mtime(source), content_hash, source_ids)
+
+            record = previous.get(source)
+            if record is not None and record.content_hash == content_hash:
+                continue
+            previous_ids: Set[str] = set(record.chunk_ids) if record is not None else set()
+            current_ids = set(source_ids)
+            ids_to_delete.extend(previous_ids - current_ids)
+            for idx, chunk_id in zip(indices, source_ids):
+                if chunk_id not in previous_ids:
+                    chunks_to_add.append(chunks[idx])
+                    ids_to_add.append(chunk_id)
+
+        plan = IngestionPlan(chunks_to_add, ids_to_add, ids_to_delete, sources, [])
+        if delete_missing_sources:
+            removal = self.plan_removal(set(sources))
+            plan = plan._replace(
+                ids_to_delete=ids_to_delete + removal.ids_to_delete, removed_sources=removal.removed_sources
+            )
+        return plan
+
+    def plan_removal(self, kept_sources: Set[str]) -> IngestionPlan:
+        """Plans the removal of the ingested sources that are no longer in the corpus
+
+        Args:
+            kept_sources (Set[str]): sources of the corpus
+
+        Returns:
+            IngestionPlan: chunk IDs to delete and sources to remove from the manifest
+        """
+        with self._lock:
+            removed_sources = [
+                source
+                for (source,) in self._connection.execute('SELECT source FROM sources')
+                if source not in kept_sources
+            ]
+        ids_to_delete = [
+            chunk_id for record in self.get_sources(removed_sources).values() for chunk_id in record.chunk_ids
+        ]
+        return IngestionPlan([], [], ids_to_delete, {}, removed_sources)
+
+    def commit(self, plan: IngestionPlan) -> None:
+        """Records an applied plan in the manifest
+
+        Args:
+            plan (IngestionPlan): plan applied to the vector store
+        """
+        with self._lock:
+            stale_sources = list(plan.sources) + plan.removed_sources
+            for i in range(0, len(stale_sources), WRITE_CHUNK_SIZE):
+                batch = stale_sources[i : i + WRITE_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                self._connection.execute(f'DELETE FROM sources WHERE source IN ({placeholders})', batch)
+                self._connection.execute(f'DELETE FROM chunks WHERE source IN ({placeholders})', batch)
+            self._connection.executemany(
+                'INSERT INTO sources (source, mtime, content_hash) VALUES (?, ?, ?)',
+                [(source, record.mtime, record.content_hash) for source, record in plan.sources.items()],
+            )
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO chunks (chunk_id, source) VALUES (?, ?)',
+                [(chunk_id, source) for source, record in plan.sources.items() for chunk_id in record.chunk_ids],
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Closes the manifest database"""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,661 @@
+"""Local vector store keeping quantized vectors in a memory-mapped matrix, with a SQLite sidecar for documents."""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+MMAP_DTYPES = ['float16', 'int8']
+MMAP_INDEX_TYPES = ['ivf', 'hnsw']
+
+CONFIG_FILE_NAME = 'mmap_index.json'
+VECTORS_FILE_NAME = 'vectors.bin'
+SCALES_FILE_NAME = 'scales.bin'
+DOCS_FILE_NAME = 'docs.sqlite'
+IVF_CENTROIDS_FILE_NAME = 'ivf_centroids.npy'
+IVF_OFFSETS_FILE_NAME = 'ivf_offsets.npy'
+IVF_ROWS_FILE_NAME = 'ivf_rows.npy'
+HNSW_FILE_NAME = 'hnsw.bin'
+
+# Number of rows scored at once, bounding the float32 copy made of the memory-mapped matrix
+SCAN_CHUNK_ROWS = 65536
+
+# SQLite limits the number of parameters of a query, so rows are fetched in chunks
+FETCH_CHUNK_SIZE = 500
+
+# Fraction of rows added since the index was built above which refresh_index rebuilds it
+REINDEX_FRACTION = 0.1
+
+# Fraction of deleted rows above which the ingestion compacts the matrix
+COMPACT_FRACTION = 0.25
+
+# SQL comparison of each metadata filter operator
+_FILTER_OPERATORS = {'$eq': '=', '$ne': 'IS NOT', '$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}
+
+STORE_FILE_NAMES = [
+    CONFIG_FILE_NAME,
+    VECTORS_FILE_NAME,
+    SCALES_FILE_NAME,
+    DOCS_FILE_NAME,
+    IVF_CENTROIDS_FILE_NAME,
+    IVF_OFFSETS_FILE_NAME,
+    IVF_ROWS_FILE_NAME,
+    HNSW_FILE_NAME,
+]
+
+
+def delete_store_files(db_path: str) -> None:
+    """Deletes the files of a memory-mapped vector store, keeping the other files of its directory"""
+    for file_name in STORE_FILE_NAMES:
+        path = os.path.join(db_path, file_name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class MmapVectorStore(VectorStore):
+    """Vector store persisted in a directory, with the vectors in a memory-mapped float16 or int8 matrix and the
+    documents in a SQLite sidecar.
+
+    Opening the store only maps the matrix, so cold start is near-instant and processes serving the same store share
+    its pages through the OS page cache. Vectors are normalized, scores are cosine similarities, and vectors take
+    2x (float16) or 4x (int8, with a float32 scale per vector) less memory than float32.
+
+    Searches scan the whole matrix, unless an approximate index is built with build_index: IVF (k-means lists, in
+    numpy) or HNSW (requires hnswlib). The index then only selects candidates, which are re-ranked exactly against
+    the stored vectors. Rows added after the index was built are always scanned.
+
+    Deleted and replaced vectors are flagged in the sidecar, and skipped at search time.
+
+    Args:
+        db_path (str): directory of the store, created on the first write if it doesn't exist
+        embedding (Embeddings): embedding model
+        dtype (str, optional): one of `MMAP_DTYPES`, only used when the store is created. Defaults to "float16".
+        rerank_factor (int, optional): number of candidates the approximate index returns per requested document.
+            Defaults to 4.
+    """
+
+    def __init__(self, db_path: str, embedding: Embeddings, dtype: str = 'float16', rerank_factor: int = 4) -> None:
+        if dtype not in MMAP_DTYPES:
+            raise ValueError(f'dtype must be one of {MMAP_DTYPES}, got {dtype}')
+        self.db_path = db_path
+        self.embedding = embedding
+        self.rerank_factor = rerank_factor
+        self._lock = threading.RLock()
+
+        self.config: Dict[str, Any] = {
+            'dim': None,
+            'dtype': dtype,
+            'count': 0,
+            'index_type': None,
+            'indexed_count': 0,
+            'n_probe': 8,
+        }
+        config_path = os.path.join(db_path, CONFIG_FILE_NAME)
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                self.config.update(json.load(f))
+
+        self._connection: Optional[sqlite3.Connection] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._deleted: Optional[np.ndarray] = None
+        self._ivf: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._hnsw: Optional[Any] = None
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding
+
+    @property
+    def dtype(self) -> str:
+        return self.config['dtype']
+
+    @property
+    def count(self) -> int:
+        """Number of rows of the matrix, including the deleted ones"""
+        return self.config['count']
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.db_path, file_name)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(self.db_path, exist_ok=True)
+            self._connection = sqlite3.connect(self._path(DOCS_FILE_NAME), check_same_thread=False)
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS docs '
+                '(row INTEGER PRIMARY KEY, id TEXT UNIQUE, page_content TEXT, metadata TEXT, deleted INTEGER)'
+            )
+            self._connection.commit()
+        return self._connection
+
+    def _write_config(self) -> None:
+        tmp_path = self._path(f'{CONFIG_FILE_NAME}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.config, f)
+        os.replace(tmp_path, self._path(CONFIG_FILE_NAME))
+
+    def _open(self) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
+        """Maps the vectors, and loads the deleted flags, if not done yet"""
+        with self._lock:
+            if self._vectors is None:
+                count, dim = self.count, self.config['dim']
+                if count:
+                    self._vectors = np.memmap(
+                        self._path(VECTORS_FILE_NAME), dtype=self.dtype, mode='r', shape=(count, dim)
+                    )
+                    if self.dtype == 'int8':
+                        self._scales = np.memmap(
+                            self._path(SCALES_FILE_NAME), dtype=np.float32, mode='r', shape=(count,)
+                        )
+                else:
+                    self._vectors = np.zeros((0, dim or 0), dtype=self.dtype)
+                    self._scales = np.zeros(0, dtype=np.float32) if self.dtype == 'int8' else None
+                deleted = np.zeros(count, dtype=bool)
+                if count:
+                    rows = self._get_connection().execute('SELECT row FROM docs WHERE deleted = 1').fetchall()
+                    deleted[[row for (row,) in rows]] = True
+                self._deleted = deleted
+            assert self._deleted is not None
+            return self._vectors, self._scales, self._deleted
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _quantize(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.dtype == 'float16':
+            return vectors.astype(np.float16), None
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _read_rows(self, rows: Any) -> np.ndarray:
+        """Reads rows of the matrix as float32, rows being a slice or an array of row numbers"""
+        vectors, scales, _ = self._open()
+        block = np.asarray(vectors[rows], dtype=np.float32)
+        if scales is not None:
+            block *= np.asarray(scales[rows])[:, None]
+        return block
+
+    def add_embeddings(
+        self,
+        text_embeddings: Iterable[Tuple[str, List[float]]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Adds pre-computed embeddings, replacing the documents with the same IDs
+
+        Args:
+            text_embeddings (Iterable[Tuple[str, List[float]]]): texts and their embeddings
+            metadatas (Optional[List[dict]], optional): metadata of each text. Defaults to None.
+            ids (Optional[List[str]], optional): ID of each text, generated if None. Defaults to None.
+
+        Returns:
+            List[str]: IDs of the added texts
+        """
+        text_embeddings = list(text_embeddings)
+        if not text_embeddings:
+            return []
+        texts = [text for text, _ in text_embeddings]
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = self._normalize(np.asarray([embedding for _, embedding in text_embeddings], dtype=np.float32))
+        if self.config['dim'] is None:
+            self.config['dim'] = vectors.shape[1]
+        elif vectors.shape[1] != self.config['dim']:
+            raise ValueError(f'Expected embeddings of dimension {self.config["dim"]}, got {vectors.shape[1]}')
+        data, scales = self._quantize(vectors)
+
+        with self._lock:
+            connection = self._get_connection()
+            self.delete(ids)
+            start = self.count
+            row_bytes = self.config['dim'] * np.dtype(self.dtype).itemsize
+            # Bytes past the rows of the config are leftovers of an interrupted write, overwritten here
+            with open(self._path(VECTORS_FILE_NAME), 'ab') as f:
+                f.truncate(start * row_bytes)
+                f.write(data.tobytes())
+            if scales is not None:
+                with open(self._path(SCALES_FILE_NAME), 'ab') as f:
+                    f.truncate(start * 4)
+                    f.write(scales.tobytes())
+            connection.executemany(
+                'INSERT INTO docs (row, id, page_content, metadata, deleted) VALUES (?, ?, ?, ?, 0)',
+                [
+                    (start + i, chunk_id, text, json.dumps(metadata, default=str))
+                    for i, (chunk_id, text, metadata) in enumerate(zip(ids, texts, metadatas))
+                ],
+            )
+            self.config['count'] = start + len(texts)
+            self._write_config()
+            connection.commit()
+            self._vectors = None
+            self._scales = None
+            self._deleted = None
+
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        embeddings = self.embedding.embed_documents(texts)
+        return self.add_embeddings(zip(texts, embeddings), metadatas=metadatas, ids=ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Flags the vectors of documents as deleted
+
+        Args:
+            ids (Optional[List[str]], optional): IDs of the documents to delete. Defaults to None.
+
+        Returns:
+            Optional[bool]: True
+        """
+        if not ids:
+            return True
+        with self._lock:
+            connection = self._get_connection()
+            for i in range(0, len(ids), FETCH_CHUNK_SIZE):
+                batch = ids[i : i + FETCH_CHUNK_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = connection.execute(f'SELECT row FROM docs WHERE id IN ({placeholders})', batch).fetchall()
+                # The ID is released so the document can be added again
+                connection.execute(
+                    f'UPDATE docs SET deleted = 1, id = NULL WHERE id IN ({placeholders})', batch
+                )
+                if self._deleted is not None and rows:
+                    self._deleted[[row for (row,) in rows]] = True
+            connection.commit()
+        return True
+
+    def _get_filter_clause(self, filter: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """Converts a Chroma style metadata filter, e.g. {'$or': [{'company_ticker': {'$eq': 'aapl'}}, ...]}, to a
+        SQL condition on the metadata and its parameters. Supports the $and and $or clauses and the $eq, $ne, $in,
+        $nin, $gt, $gte, $lt and $lte operators, a plain value meaning $eq and a list of values meaning $in.
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        for key, value in filter.items():
+            if key in ('$and', '$or'):
+                sub_clauses = [self._get_filter_clause(sub_filter) for sub_filter in value]
+                if not sub_clauses:
+                    clauses.append('1' if key == '$and' else '0')
+                    continue
+                separator = ' AND ' if key == '$and' else ' OR '
+                clauses.append(f'({separator.join(clause for clause, _ in sub_clauses)})')
+                params.extend(param for _, sub_params in sub_clauses for param in sub_params)
+                continue
+            if key.startswith('$'):
+                raise ValueError(f'Unsupported filter clause: {key}')
+
+            if isinstance(value, dict):
+                operators = value
+            elif isinstance(value, list):
+                operators = {'$in': value}
+            else:
+                operators = {'$eq': value}
+            field = 'json_extract(metadata, ?)'
+            path = f'$."{key}"'
+            for operator, operand in operators.items():
+                if operator in ('$in', '$nin'):
+                    placeholders = ','.join('?' * len(operand))
+                    if operator == '$in':
+                        clauses.append(f'{field} IN ({placeholders})')
+                        params.extend([path, *operand])
+                    else:
+                        # Like Qdrant, documents without the key match $ne and $nin
+                        clauses.append(f'({field} IS NULL OR {field} NOT IN ({placeholders}))')
+                        params.extend([path, path, *operand])
+                elif operator in _FILTER_OPERATORS:
+                    clauses.append(f'{field} {_FILTER_OPERATORS[operator]} ?')
+                    params.extend([path, operand])
+                else:
+                    raise ValueError(f'Unsupported filter operator: {operator}')
+        return ' AND '.join(f'({clause})' for clause in clauses) or '1', params
+
+    def _get_filter_rows(self, filter: Dict[str, Any]) -> np.ndarray:
+        """Gets the rows whose metadata match a filter, see _get_filter_clause"""
+        clause, params = self._get_filter_clause(filter)
+        query = f'SELECT row FROM docs WHERE deleted = 0 AND ({clause})'
+        with self._lock:
+            rows = self._get_connection().execute(query, params).fetchall()
+        return np.asarray(sorted(row for (row,) in rows), dtype=np.int64)
+
+    def _get_candidate_rows(self, query: np.ndarray, fetch_k: int, n_probe: Optional[int]) -> Optional[np.ndarray]:
+        """Gets the candidate rows of the approximate index, None to scan all the rows"""
+        index_type = self.config['index_type']
+        indexed_count = self.config['indexed_count']
+        if index_type is None or indexed_count == 0:
+            return None
+
+        if index_type == 'hnsw':
+            hnsw = self._load_hnsw()
+            labels, _ = hnsw.knn_query(query[None, :], k=min(fetch_k, indexed_count))
+            candidates = labels[0].astype(np.int64)
+        else:
+            centroids, offsets, list_rows = self._load_ivf()
+            n_probe = min(n_probe or self.config['n_probe'], len(centroids))
+            lists = np.argpartition(-(centroids @ query), n_probe - 1)[:n_probe]
+            candidates = np.concatenate([list_rows[offsets[i] : offsets[i + 1]] for i in lists])
+
+        tail = np.arange(indexed_count, self.count, dtype=np.int64)
+        return np.sort(np.concatenate([candidates, tail]))
+
+    def _search_rows(
+        self, query: np.ndarray, k: int, rows: Optional[np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Scores rows exactly and returns the k best ones, all the rows if rows is None"""
+        _, _, deleted = self._open()
+        num_rows = self.count if rows is None else len(rows)
+        best_rows: List[np.ndarray] = []
+        best_scores: List[np.ndarray] = []
+        for start in range(0, num_rows, SCAN_CHUNK_ROWS):
+            stop = min(start + SCAN_CHUNK_ROWS, num_rows)
+            if rows is None:
+                chunk_rows = np.arange(start, stop)
+                block = self._read_rows(slice(start, stop))
+            else:
+                chunk_rows = rows[start:stop]
+                block = self._read_rows(chunk_rows)
+            scores = block @ query
+            scores[deleted[chunk_rows]] = -np.inf
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                chunk_rows, scores = chunk_rows[top], scores[top]
+            best_rows.append(chunk_rows)
+            best_scores.append(scores)
+
+        if not best_rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        all_rows, all_scores = np.concatenate(best_rows), np.concatenate(best_scores)
+        order = np.argsort(-all_scores, kind='stable')[:k]
+        order = order[np.isfinite(all_scores[order])]
+        return all_rows[order], all_scores[order]
+
+    def _get_documents(self, rows: np.ndarray) -> List[Document]:
+        """Gets the documents of rows, in the same order"""
+        found: Dict[int, Document] = {}
+        row_list = [int(row) for row in rows]
+        with self._lock:
+            connection = self._get_connection()
+            for i in range(0, len(row_list), FETCH_CHUNK_SIZE):
+                batch = row_list[i : i + FETCH_CHUNK_SIZE]
+                for row, page_content, metadata in connection.execute(
+                    f'SELECT row, page_content, metadata FROM docs WHERE row IN ({",".join("?" * len(batch))})',
+                    batch,
+                ):
+                    found[row] = Document(page_content=page_content, metadata=json.loads(metadata))
+        return [found[row] for row in row_list]
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        n_probe: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Searches the documents most similar to an embedding
+
+        Args:
+            embedding (List[float]): query embedding
+            k (int, optional): number of documents to return. Defaults to 4.
+            filter (Optional[Dict[str, Any]], optional): Chroma style metadata filter the documents must match, see
+                _get_filter_clause. The matching documents are all scored exactly. Defaults to None.
+            n_probe (Optional[int], optional): number of IVF lists to search, defaults to the one of build_index.
+                Defaults to None.
+
+        Returns:
+            List[Tuple[Document, float]]: documents and their cosine similarity to the query
+        """
+        if self.count == 0:
+            return []
+        query = self._normalize(np.asarray(embedding, dtype=np.float32))
+        if filter:
+            rows = self._get_filter_rows(filter)
+        else:
+            rows = self._get_candidate_rows(query, k * self.rerank_factor, n_probe)
+        best_rows, scores = self._search_rows(query, k, rows)
+        return list(zip(self._get_documents(best_rows), scores.tolist()))
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = self.embedding.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k=k, filter=filter, **kwargs)
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k, filter=filter, **kwargs)
+        ]
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter, **kwargs)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Scores are cosine similarities already
+        return lambda score: score
+
+    def _load_ivf(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with self._lock:
+            if self._ivf is None:
+                self._ivf = (
+                    np.load(self._path(IVF_CENTROIDS_FILE_NAME)),
+                    np.load(self._path(IVF_OFFSETS_FILE_NAME)),
+                    np.load(self._path(IVF_ROWS_FILE_NAME), mmap_mode='r'),
+                )
+            return self._ivf
+
+    def _load_hnsw(self) -> Any:
+        with self._lock:
+            if self._hnsw is None:
+                hnswlib = self._import_hnswlib()
+                hnsw = hnswlib.Index(space='ip', dim=self.config['dim'])
+                hnsw.load_index(self._path(HNSW_FILE_NAME))
+                hnsw.set_ef(max(64, 4 * self.rerank_factor))
+                self._hnsw = hnsw
+            return self._hnsw
+
+    @staticmethod
+    def _import_hnswlib() -> Any:
+        try:
+            import hnswlib
+        except ImportError:
+            raise ImportError('could not import hnswlib library, Please install it with `pip install hnswlib`.')
+        return hnswlib
+
+    def _build_ivf(self, n_lists: Optional[int], n_iter: int, sample_size: int) -> None:
+        count = self.count
+        n_lists = n_lists or max(1, int(np.sqrt(count)))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(count, size=min(count, max(sample_size, n_lists)), replace=False))
+        sample = self._read_rows(sample_rows)
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)]
+        # Spherical k-means, as vectors are compared by cosine similarity
+        for _ in range(n_iter):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for i in range(n_lists):
+                members = sample[assignments == i]
+                if len(members):
+                    centroids[i] = members.sum(axis=0)
+            centroids = self._normalize(centroids)
+
+        assignments = np.concatenate(
+            [
+                np.argmax(self._read_rows(slice(start, min(start + SCAN_CHUNK_ROWS, count))) @ centroids.T, axis=1)
+                for start in range(0, count, SCAN_CHUNK_ROWS)
+            ]
+        )
+        list_rows = np.argsort(assignments, kind='stable').astype(np.int64)
+        offsets = np.searchsorted(assignments[list_rows], np.arange(n_lists + 1)).astype(np.int64)
+        np.save(self._path(IVF_CENTROIDS_FILE_NAME), centroids.astype(np.float32))
+        np.save(self._path(IVF_OFFSETS_FILE_NAME), offsets)
+        np.save(self._path(IVF_ROWS_FILE_NAME), list_rows)
+
+    def _build_hnsw(self, m: int, ef_construction: int) -> None:
+        hnswlib = self._import_hnswlib()
+        count = self.count
+        hnsw = hnswlib.Index(space='ip', dim=self.config['dim'])
+        hnsw.init_index(max_elements=count, ef_construction=ef_construction, M=m)
+        for start in range(0, count, SCAN_CHUNK_ROWS):
+            stop = min(start + SCAN_CHUNK_ROWS, count)
+            hnsw.add_items(self._read_rows(slice(start, stop)), np.arange(start, stop))
+        hnsw.save_index(self._path(HNSW_FILE_NAME))
+
+    def build_index(
+        self,
+        index_type: str = 'ivf',
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_iter: int = 10,
+        sample_size: int = 100000,
+        m: int = 16,
+        ef_construction: int = 200,
+    ) -> None:
+        """Builds an approximate index of the stored vectors, used by the searches without filter
+
+        Args:
+            index_type (str, optional): one of `MMAP_INDEX_TYPES`. Defaults to "ivf".
+            n_lists (Optional[int], optional): number of IVF lists, defaults to the square root of the number of
+                rows. Defaults to None.
+            n_probe (int, optional): number of IVF lists searched by default. Defaults to 8.
+            n_iter (int, optional): number of k-means iterations of IVF. Defaults to 10.
+            sample_size (int, optional): number of vectors the IVF lists are trained on. Defaults to 100000.
+            m (int, optional): number of links per HNSW node. Defaults to 16.
+            ef_construction (int, optional): size of the HNSW candidate list at construction. Defaults to 200.
+        """
+        if index_type not in MMAP_INDEX_TYPES:
+            raise ValueError(f'index_type must be one of {MMAP_INDEX_TYPES}, got {index_type}')
+        with self._lock:
+            if self.count == 0:
+                return
+            if index_type == 'ivf':
+                self._build_ivf(n_lists, n_iter, sample_size)
+            else:
+                self._build_hnsw(m, ef_construction)
+            self.config.update(index_type=index_type, indexed_count=self.count, n_probe=n_probe)
+            self._write_config()
+            self._ivf = None
+            self._hnsw = None
+
+    def refresh_index(self) -> None:
+        """Rebuilds the approximate index, if any, when many rows were added since it was built"""
+        index_type = self.config['index_type']
+        if index_type is not None and self.count - self.config['indexed_count'] > REINDEX_FRACTION * self.count:
+            self.build_index(index_type, n_probe=self.config['n_probe'])
+
+    def deleted_fraction(self) -> float:
+        """Fraction of the rows of the matrix that are deleted"""
+        _, _, deleted = self._open()
+        return float(deleted.mean()) if len(deleted) else 0.0
+
+    def compact(self) -> None:
+        """Rewrites the matrix without the deleted rows, and rebuilds the approximate index if any. Processes that
+        opened the store before must open it again.
+        """
+        with self._lock:
+            vectors, scales, deleted = self._open()
+            live_rows = np.flatnonzero(~deleted)
+            connection = self._get_connection()
+            with open(self._path(f'{VECTORS_FILE_NAME}.tmp'), 'wb') as f:
+                for start in range(0, len(live_rows), SCAN_CHUNK_ROWS):
+                    f.write(np.ascontiguousarray(vectors[live_rows[start : start + SCAN_CHUNK_ROWS]]).tobytes())
+            if scales is not None:
+                with open(self._path(f'{SCALES_FILE_NAME}.tmp'), 'wb') as f:
+                    f.write(np.ascontiguousarray(scales[live_rows]).tobytes())
+
+            connection.execute('DELETE FROM docs WHERE deleted = 1')
+            # Rows only move down, in ascending order, so a new row number is never taken
+            connection.executemany(
+                'UPDATE docs SET row = ? WHERE row = ?',
+                [(new_row, int(old_row)) for new_row, old_row in enumerate(live_rows) if new_row != old_row],
+            )
+            self._vectors = None
+            self._scales = None
+            self._deleted = None
+            os.replace(self._path(f'{VECTORS_FILE_NAME}.tmp'), self._path(VECTORS_FILE_NAME))
+            if scales is not None:
+                os.replace(self._path(f'{SCALES_FILE_NAME}.tmp'), self._path(SCALES_FILE_NAME))
+            self.config.update(count=len(live_rows), indexed_count=0)
+            self._write_config()
+            connection.commit()
+
+            if self.config['index_type'] is not None:
+                self.build_index(self.config['index_type'], n_probe=self.config['n_probe'])
+
+    def close(self) -> None:
+        """Closes the sidecar database and unmaps the vectors"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self._vectors = None
+            self._scales = None
+            self._deleted = None
+
+    @classmethod
+    def load(cls, db_path: str, embedding: Embeddings, **kwargs: Any) -> 'MmapVectorStore':
+        """Opens a store persisted in a directory
+
+        Args:
+            db_path (str): directory of the store
+            embedding (Embeddings): embedding model
+
+        Returns:
+            MmapVectorStore: the store
+        """
+        if not os.path.exists(os.path.join(db_path, CONFIG_FILE_NAME)):
+            raise ValueError(f'No memory-mapped vector store at {db_path}')
+        return cls(db_path, embedding, **kwargs)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        db_path: Optional[str] = None,
+        dtype: str = 'float16',
+        index_type: Optional[str] = None,
+        **kwargs: Any,
+    ) -> 'MmapVectorStore':
+        """Creates a store from texts
+
+        Args:
+            texts (List[str]): texts
+            embedding (Embeddings): embedding model
+            metadatas (Optional[List[dict]], optional): metadata of each text. Defaults to None.
+            ids (Optional[List[str]], optional): ID of each text. Defaults to None.
+            db_path (Optional[str], optional): directory of the store. Required.
+            dtype (str, optional): one of `MMAP_DTYPES`. Defaults to "float16".
+            index_type (Optional[str], optional): approximate index to build, one of `MMAP_INDEX_TYPES`, none if
+                None. Defaults to None.
+
+        Returns:
+            MmapVectorStore: the store
+        """
+        if db_path is None:
+            raise ValueError('db_path is required to create a memory-mapped vector store')
+        store = cls(db_path, embedding, dtype=dtype)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        if index_type is not None:
+            store.build_index(index_type)
+        return store
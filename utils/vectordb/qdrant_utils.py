@@ -0,0 +1,101 @@
+"""Qdrant helpers of the vector db: clients, payload indexes and metadata filters."""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_community.vectorstores import Qdrant
+
+# Metadata keys the retrieval filters on, indexed so that filters on them are index lookups
+QDRANT_INDEXED_METADATA_KEYS = ('company_ticker', 'filename', 'source')
+
+# Number of points sent per upsert request, and number of requests sent in parallel
+QDRANT_UPSERT_BATCH_SIZE = 256
+QDRANT_UPSERT_PARALLEL = 4
+
+# Range operators of the metadata filters, and their name in a Qdrant range
+_RANGE_OPERATORS = {'$gt': 'gt', '$gte': 'gte', '$lt': 'lt', '$lte': 'lte'}
+
+
+def get_qdrant_client(path: Optional[str] = None, url: Optional[str] = None) -> Any:
+    """Gets a Qdrant client
+
+    Args:
+        path (Optional[str], optional): directory of a local Qdrant, run in the process. Defaults to None.
+        url (Optional[str], optional): url of a Qdrant server, used instead of path if set. Defaults to None.
+
+    Returns:
+        QdrantClient: client of the Qdrant server if url is set, of the local Qdrant at path otherwise, in memory
+            if path isn't set either
+    """
+    from qdrant_client import QdrantClient
+
+    if url is not None:
+        return QdrantClient(url=url)
+    if path is not None:
+        return QdrantClient(path=path)
+    return QdrantClient(location=':memory:')
+
+
+def create_payload_indexes(client: Any, collection_name: str, metadata_keys: Sequence[str]) -> None:
+    """Creates the missing keyword payload indexes on metadata keys of a collection. Qdrant only uses payload indexes
+    on a server, a local Qdrant always scans the payloads.
+
+    Args:
+        client (QdrantClient): Qdrant server client
+        collection_name (str): collection name
+        metadata_keys (Sequence[str]): metadata keys to index
+    """
+    from qdrant_client.http import models as rest
+
+    payload_schema = client.get_collection(collection_name).payload_schema
+    for key in metadata_keys:
+        field_name = f'{Qdrant.METADATA_KEY}.{key}'
+        if field_name not in payload_schema:
+            client.create_payload_index(
+                collection_name, field_name, field_schema=rest.PayloadSchemaType.KEYWORD, wait=True
+            )
+
+
+def get_qdrant_filter(metadata_filter: Optional[Dict[str, Any]]) -> Any:
+    """Converts a Chroma style metadata filter, e.g. {'$or': [{'company_ticker': {'$eq': 'aapl'}}, ...]}, to a Qdrant
+    filter on the metadata of the payloads. Supports the $and and $or clauses and the $eq, $ne, $in, $nin, $gt, $gte,
+    $lt and $lte operators, a plain value meaning $eq.
+
+    Args:
+        metadata_filter (Optional[Dict[str, Any]]): metadata filter
+
+    Returns:
+        Optional[Filter]: Qdrant filter, None if metadata_filter is None
+    """
+    from qdrant_client.http import models as rest
+
+    if metadata_filter is None:
+        return None
+
+    must: List[Any] = []
+    must_not: List[Any] = []
+    for key, value in metadata_filter.items():
+        if key == '$and':
+            must.extend(get_qdrant_filter(clause) for clause in value)
+        elif key == '$or':
+            must.append(rest.Filter(should=[get_qdrant_filter(clause) for clause in value]))
+        elif key.startswith('$'):
+            raise ValueError(f'Unsupported filter clause: {key}')
+        else:
+            field_name = f'{Qdrant.METADATA_KEY}.{key}'
+            operators = value if isinstance(value, dict) else {'$eq': value}
+            for operator, operand in operators.items():
+                if operator == '$eq':
+                    must.append(rest.FieldCondition(key=field_name, match=rest.MatchValue(value=operand)))
+                elif operator == '$ne':
+                    must_not.append(rest.FieldCondition(key=field_name, match=rest.MatchValue(value=operand)))
+                elif operator == '$in':
+                    must.append(rest.FieldCondition(key=field_name, match=rest.MatchAny(any=list(operand))))
+                elif operator == '$nin':
+                    must_not.append(rest.FieldCondition(key=field_name, match=rest.MatchAny(any=list(operand))))
+                elif operator in _RANGE_OPERATORS:
+                    range_ = rest.Range(**{_RANGE_OPERATORS[operator]: operand})
+                    must.append(rest.FieldCondition(key=field_name, range=range_))
+                else:
+                    raise ValueError(f'Unsupported filter operator: {operator}')
+
+    return rest.Filter(must=must or None, must_not=must_not or None)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Incremental Ingestion Test Script
+
+This script tests the ingestion manifest and the ingestion pipeline of the vector db utils using unittest.
+
+Test cases:
+    test_new_sources: checks that every chunk of new sources is planned for addition
+    test_unchanged_source: checks that an unchanged source plans nothing once committed
+    test_changed_source: checks that only the changed chunks of a source are added and deleted
+    test_removed_source: checks that the chunks of a source missing from the corpus are deleted
+    test_duplicate_chunks: checks that identical chunks of a source get distinct IDs
+    test_plan_spanning_batches: checks that a plan is only completed by the batch embedding its last chunk
+    test_pipeline_incremental_run: checks that a re-run only embeds the new and changed chunks
+    test_pipeline_interrupted_run: checks that a re-run after an interrupted run embeds the chunks not persisted
+
+Usage:
+    python utils/vectordb/tests/ingestion_test.py
+
+Returns:
+    0 if all tests pass, or a positive integer representing the number of failed tests.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from typing import Dict, List, Optional
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
+
+sys.path.append(repo_dir)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from utils.vectordb.ingestion import IngestionPipeline, VectorStoreWriter
+from utils.vectordb.manifest import IngestionManifest, IngestionPlan, get_chunk_ids
+
+
+def make_chunks(source: str, texts: List[str]) -> List[Document]:
+    return [Document(page_content=text, metadata={'source': source}) for text in texts]
+
+
+class InMemoryWriter(VectorStoreWriter):
+    """Writer keeping the vectors in a dict, failing on the `fail_on_add`-th add if set"""
+
+    def __init__(self, vectors: Optional[Dict[str, List[float]]] = None, fail_on_add: Optional[int] = None) -> None:
+        super().__init__('', DeterministicFakeEmbedding(size=4), rebuild=False)
+        self.vectors = vectors if vectors is not None else {}
+        self.fail_on_add = fail_on_add
+        self.num_adds = 0
+
+    def delete(self, ids: List[str]) -> None:
+        for chunk_id in ids:
+            self.vectors.pop(chunk_id, None)
+
+    def add(self, chunks: List[Document], vectors: List[List[float]], ids: List[str]) -> None:
+        self.num_adds += 1
+        if self.num_adds == self.fail_on_add:
+            raise RuntimeError('write failed')
+        self.vectors.update(zip(ids, vectors))
+
+    def close(self) -> Dict[str, List[float]]:
+        return self.vectors
+
+
+class IngestionManifestTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manifest = IngestionManifest.from_db_path(self.temp_dir.name)
+        self.chunks_a = make_chunks('a', ['a1', 'a2', 'a3'])
+        self.chunks_b = make_chunks('b', ['b1', 'b2'])
+
+    def tearDown(self) -> None:
+        self.manifest.close()
+        self.temp_dir.cleanup()
+
+    def test_new_sources(self) -> None:
+        plan = self.manifest.plan(self.chunks_a + self.chunks_b)
+        self.assertEqual(plan.ids_to_add, get_chunk_ids(self.chunks_a + self.chunks_b))
+        self.assertEqual(plan.chunks_to_add, self.chunks_a + self.chunks_b)
+        self.assertEqual(plan.ids_to_delete, [])
+        self.assertEqual(set(plan.sources), {'a', 'b'})
+
+    def test_unchanged_source(self) -> None:
+        self.manifest.commit(self.manifest.plan(self.chunks_a))
+        plan = self.manifest.plan(self.chunks_a)
+        self.assertEqual(plan.chunks_to_add, [])
+        self.assertEqual(plan.ids_to_delete, [])
+        self.assertEqual(self.manifest.get_sources()['a'].chunk_ids, get_chunk_ids(self.chunks_a))
+
+    def test_changed_source(self) -> None:
+        self.manifest.commit(self.manifest.plan(self.chunks_a))
+        changed_chunks = make_chunks('a', ['a1', 'a2 changed', 'a3'])
+        plan = self.manifest.plan(changed_chunks)
+        self.assertEqual(plan.ids_to_add, [get_chunk_ids(changed_chunks)[1]])
+        self.assertEqual(plan.ids_to_delete, [get_chunk_ids(self.chunks_a)[1]])
+
+        self.manifest.commit(plan)
+        self.assertEqual(sorted(self.manifest.get_sources()['a'].chunk_ids), sorted(get_chunk_ids(changed_chunks)))
+
+    def test_removed_source(self) -> None:
+        self.manifest.commit(self.manifest.plan(self.chunks_a + self.chunks_b))
+
+        removal = self.manifest.plan_removal({'a'})
+        self.assertEqual(removal.removed_sources, ['b'])
+        self.assertEqual(sorted(removal.ids_to_delete), sorted(get_chunk_ids(self.chunks_b)))
+
+        plan = self.manifest.plan(self.chunks_a, delete_missing_sources=True)
+        self.assertEqual(plan.chunks_to_add, [])
+        self.assertEqual(plan.removed_sources, ['b'])
+        self.assertEqual(sorted(plan.ids_to_delete), sorted(get_chunk_ids(self.chunks_b)))
+
+        self.manifest.commit(plan)
+        self.assertEqual(set(self.manifest.get_sources()), {'a'})
+        self.assertEqual(self.manifest.plan_removal({'a'}).ids_to_delete, [])
+
+    def test_duplicate_chunks(self) -> None:
+        chunks = make_chunks('a', ['same', 'other', 'same'])
+        ids = get_chunk_ids(chunks)
+        self.assertEqual(len(set(ids)), 3)
+        self.manifest.commit(self.manifest.plan(chunks))
+
+        # Removing one of the duplicates deletes a single ID
+        plan = self.manifest.plan(make_chunks('a', ['same', 'other']))
+        self.assertEqual(plan.chunks_to_add, [])
+        self.assertEqual(plan.ids_to_delete, [ids[2]])
+
+
+class IngestionPipelineTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.manifest = IngestionManifest.from_db_path(self.temp_dir.name)
+        self.corpus = {
+            'a': make_chunks('a', ['a1', 'a2', 'a3']),
+            'b': make_chunks('b', ['b1', 'b2']),
+            'c': make_chunks('c', ['c1', 'c2', 'c3', 'c4']),
+        }
+
+    def tearDown(self) -> None:
+        self.manifest.close()
+        self.temp_dir.cleanup()
+
+    def run_pipeline(self, writer: InMemoryWriter, batch_size: int = 2) -> IngestionPipeline:
+        pipeline = IngestionPipeline(writer, writer.embeddings, self.manifest, batch_size=batch_size)
+        pipeline.run(list(self.corpus), lambda source: self.corpus[source])
+        return pipeline
+
+    def all_chunk_ids(self) -> List[str]:
+        return [chunk_id for chunks in self.corpus.values() for chunk_id in get_chunk_ids(chunks)]
+
+    def test_plan_spanning_batches(self) -> None:
+        writer = InMemoryWriter()
+        pipeline = IngestionPipeline(writer, writer.embeddings, self.manifest, batch_size=2)
+        plans = [
+            IngestionPlan(self.corpus['a'], get_chunk_ids(self.corpus['a']), [], {'a': None}, []),
+            IngestionPlan([], [], ['deleted'], {'b': None}, []),
+            IngestionPlan(self.corpus['c'], get_chunk_ids(self.corpus['c']), [], {'c': None}, []),
+        ]
+        batches = list(pipeline._embed(plans))
+
+        self.assertEqual([len(batch.chunks) for batch in batches], [2, 2, 2, 1])
+        # A plan is completed by the batch embedding its last chunk, the unchanged plan b along with plan a
+        completed_sources = [[source for plan in batch.plans for source in plan.sources] for batch in batches]
+        self.assertEqual(completed_sources, [[], ['a', 'b'], [], ['c']])
+        self.assertEqual([batch.ids_to_delete for batch in batches], [[], ['deleted'], [], []])
+        self.assertEqual(pipeline.num_embedded, 7)
+        for batch in batches:
+            for plan in batch.plans:
+                self.assertEqual(plan.chunks_to_add, [])
+
+    def test_pipeline_incremental_run(self) -> None:
+        writer = InMemoryWriter()
+        self.assertEqual(self.run_pipeline(writer).num_embedded, 9)
+        self.assertEqual(sorted(writer.vectors), sorted(self.all_chunk_ids()))
+
+        # Unchanged corpus
+        self.assertEqual(self.run_pipeline(writer).num_embedded, 0)
+
+        # Changed, removed and new sources
+        self.corpus['a'] = make_chunks('a', ['a1', 'a2 changed', 'a3'])
+        del self.corpus['b']
+        self.corpus['d'] = make_chunks('d', ['d1'])
+        self.assertEqual(self.run_pipeline(writer).num_embedded, 2)
+        self.assertEqual(sorted(writer.vectors), sorted(self.all_chunk_ids()))
+        self.assertEqual(set(self.manifest.get_sources()), {'a', 'c', 'd'})
+
+    def test_pipeline_interrupted_run(self) -> None:
+        vectors: Dict[str, List[float]] = {}
+        with self.assertRaises(RuntimeError):
+            self.run_pipeline(InMemoryWriter(vectors, fail_on_add=3))
+        # Only the plans of the persisted batches were committed
+        self.assertEqual(set(self.manifest.get_sources()), {'a'})
+
+        writer = InMemoryWriter(vectors)
+        pipeline = self.run_pipeline(writer)
+        self.assertEqual(pipeline.num_embedded, 6)
+        self.assertEqual(sorted(writer.vectors), sorted(self.all_chunk_ids()))
+        self.assertEqual(set(self.manifest.get_sources()), {'a', 'b', 'c'})
+
+
+def main() -> int:
+    suite = unittest.TestSuite()
+    for test_case in [IngestionManifestTestCase, IngestionPipelineTestCase]:
+        suite.addTests(unittest.TestLoader().loadTestsFromTestCase(test_case))
+    test_result = unittest.TextTestRunner().run(suite)
+
+    failed_tests = len(test_result.failures) + len(test_result.errors)
+    logger.info(f'Tests passed: {test_result.testsRun - failed_tests}/{test_result.testsRun}')
+
+    if failed_tests:
+        logger.error(f'Number of failed tests: {failed_tests}')
+        return failed_tests
+    else:
+        logger.info('All tests passed successfully!')
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
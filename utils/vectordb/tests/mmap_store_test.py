@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Memory-Mapped Vector Store Test Script
+
+This script tests the memory-mapped vector store of the vector db utils using unittest.
+
+Test cases:
+    test_round_trip: checks adding, deleting, re-adding an ID, compacting, searching and reopening the store
+    test_deleted_rows_masked: checks that deleted rows are never returned, with and without an approximate index
+    test_filter_operators: checks each metadata filter operator and clause against the expected documents
+    test_unsupported_filters: checks that unsupported filter operators and clauses are rejected
+    test_quantized_recall: checks the recall of the int8 and float16 stores against an exact float32 search
+    test_ivf_candidates_and_tail_rows: checks that IVF searches score the probed lists and the rows added since
+    test_hnsw_candidates_and_tail_rows: same for HNSW, skipped if hnswlib isn't installed
+
+Usage:
+    python utils/vectordb/tests/mmap_store_test.py
+
+Returns:
+    0 if all tests pass, or a positive integer representing the number of failed tests.
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
+
+sys.path.append(repo_dir)
+
+from langchain_core.embeddings import Embeddings
+
+from utils.vectordb.mmap_store import MmapVectorStore
+
+DIM = 32
+NUM_TEXTS = 2000
+
+
+class VectorTableEmbeddings(Embeddings):
+    """Embeds the texts of a table of random vectors"""
+
+    def __init__(self, num_texts: int, dim: int, seed: int = 0) -> None:
+        vectors = np.random.default_rng(seed).normal(size=(num_texts, dim)).astype(np.float32)
+        self.texts = [f'text {i}' for i in range(num_texts)]
+        self.vectors = dict(zip(self.texts, vectors.tolist()))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.vectors[text]
+
+
+def exact_search(embeddings: VectorTableEmbeddings, texts: List[str], query: List[float], k: int) -> List[str]:
+    """Searches texts by exact float32 cosine similarity"""
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = vectors @ (np.asarray(query, dtype=np.float32) / np.linalg.norm(query))
+    return [texts[i] for i in np.argsort(-scores, kind='stable')[:k]]
+
+
+class MmapVectorStoreTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.embeddings = VectorTableEmbeddings(NUM_TEXTS, DIM)
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def create_store(self, texts: List[str], dtype: str = 'float16', **kwargs: Any) -> MmapVectorStore:
+        return MmapVectorStore.from_texts(
+            texts, self.embeddings, ids=texts, db_path=self.temp_dir.name, dtype=dtype, **kwargs
+        )
+
+    def search(self, store: MmapVectorStore, query: str, k: int = 10, **kwargs: Any) -> List[str]:
+        return [doc.page_content for doc in store.similarity_search(query, k=k, **kwargs)]
+
+    def test_round_trip(self) -> None:
+        texts = self.embeddings.texts[:100]
+        store = self.create_store(texts)
+        self.assertEqual(self.search(store, 'text 5', k=1), ['text 5'])
+
+        store.delete(['text 5', 'text 6'])
+        self.assertNotIn('text 5', self.search(store, 'text 5', k=100))
+        self.assertAlmostEqual(store.deleted_fraction(), 0.02)
+
+        # A deleted ID can be added again, in a new row
+        store.add_texts(['text 5'], metadatas=[{'readded': True}], ids=['text 5'])
+        self.assertEqual(store.count, 101)
+        self.assertEqual(store.similarity_search('text 5', k=1)[0].metadata, {'readded': True})
+
+        store.compact()
+        self.assertEqual(store.count, 99)
+        self.assertEqual(store.deleted_fraction(), 0.0)
+        self.assertEqual(self.search(store, 'text 5', k=1), ['text 5'])
+        self.assertNotIn('text 6', self.search(store, 'text 6', k=100))
+        self.assertEqual(self.search(store, 'text 99', k=1), ['text 99'])
+        store.close()
+
+        reopened = MmapVectorStore.load(self.temp_dir.name, self.embeddings)
+        self.assertEqual(reopened.count, 99)
+        self.assertEqual(self.search(reopened, 'text 5', k=1), ['text 5'])
+        self.assertEqual(reopened.similarity_search('text 5', k=1)[0].metadata, {'readded': True})
+        reopened.close()
+
+    def test_deleted_rows_masked(self) -> None:
+        texts = self.embeddings.texts
+        store = self.create_store(texts, index_type='ivf')
+        deleted = self.search(store, 'text 0', k=5, n_probe=1000)
+        store.delete(deleted)
+        for n_probe in [1, 1000]:
+            results = self.search(store, 'text 0', k=NUM_TEXTS, n_probe=n_probe)
+            self.assertFalse(set(deleted) & set(results))
+        results = self.search(store, 'text 0', k=NUM_TEXTS, filter={'$and': []})
+        self.assertEqual(len(results), NUM_TEXTS - 5)
+        self.assertFalse(set(deleted) & set(results))
+        store.close()
+
+    def test_filter_operators(self) -> None:
+        texts = self.embeddings.texts[:30]
+        metadatas: List[Dict[str, Any]] = [{'ticker': ['aapl', 'msft', 'goog'][i % 3], 'n': i} for i in range(30)]
+        metadatas[0] = {}
+        store = MmapVectorStore.from_texts(
+            texts, self.embeddings, metadatas=metadatas, ids=texts, db_path=self.temp_dir.name
+        )
+
+        filters: Dict[str, Any] = {
+            '$eq': ({'ticker': {'$eq': 'aapl'}}, lambda m: m.get('ticker') == 'aapl'),
+            'plain value': ({'ticker': 'msft'}, lambda m: m.get('ticker') == 'msft'),
+            'list of values': ({'ticker': ['msft', 'goog']}, lambda m: m.get('ticker') in ('msft', 'goog')),
+            '$ne': ({'ticker': {'$ne': 'aapl'}}, lambda m: m.get('ticker') != 'aapl'),
+            '$in': ({'ticker': {'$in': ['aapl']}}, lambda m: m.get('ticker') == 'aapl'),
+            '$nin': ({'ticker': {'$nin': ['aapl', 'msft']}}, lambda m: m.get('ticker') not in ('aapl', 'msft')),
+            '$gt': ({'n': {'$gt': 25}}, lambda m: m.get('n', -1) > 25),
+            '$gte': ({'n': {'$gte': 25}}, lambda m: m.get('n', -1) >= 25),
+            '$lt': ({'n': {'$lt': 5}}, lambda m: 'n' in m and m['n'] < 5),
+            '$lte': ({'n': {'$lte': 5}}, lambda m: 'n' in m and m['n'] <= 5),
+            '$and': (
+                {'$and': [{'ticker': 'goog'}, {'n': {'$gte': 10}}]},
+                lambda m: m.get('ticker') == 'goog' and m.get('n', -1) >= 10,
+            ),
+            '$or': (
+                {'$or': [{'ticker': {'$eq': 'aapl'}}, {'n': {'$lt': 3}}]},
+                lambda m: m.get('ticker') == 'aapl' or ('n' in m and m['n'] < 3),
+            ),
+            'nested': (
+                {'$or': [{'$and': [{'ticker': 'aapl'}, {'n': {'$lt': 10}}]}, {'n': {'$gt': 25}}]},
+                lambda m: (m.get('ticker') == 'aapl' and m.get('n', 99) < 10) or m.get('n', -1) > 25,
+            ),
+        }
+        for name, (metadata_filter, predicate) in filters.items():
+            with self.subTest(name):
+                expected = sorted(text for text, metadata in zip(texts, metadatas) if predicate(metadata))
+                self.assertEqual(sorted(self.search(store, 'text 0', k=100, filter=metadata_filter)), expected)
+        store.close()
+
+    def test_unsupported_filters(self) -> None:
+        store = self.create_store(self.embeddings.texts[:10])
+        for metadata_filter in [{'ticker': {'$regex': 'a'}}, {'$not': {}}]:
+            with self.assertRaises(ValueError):
+                store.similarity_search('text 0', filter=metadata_filter)
+        store.close()
+
+    def test_quantized_recall(self) -> None:
+        texts = self.embeddings.texts
+        queries = texts[::100]
+        for dtype in ['int8', 'float16']:
+            with self.subTest(dtype), tempfile.TemporaryDirectory() as db_path:
+                store = MmapVectorStore.from_texts(texts, self.embeddings, ids=texts, db_path=db_path, dtype=dtype)
+                recalls = [
+                    len(
+                        set(self.search(store, query))
+                        & set(exact_search(self.embeddings, texts, self.embeddings.embed_query(query), 10))
+                    )
+                    / 10
+                    for query in queries
+                ]
+                self.assertGreaterEqual(np.mean(recalls), 0.95)
+                store.close()
+
+    def check_candidates_and_tail_rows(self, index_type: str) -> None:
+        texts = self.embeddings.texts
+        store = self.create_store(texts[:1500], index_type=index_type)
+        self.assertEqual(store.config['indexed_count'], 1500)
+
+        # Rows added after the index was built are scanned
+        store.add_texts(texts[1500:], ids=texts[1500:])
+        self.assertEqual(store.config['indexed_count'], 1500)
+        for query in ['text 1600', 'text 1999']:
+            self.assertEqual(self.search(store, query, k=1), [query])
+
+        # The approximate index still finds the indexed rows, random vectors needing many IVF lists probed
+        recalls = [
+            len(
+                set(self.search(store, query, n_probe=20))
+                & set(exact_search(self.embeddings, texts, self.embeddings.embed_query(query), 10))
+            )
+            / 10
+            for query in texts[:1500:100]
+        ]
+        self.assertGreaterEqual(np.mean(recalls), 0.8)
+
+        store.refresh_index()
+        self.assertEqual(store.config['indexed_count'], NUM_TEXTS)
+        self.assertEqual(self.search(store, 'text 1600', k=1), ['text 1600'])
+        store.close()
+
+    def test_ivf_candidates_and_tail_rows(self) -> None:
+        self.check_candidates_and_tail_rows('ivf')
+
+        # Probing every list scores the same rows as a full scan, which filtered searches do
+        store = MmapVectorStore.load(self.temp_dir.name, self.embeddings)
+        for query in self.embeddings.texts[::250]:
+            self.assertEqual(self.search(store, query, n_probe=1000), self.search(store, query, filter={'$and': []}))
+        store.close()
+
+    def test_hnsw_candidates_and_tail_rows(self) -> None:
+        try:
+            import hnswlib  # noqa: F401
+        except ImportError:
+            self.skipTest('hnswlib is not installed')
+        self.check_candidates_and_tail_rows('hnsw')
+
+
+def main() -> int:
+    suite = unittest.TestLoader().loadTestsFromTestCase(MmapVectorStoreTestCase)
+    test_result = unittest.TextTestRunner().run(suite)
+
+    failed_tests = len(test_result.failures) + len(test_result.errors)
+    logger.info(f'Tests passed: {test_result.testsRun - failed_tests}/{test_result.testsRun}')
+
+    if failed_tests:
+        logger.error(f'Number of failed tests: {failed_tests}')
+        return failed_tests
+    else:
+        logger.info('All tests passed successfully!')
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
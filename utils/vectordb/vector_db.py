@@ -16,10 +16,15 @@ Optional arguments:
 
 import os
 import sys
+import shutil
+import functools
+import tempfile
 import argparse
 import logging
 
-from langchain_community.document_loaders import DirectoryLoader, UnstructuredURLLoader
+from pathlib import Path
+
+from langchain_community.document_loaders import DirectoryLoader, UnstructuredFileLoader, UnstructuredURLLoader
 from langchain_community.embeddings import HuggingFaceInstructEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter, CharacterTextSplitter
 from langchain_community.vectorstores import FAISS, Chroma, Qdrant
@@ -32,10 +37,25 @@ sys.path.append(repo_dir)
 sys.path.append(utils_dir)
 
 from utils.model_wrappers.api_gateway import APIGateway
+from utils.vectordb.ingestion import (
+    ChromaWriter,
+    FaissWriter,
+    IngestionPipeline,
+    QdrantWriter,
+    MmapWriter,
+    get_chunking_config,
+    load_sources,
+)
+from utils.vectordb.mmap_store import CONFIG_FILE_NAME as MMAP_CONFIG_FILE_NAME, MmapVectorStore, delete_store_files
+from utils.vectordb.manifest import MANIFEST_FILE_NAME, IngestionManifest, get_chunk_ids
+from utils.vectordb.qdrant_utils import get_qdrant_client
 import uuid
 import streamlit as st
 
 EMBEDDING_MODEL = "intfloat/e5-large-v2"
+QDRANT_DEFAULT_COLLECTION = "test_collection"
+TEXT_LOADER_KWARGS = {"autodetect_encoding": True}
+DB_TYPES = ("faiss", "chroma", "qdrant", "mmap")
 NORMALIZE_EMBEDDINGS = True
 VECTORDB_LOG_FILE_NAME = "vector_db.log"
 
@@ -55,7 +75,7 @@ logger = logging.getLogger(__name__)
 
 class VectorDb():
     """
-    A class for creating, updating and loading FAISS or Chroma vector databases, 
+    A class for creating, updating and loading FAISS, Chroma, Qdrant or memory-mapped vector databases,
     to use them with retrieval augmented generation tasks with langchain
 
     Args:
@@ -69,6 +89,8 @@ class VectorDb():
         get_text_chunks: Get text chunks from a list of documents
         get_token_chunks: Get token chunks from a list of documents
         create_vector_store: Create a vector store from chunks and an embedding model
+        ingest: Incrementally ingest sources into a persisted vector store with a streaming pipeline
+        sync_vector_store: Incrementally sync a persisted vector store with chunks, using its ingestion manifest
         load_vdb: load a previous stored vector database 
         update_vdb: Update an existing vector store with new chunks
         create_vdb: Create a vector database from the raw files in a specific input directory 
@@ -91,7 +113,7 @@ class VectorDb():
             list: list of documents
         """
         docs=[]
-        text_loader_kwargs={'autodetect_encoding': True}
+        text_loader_kwargs=TEXT_LOADER_KWARGS
         if input_path is not None:
             if load_txt:
                 loader = DirectoryLoader(input_path, glob="*.txt", recursive=recursive, show_progress=True, loader_kwargs=text_loader_kwargs)
@@ -163,7 +185,8 @@ class VectorDb():
     
 
     def create_vector_store(self, chunks: list, embeddings: HuggingFaceInstructEmbeddings, db_type: str,
-                            output_db: str = None, collection_name: str = None):
+                            output_db: str = None, collection_name: str = None, vector_dtype: str = "float16",
+                            index_type: str = None, qdrant_url: str = None):
         """Creates a vector store
 
         Args:
@@ -171,28 +194,41 @@ class VectorDb():
             embeddings (HuggingFaceInstructEmbeddings): embedding model
             db_type (str): vector db type
             output_db (str, optional): output path to save the vector db. Defaults to None.
+            collection_name (str, optional): collection name of Chroma or Qdrant. Defaults to a new collection name
+                for Chroma, and to QDRANT_DEFAULT_COLLECTION for Qdrant.
+            vector_dtype (str, optional): "float16" or "int8", dtype of the vectors of the "mmap" db type.
+                Defaults to "float16".
+            index_type (str, optional): "ivf" or "hnsw", approximate index of the "mmap" db type, exact search if
+                None. Defaults to None.
+            qdrant_url (str, optional): url of a Qdrant server to create the "qdrant" vector db in, instead of a local
+                Qdrant at output_db. Defaults to None.
         """
         if collection_name is None:
-            collection_name = f"collection_{self.collection_id}"
+            collection_name = QDRANT_DEFAULT_COLLECTION if db_type == "qdrant" else f"collection_{self.collection_id}"
             logger.info(f'This is the collection name: {collection_name}')
 
+        # Stable IDs, recorded in the ingestion manifest so a later incremental ingest can update the vector db
+        ids = get_chunk_ids(chunks)
+
         if db_type == "faiss":
             vector_store = FAISS.from_documents(
                 documents=chunks,
-                embedding=embeddings
+                embedding=embeddings,
+                ids=ids
             )
             if output_db:
                 vector_store.save_local(output_db)
 
         elif db_type == "chroma":
             if output_db:
-                vector_store = Chroma()
+                vector_store = Chroma(persist_directory=output_db, collection_name=collection_name)
                 vector_store.delete_collection()
                 vector_store = Chroma.from_documents(
                     documents=chunks,
                     embedding=embeddings,
                     persist_directory=output_db,
-                    collection_name=collection_name
+                    collection_name=collection_name,
+                    ids=ids
                 )
             else:
                 vector_store = Chroma()
@@ -200,30 +236,65 @@ class VectorDb():
                 vector_store = Chroma.from_documents(
                     documents=chunks,
                     embedding=embeddings,
-                    collection_name=collection_name
+                    collection_name=collection_name,
+                    ids=ids
                 )
             self.vector_collections.add(collection_name)
 
         elif db_type == "qdrant":
+            writer = QdrantWriter(output_db, embeddings, True, collection_name, url=qdrant_url)
+            if chunks:
+                vectors = embeddings.embed_documents([chunk.page_content for chunk in chunks])
+                writer.add(chunks, vectors, ids)
+            vector_store = writer.close()
+
+        elif db_type == "mmap":
             if output_db:
-                vector_store = Qdrant.from_documents(
-                    documents=chunks,
-                    embedding=embeddings,
-                    path=output_db,
-                    collection_name="test_collection",
-                )
-            else:
-                vector_store = Qdrant.from_documents(
-                    documents=chunks,
-                    embedding=embeddings,
-                    collection_name="test_collection",
-                )
+                delete_store_files(output_db)
+            vector_store = MmapVectorStore.from_documents(
+                documents=chunks,
+                embedding=embeddings,
+                ids=ids,
+                db_path=output_db or tempfile.mkdtemp(prefix="mmap_vdb_"),
+                dtype=vector_dtype,
+                index_type=index_type,
+            )
+
+        if output_db:
+            self._write_manifest(chunks, output_db, collection_name if db_type in ("chroma", "qdrant") else None)
 
         logger.info(f"Vector store saved to {output_db}")
 
         return vector_store
 
-    def load_vdb(self, persist_directory, embedding_model, db_type="chroma", collection_name=None):
+    def _write_manifest(self, chunks: list, db_path: str, collection_name: str = None) -> None:
+        """Replaces the ingestion manifest of a vector db created from chunks, so a later incremental ingest only
+        embeds the new or changed chunks and deletes the vectors of the others"""
+        manifest = IngestionManifest.from_db_path(db_path)
+        try:
+            manifest.clear()
+            manifest.commit(manifest.plan(chunks))
+            if collection_name is not None:
+                manifest.set_meta("collection_name", collection_name)
+        finally:
+            manifest.close()
+
+    def load_vdb(self, persist_directory, embedding_model, db_type="chroma", collection_name=None, qdrant_url=None):
+        """Loads a persisted vector db
+
+        Args:
+            persist_directory (str): path of the persisted vector db
+            embedding_model: embedding model
+            db_type (str, optional): vector db type, one of DB_TYPES. Defaults to "chroma".
+            collection_name (str, optional): collection name of Chroma or Qdrant. For Qdrant, defaults to the
+                collection name stored in the ingestion manifest, or to the only collection, or to
+                QDRANT_DEFAULT_COLLECTION.
+            qdrant_url (str, optional): url of a Qdrant server to load the "qdrant" vector db from, instead of a local
+                Qdrant at persist_directory. Defaults to None.
+
+        Returns:
+            vector store
+        """
         if db_type == "faiss":
             vector_store = FAISS.load_local(persist_directory, embedding_model, allow_dangerous_deserialization=True)
         elif db_type == "chroma":
@@ -239,32 +310,260 @@ class VectorDb():
                     embedding_function=embedding_model
                 )
         elif db_type == "qdrant":
-            # TODO: Implement Qdrant loading
-            pass
+            client = get_qdrant_client(path=persist_directory, url=qdrant_url)
+            if collection_name is None:
+                collection_name = self._get_qdrant_collection_name(client, persist_directory)
+            if not client.collection_exists(collection_name):
+                client.close()
+                raise ValueError(f"No Qdrant collection {collection_name} at {qdrant_url or persist_directory}")
+            vector_store = Qdrant(client=client, collection_name=collection_name, embeddings=embedding_model)
+        elif db_type == "mmap":
+            vector_store = MmapVectorStore.load(persist_directory, embedding_model)
         else:
             raise ValueError(f"Unsupported database type: {db_type}")
 
         return vector_store
 
-    def update_vdb(self, chunks: list, embeddings, db_type: str, input_db: str = None,
-                   output_db: str = None):
+    def _get_qdrant_collection_name(self, client, db_path: str) -> str:
+        """Gets the collection name of a Qdrant vector db: the one stored in its ingestion manifest, or its only
+        collection, or QDRANT_DEFAULT_COLLECTION"""
+        if db_path and os.path.exists(os.path.join(db_path, MANIFEST_FILE_NAME)):
+            manifest = IngestionManifest.from_db_path(db_path)
+            try:
+                collection_name = manifest.get_meta("collection_name")
+            finally:
+                manifest.close()
+            if collection_name is not None:
+                return collection_name
+        collections = client.get_collections().collections
+        if len(collections) == 1:
+            return collections[0].name
+        return QDRANT_DEFAULT_COLLECTION
+
+    def list_files(self, input_path, recursive=False, load_txt=True, load_pdf=False) -> list:
+        """Lists the files of an input location that load_files loads, in a deterministic order
 
-        if db_type == "faiss":
-            vector_store = FAISS.load_local(input_db, embeddings, allow_dangerous_deserialization=True)
-            new_vector_store = self.create_vector_store(chunks, embeddings, db_type, None)
-            vector_store.merge_from(new_vector_store)
-            if output_db:
-                vector_store.save_local(output_db)
+        Args:
+            input_path : input location of files
+            recursive (bool, optional): flag to list files recursively. Defaults to False.
+            load_txt (bool, optional): flag to list txt files. Defaults to True.
+            load_pdf (bool, optional): flag to list pdf files. Defaults to False.
+
+        Returns:
+            list: sorted list of file paths
+        """
+        patterns = (["*.txt"] if load_txt else []) + (["*.pdf"] if load_pdf else [])
+        root = Path(input_path)
+        files = set()
+        for pattern in patterns:
+            for path in root.rglob(pattern) if recursive else root.glob(pattern):
+                # Hidden files are skipped, as in DirectoryLoader
+                if path.is_file() and not any(part.startswith(".") for part in path.relative_to(root).parts):
+                    files.add(str(path))
+
+        return sorted(files)
+
+    def load_source(self, source: str) -> list:
+        """Loads the documents of a file or url, with the loaders of load_files
+
+        Args:
+            source (str): file path or url
+
+        Returns:
+            list: list of documents
+        """
+        if source.startswith(("http://", "https://")):
+            return UnstructuredURLLoader(urls=[source]).load()
+        return UnstructuredFileLoader(source, **TEXT_LOADER_KWARGS).load()
 
+    def get_text_splitter(self, chunk_size: int, chunk_overlap: int, tokenizer=None):
+        """Gets the text splitter of get_text_chunks, or of get_token_chunks if a tokenizer is passed"""
+        if tokenizer is None:
+            return RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len
+            )
+        return CharacterTextSplitter.from_huggingface_tokenizer(
+            tokenizer, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        )
+
+    def split_documents(self, docs: list, chunk_size: int, chunk_overlap: int, tokenizer=None) -> list:
+        """Splits documents with the splitter of get_text_splitter. Unlike the splitter itself, this method can be
+        pickled to run in worker processes.
+
+        Args:
+            docs (list): list of documents
+            chunk_size (int): chunk size in number of characters, or of tokens if a tokenizer is passed
+            chunk_overlap (int): chunk overlap in number of characters, or of tokens if a tokenizer is passed
+            tokenizer (optional): Hugging Face tokenizer. Defaults to None.
+
+        Returns:
+            list: list of chunks
+        """
+        return self.get_text_splitter(chunk_size, chunk_overlap, tokenizer).split_documents(docs)
+
+    def _vector_store_exists(self, db_type: str, db_path: str, collection_name: str, qdrant_url: str = None) -> bool:
+        """Checks whether a vector db was persisted at db_path, or in the Qdrant server at qdrant_url"""
+        if db_type == "qdrant" and qdrant_url is not None:
+            client = get_qdrant_client(url=qdrant_url)
+            try:
+                return client.collection_exists(collection_name)
+            finally:
+                client.close()
+        elif db_type == "faiss":
+            return os.path.exists(os.path.join(db_path, "index.faiss"))
         elif db_type == "chroma":
-            # TODO implement update method for chroma
-            pass
+            return os.path.exists(os.path.join(db_path, "chroma.sqlite3"))
         elif db_type == "qdrant":
-            # TODO implement update method for qdrant
-            pass
+            return os.path.isdir(os.path.join(db_path, "collection", collection_name))
+        else:
+            return os.path.exists(os.path.join(db_path, MMAP_CONFIG_FILE_NAME))
+
+    def ingest(self, sources, load, embeddings, db_type: str, db_path: str, split=None, collection_name: str = None,
+               full_sync: bool = True, batch_size: int = 32, queue_size: int = 8, chunking_config: str = None,
+               num_workers: int = 1, vector_dtype: str = "float16", index_type: str = None, qdrant_url: str = None):
+        """Incrementally ingests sources into a persisted vector db with a streaming pipeline, using the ingestion
+        manifest stored in db_path: sources are loaded, split, embedded in batches and written with bounded queues
+        between these stages, so memory stays constant whatever the size of the corpus. Only the new or changed
+        chunks are embedded, the vectors of the changed or removed chunks are deleted, and chunks are upserted by
+        stable IDs.
+
+        Args:
+            sources: iterable of sources to ingest, e.g. file paths or urls
+            load: function loading the documents of a source
+            embeddings: embedding model
+            db_type (str): vector db type, one of DB_TYPES
+            db_path (str): path of the persisted vector db, created if it doesn't exist
+            split (optional): function splitting documents into chunks, None if load returns chunks.
+                Defaults to None.
+            collection_name (str, optional): collection name of Chroma or Qdrant. Defaults to the collection name
+                stored in the manifest, or to a new one.
+            full_sync (bool, optional): whether the sources are the whole corpus. The vectors of the sources missing
+                from them are then deleted, and a vector db without manifest is rebuilt from scratch. Otherwise the
+                sources are added to the vector db, and the other sources are kept. Defaults to True.
+            batch_size (int, optional): number of chunks embedded and written at once. Defaults to 32.
+            queue_size (int, optional): max number of items waiting between two stages. Defaults to 8.
+            chunking_config (str, optional): identifier of the splitter configuration, to skip the sources whose
+                modification time didn't change since they were ingested with it. Defaults to None.
+            num_workers (int, optional): number of worker processes loading and splitting the sources, in which
+                case load and split must be picklable. Defaults to 1.
+            vector_dtype (str, optional): dtype of the vectors of a new "mmap" vector db. Defaults to "float16".
+            index_type (str, optional): approximate index of the "mmap" db type. Defaults to None.
+            qdrant_url (str, optional): url of a Qdrant server to write the "qdrant" vector db to, in which case
+                db_path only holds the manifest. Defaults to None.
+
+        Returns:
+            vector store
+        """
+        if db_type not in DB_TYPES:
+            raise ValueError(f"Unsupported database type: {db_type}")
+
+        os.makedirs(db_path, exist_ok=True)
+        manifest = IngestionManifest.from_db_path(db_path)
+        try:
+            if collection_name is None:
+                collection_name = manifest.get_meta("collection_name")
+            if collection_name is None:
+                if db_type == "qdrant":
+                    collection_name = QDRANT_DEFAULT_COLLECTION
+                else:
+                    collection_name = f"collection_{self.collection_id}"
+            logger.info(f'This is the collection name: {collection_name}')
+
+            if not self._vector_store_exists(db_type, db_path, collection_name, qdrant_url):
+                # Nothing of the manifest is stored anymore, so every chunk is embedded again
+                manifest.clear()
+                rebuild = True
+            else:
+                rebuild = full_sync and manifest.is_empty()
+
+            if db_type == "faiss":
+                writer = FaissWriter(db_path, embeddings, rebuild)
+            elif db_type == "chroma":
+                writer = ChromaWriter(db_path, embeddings, rebuild, collection_name)
+                self.vector_collections.add(collection_name)
+            elif db_type == "qdrant":
+                writer = QdrantWriter(db_path, embeddings, rebuild, collection_name, url=qdrant_url)
+            else:
+                writer = MmapWriter(db_path, embeddings, rebuild, dtype=vector_dtype, index_type=index_type)
+
+            pipeline = IngestionPipeline(
+                writer,
+                embeddings,
+                manifest,
+                batch_size=batch_size,
+                queue_size=queue_size,
+                full_sync=full_sync,
+                chunking_config=chunking_config,
+                num_workers=num_workers,
+            )
+            vector_store = pipeline.run(sources, load, split)
+            if db_type in ("chroma", "qdrant"):
+                manifest.set_meta("collection_name", collection_name)
+        finally:
+            manifest.close()
+
+        logger.info(f"Vector store synced to {db_path}")
 
         return vector_store
 
+    def sync_vector_store(self, chunks: list, embeddings, db_type: str, db_path: str, collection_name: str = None,
+                          full_sync: bool = True, batch_size: int = 32):
+        """Incrementally syncs a persisted vector db with chunks, see ingest
+
+        Args:
+            chunks (list): list of chunks
+            embeddings: embedding model
+            db_type (str): vector db type, one of DB_TYPES
+            db_path (str): path of the persisted vector db, created if it doesn't exist
+            collection_name (str, optional): collection name of Chroma or Qdrant. Defaults to None.
+            full_sync (bool, optional): whether the chunks are the whole corpus. Defaults to True.
+            batch_size (int, optional): number of chunks embedded and written at once. Defaults to 32.
+
+        Returns:
+            vector store
+        """
+        chunks_by_source = {}
+        for chunk in chunks:
+            chunks_by_source.setdefault(chunk.metadata.get("source", ""), []).append(chunk)
+
+        return self.ingest(
+            list(chunks_by_source),
+            chunks_by_source.pop,
+            embeddings,
+            db_type,
+            db_path,
+            collection_name=collection_name,
+            full_sync=full_sync,
+            batch_size=batch_size,
+        )
+
+    def update_vdb(self, chunks: list, embeddings, db_type: str, input_db: str = None,
+                   output_db: str = None, collection_name: str = None):
+        """Updates an existing vector db with new or changed chunks, keeping the other sources. Only the chunks
+        missing from its ingestion manifest are embedded.
+
+        Args:
+            chunks (list): list of chunks
+            embeddings: embedding model
+            db_type (str): vector db type, one of DB_TYPES
+            input_db (str, optional): path of the vector db to update. Defaults to None.
+            output_db (str, optional): path to save the updated vector db, input_db is updated in place if None.
+                Defaults to None.
+            collection_name (str, optional): collection name of Chroma or Qdrant. Defaults to None.
+
+        Returns:
+            vector store
+        """
+        db_path = output_db or input_db
+        if db_path is None:
+            raise ValueError("input_db or output_db must be set to update a vector db")
+        if input_db and output_db and os.path.abspath(input_db) != os.path.abspath(output_db):
+            shutil.copytree(input_db, output_db, dirs_exist_ok=True)
+
+        return self.sync_vector_store(
+            chunks, embeddings, db_type, db_path, collection_name=collection_name, full_sync=False
+        )
+
     def create_vdb(
         self,
         input_path,
@@ -280,8 +579,65 @@ class VectorDb():
         embedding_type="cpu",
         batch_size= None,
         coe = None,
-        select_expert = None
+        select_expert = None,
+        collection_name=None,
+        incremental=True,
+        num_workers=1,
+        vector_dtype="float16",
+        index_type=None,
+        qdrant_url=None
     ):
+        """Creates a vector db from the files of an input directory. When output_db is set and incremental is True,
+        the files are streamed into the vector db at output_db, only embedding the new or changed chunks, see ingest.
+        When num_workers is more than 1, the files are loaded and split in that many worker processes, and the chunks
+        are kept in the sorted order of the files.
+        """
+
+        embeddings = APIGateway.load_embedding_model(
+            type=embedding_type,
+            batch_size=batch_size,
+            coe=coe,
+            select_expert=select_expert
+        )
+
+        if (output_db and incremental) or num_workers > 1:
+            sources = []
+            if input_path is not None:
+                sources.extend(self.list_files(input_path, recursive=recursive, load_txt=load_txt, load_pdf=load_pdf))
+            if urls:
+                sources.extend(urls)
+            split = functools.partial(
+                self.split_documents, chunk_size=chunk_size, chunk_overlap=chunk_overlap, tokenizer=tokenizer
+            )
+
+        if output_db and incremental:
+            return self.ingest(
+                sources,
+                self.load_source,
+                embeddings,
+                db_type,
+                output_db,
+                split=split,
+                collection_name=collection_name,
+                full_sync=True,
+                chunking_config=get_chunking_config(chunk_size, chunk_overlap, tokenizer),
+                num_workers=num_workers,
+                vector_dtype=vector_dtype,
+                index_type=index_type,
+                qdrant_url=qdrant_url,
+            )
+
+        if num_workers > 1:
+            chunks = [
+                chunk
+                for source_chunks in load_sources(sources, self.load_source, split, num_workers)
+                for chunk in source_chunks
+            ]
+            logger.info(f"Total {len(chunks)} chunks created from {len(sources)} files")
+            vector_store = self.create_vector_store(
+                chunks, embeddings, db_type, output_db, collection_name, vector_dtype, index_type, qdrant_url
+            )
+            return vector_store
 
         docs = self.load_files(input_path, recursive=recursive, load_txt=load_txt, load_pdf=load_pdf, urls=urls)
 
@@ -290,15 +646,10 @@ class VectorDb():
         else:
             chunks = self.get_token_chunks(docs, chunk_size, chunk_overlap, tokenizer)
 
-        embeddings = APIGateway.load_embedding_model(
-            type=embedding_type,
-            batch_size=batch_size,
-            coe=coe,
-            select_expert=select_expert
+        vector_store = self.create_vector_store(
+            chunks, embeddings, db_type, output_db, collection_name, vector_dtype, index_type, qdrant_url
         )
 
-        vector_store = self.create_vector_store(chunks, embeddings, db_type, output_db)
-
         return vector_store
 
 
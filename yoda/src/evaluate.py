@@ -110,6 +110,7 @@ if __name__ == '__main__':
             batch_size=1,
             coe=True,
             select_expert='e5-mistral-7b-instruct',
+            num_workers=config.get('num_workers', 1),
         )
 
     retriever = vectordb.as_retriever(search_kwargs={'k': RAG_CONTEXT_TOP_K})